@@ -0,0 +1,3 @@
+from .routes import analytics_bp
+
+__all__ = ["analytics_bp"]
@@ -0,0 +1,256 @@
+"""
+Incremental rollups of watch and login events.
+
+Each source collection is read in ``_id`` order from a persisted high-water
+mark (``rollup_checkpoints``), and each batch is folded into hourly and
+daily summary documents with ``$inc`` upserts before the checkpoint moves.
+A crash between the summary writes and the checkpoint replays that batch,
+so counters are at-least-once. Distinct daily users are exact: each batch
+upserts one ``rollup_daily_users`` marker per (day, user), then recounts the
+markers of the days it touched and raises ``active_users`` to that count
+with ``$max``. A replayed or half-applied batch writes the same value again.
+
+Events newer than ``lag_seconds`` are left for the next pass so that inserts
+from other app servers with slightly older ObjectIds are not skipped.
+
+login_attempts has a 5-minute TTL index, so the worker has to run more
+often than that for login rates to be complete.
+"""
+
+from __future__ import annotations
+
+import logging
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from db.collections import get_collection
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINTS = "rollup_checkpoints"
+HOURLY = "rollup_hourly"
+DAILY = "rollup_daily"
+VIDEO_DAILY = "rollup_video_daily"
+DAILY_USERS = "rollup_daily_users"
+
+
+@dataclass(frozen=True)
+class EventSource:
+    collection: str
+    time_field: str
+    fields: Tuple[str, ...]
+
+
+SOURCES: Dict[str, EventSource] = {
+    "video_watch_history": EventSource("video_watch_history", "watched_at", ("user_id", "video_id", "watched_at")),
+    "login_attempts": EventSource("login_attempts", "timestamp", ("success", "timestamp")),
+}
+
+
+def hour_of(moment: datetime) -> datetime:
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def day_of(moment: datetime) -> datetime:
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+class RollupBatch:
+    def __init__(self):
+        self.hourly: Counter = Counter()
+        self.daily: Counter = Counter()
+        self.video_daily: Counter = Counter()
+        self.daily_users: Set[Tuple[datetime, str]] = set()
+
+    def _count(self, moment: datetime, field: str) -> None:
+        self.hourly[(hour_of(moment), field)] += 1
+        self.daily[(day_of(moment), field)] += 1
+
+    def add(self, source: str, event: Dict[str, Any]) -> None:
+        if source == "video_watch_history":
+            moment = event.get("watched_at") or event["_id"].generation_time.replace(tzinfo=None)
+            self._count(moment, "watches")
+            day = day_of(moment)
+            if event.get("video_id"):
+                self.video_daily[(day, event["video_id"])] += 1
+            if event.get("user_id"):
+                self.daily_users.add((day, event["user_id"]))
+        elif source == "login_attempts":
+            moment = event.get("timestamp") or event["_id"].generation_time.replace(tzinfo=None)
+            self._count(moment, "login_success" if event.get("success") else "login_failure")
+
+    def flush(self) -> None:
+        active_users: Dict[datetime, int] = {}
+        if self.daily_users:
+            markers = get_collection(DAILY_USERS)
+            markers.bulk_write(
+                [
+                    UpdateOne({"_id": f"{day:%Y-%m-%d}:{user_id}"}, {"$setOnInsert": {"day": day}}, upsert=True)
+                    for day, user_id in sorted(self.daily_users)
+                ],
+                ordered=False,
+            )
+            # Recount (primary reads) instead of adding this batch's new
+            # markers, which a replay after a crash past the marker writes
+            # would not see again.
+            for day in {day for day, _ in self.daily_users}:
+                active_users[day] = markers.count_documents({"day": day})
+
+        daily: Dict[datetime, Dict[str, Any]] = {day: {"$inc": inc} for day, inc in _group(self.daily).items()}
+        for day, count in active_users.items():
+            daily.setdefault(day, {})["$max"] = {"active_users": count}
+
+        if self.hourly:
+            get_collection(HOURLY).bulk_write(
+                [UpdateOne({"_id": key}, {"$inc": inc}, upsert=True) for key, inc in _group(self.hourly).items()],
+                ordered=False,
+            )
+        if daily:
+            get_collection(DAILY).bulk_write(
+                [UpdateOne({"_id": key}, update, upsert=True) for key, update in daily.items()],
+                ordered=False,
+            )
+        if self.video_daily:
+            get_collection(VIDEO_DAILY).bulk_write(
+                [
+                    UpdateOne(
+                        {"_id": f"{day:%Y-%m-%d}:{video_id}"},
+                        {"$inc": {"watches": count}, "$setOnInsert": {"day": day, "video_id": video_id}},
+                        upsert=True,
+                    )
+                    for (day, video_id), count in self.video_daily.items()
+                ],
+                ordered=False,
+            )
+
+
+def _group(counter: Counter) -> Dict[datetime, Dict[str, int]]:
+    grouped: Dict[datetime, Dict[str, int]] = {}
+    for (bucket, field), count in counter.items():
+        grouped.setdefault(bucket, {})[field] = count
+    return grouped
+
+
+def ensure_indexes() -> None:
+    get_collection(VIDEO_DAILY).create_index([("day", 1), ("watches", -1)])
+    get_collection(DAILY_USERS).create_index("day", expireAfterSeconds=40 * 24 * 3600)
+
+
+def load_checkpoint(source: str) -> Optional[ObjectId]:
+    doc = get_collection(CHECKPOINTS).find_one({"_id": source})
+    return doc.get("last_id") if doc else None
+
+
+def save_checkpoint(source: str, last_id: ObjectId) -> None:
+    get_collection(CHECKPOINTS).update_one(
+        {"_id": source},
+        {"$set": {"last_id": last_id, "updated_at": datetime.utcnow()}},
+        upsert=True,
+    )
+
+
+def _events(source: EventSource, query: Dict[str, Any], batch_size: int, limit: int = 0) -> Iterable[Dict[str, Any]]:
+    projection = {field: 1 for field in source.fields}
+    # From the primary: a lagging secondary could hide events below the
+    # checkpoint this batch is about to save.
+    cursor = get_collection(source.collection, read="primary_scan").find(query, projection).sort("_id", 1)
+    if limit:
+        cursor = cursor.limit(limit)
+    return cursor.batch_size(batch_size)
+
+
+def run_incremental(source_name: str, batch_size: int = 1000, lag_seconds: int = 5) -> int:
+    """Fold every event past the checkpoint into the summaries; returns the event count."""
+    source = SOURCES[source_name]
+    upper = ObjectId.from_datetime(datetime.utcnow() - timedelta(seconds=lag_seconds))
+    last_id = load_checkpoint(source_name)
+    processed = 0
+    while True:
+        id_range: Dict[str, Any] = {"$lt": upper}
+        if last_id is not None:
+            id_range["$gt"] = last_id
+        batch = RollupBatch()
+        batch_last: Optional[ObjectId] = None
+        count = 0
+        for event in _events(source, {"_id": id_range}, batch_size, limit=batch_size):
+            batch.add(source_name, event)
+            batch_last = event["_id"]
+            count += 1
+        if not count:
+            break
+        batch.flush()
+        save_checkpoint(source_name, batch_last)
+        last_id = batch_last
+        processed += count
+    if processed:
+        logger.info("rollup_incremental", extra={"source": source_name, "events": processed})
+    return processed
+
+
+def _backfill_chunk(source_name: str, start: datetime, end: datetime, batch_size: int) -> int:
+    source = SOURCES[source_name]
+    query = {"_id": {"$gte": ObjectId.from_datetime(start), "$lt": ObjectId.from_datetime(end)}}
+    batch = RollupBatch()
+    count = 0
+    for event in _events(source, query, batch_size):
+        batch.add(source_name, event)
+        count += 1
+        if count % batch_size == 0:
+            batch.flush()
+            batch = RollupBatch()
+    batch.flush()
+    return count
+
+
+def day_chunks(since: datetime, until: datetime) -> List[Tuple[datetime, datetime]]:
+    chunks = []
+    start = day_of(since)
+    while start < until:
+        end = min(start + timedelta(days=1), until)
+        chunks.append((start, end))
+        start = end
+    return chunks
+
+
+def run_backfill(source_name: str, since: datetime, until: datetime, workers: int = 4,
+                 batch_size: int = 1000) -> int:
+    """
+    Rebuild the summaries for [since, until) from raw events, one day per task.
+
+    The range must not reach past the incremental checkpoint, otherwise the
+    same events would be counted twice. Existing summaries for the days in
+    range are replaced. With no checkpoint yet, incremental runs continue
+    from ``until``.
+    """
+    since, until = day_of(since), day_of(until)
+    checkpoint = load_checkpoint(source_name)
+    if checkpoint is not None and ObjectId.from_datetime(until) > checkpoint:
+        raise ValueError(f"backfill range for {source_name} overlaps the incremental checkpoint")
+
+    chunks = day_chunks(since, until)
+    _clear_days(source_name, since, until)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        counts = list(pool.map(lambda chunk: _backfill_chunk(source_name, chunk[0], chunk[1], batch_size), chunks))
+
+    if checkpoint is None:
+        save_checkpoint(source_name, ObjectId.from_datetime(until))
+    total = sum(counts)
+    logger.info("rollup_backfill", extra={"source": source_name, "events": total, "days": len(chunks)})
+    return total
+
+
+def _clear_days(source_name: str, since: datetime, until: datetime) -> None:
+    fields = ["watches"] if source_name == "video_watch_history" else ["login_success", "login_failure"]
+    if source_name == "video_watch_history":
+        fields.append("active_users")
+        get_collection(VIDEO_DAILY).delete_many({"day": {"$gte": since, "$lt": until}})
+        get_collection(DAILY_USERS).delete_many({"day": {"$gte": since, "$lt": until}})
+    unset = {field: "" for field in fields}
+    for name in (HOURLY, DAILY):
+        get_collection(name).update_many({"_id": {"$gte": since, "$lt": until}}, {"$unset": unset})
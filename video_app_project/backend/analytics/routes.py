@@ -0,0 +1,106 @@
+import logging
+from datetime import datetime, timedelta
+
+from flask import Blueprint, current_app, jsonify, request
+
+from analytics.rollup import DAILY, HOURLY, VIDEO_DAILY
+from auth.routes import get_user_id_from_token
+from db.collections import get_collection
+
+analytics_bp = Blueprint("analytics", __name__, url_prefix="/analytics")
+logger = logging.getLogger(__name__)
+
+MAX_RANGE_DAYS = 92
+
+
+def get_admin_user_id():
+    """Like get_user_id_from_token, but only for ANALYTICS_ADMIN_USER_IDS."""
+    user_id, error_response, status_code = get_user_id_from_token()
+    if error_response:
+        return None, error_response, status_code
+
+    allowed = {item.strip() for item in current_app.config.get("ANALYTICS_ADMIN_USER_IDS", "").split(",")}
+    if user_id not in allowed - {""}:
+        logger.warning("analytics_forbidden", extra={"user_id": user_id})
+        return None, jsonify({"success": False, "error": "forbidden"}), 403
+    return user_id, None, None
+
+
+def parse_day(value: str | None, default: datetime) -> datetime:
+    if not value:
+        return default
+    return datetime.strptime(value, "%Y-%m-%d")
+
+
+def login_rate(doc: dict) -> float | None:
+    success = doc.get("login_success", 0)
+    total = success + doc.get("login_failure", 0)
+    return round(success / total, 4) if total else None
+
+
+def summary(doc: dict, key: str) -> dict:
+    return {
+        key: doc["_id"].isoformat(),
+        "watches": doc.get("watches", 0),
+        "login_success": doc.get("login_success", 0),
+        "login_failure": doc.get("login_failure", 0),
+        "login_success_rate": login_rate(doc),
+    }
+
+
+@analytics_bp.get("/daily")
+def get_daily():
+    user_id, error_response, status_code = get_admin_user_id()
+    if error_response:
+        return error_response, status_code
+
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    try:
+        end = parse_day(request.args.get("to"), today)
+        start = parse_day(request.args.get("from"), end - timedelta(days=6))
+    except ValueError:
+        return jsonify({"success": False, "error": "dates must be YYYY-MM-DD"}), 400
+    if start > end or (end - start).days > MAX_RANGE_DAYS:
+        return jsonify({"success": False, "error": "invalid date range"}), 400
+
+    docs = get_collection(DAILY).find({"_id": {"$gte": start, "$lte": end}}).sort("_id", 1)
+    days = []
+    for doc in docs:
+        item = summary(doc, "day")
+        item["active_users"] = doc.get("active_users", 0)
+        days.append(item)
+    return jsonify({"success": True, "days": days}), 200
+
+
+@analytics_bp.get("/hourly")
+def get_hourly():
+    user_id, error_response, status_code = get_admin_user_id()
+    if error_response:
+        return error_response, status_code
+
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    try:
+        day = parse_day(request.args.get("date"), today)
+    except ValueError:
+        return jsonify({"success": False, "error": "date must be YYYY-MM-DD"}), 400
+
+    docs = get_collection(HOURLY).find({"_id": {"$gte": day, "$lt": day + timedelta(days=1)}}).sort("_id", 1)
+    return jsonify({"success": True, "hours": [summary(doc, "hour") for doc in docs]}), 200
+
+
+@analytics_bp.get("/videos/top")
+def get_top_videos():
+    user_id, error_response, status_code = get_admin_user_id()
+    if error_response:
+        return error_response, status_code
+
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    try:
+        day = parse_day(request.args.get("date"), today)
+        limit = min(max(int(request.args.get("limit", 10)), 1), 100)
+    except ValueError:
+        return jsonify({"success": False, "error": "invalid date or limit"}), 400
+
+    docs = get_collection(VIDEO_DAILY).find({"day": day}).sort("watches", -1).limit(limit)
+    videos = [{"video_id": doc["video_id"], "watches": doc.get("watches", 0)} for doc in docs]
+    return jsonify({"success": True, "date": day.date().isoformat(), "videos": videos}), 200
@@ -4,11 +4,19 @@ from logging.handlers import RotatingFileHandler
 from dotenv import load_dotenv
 load_dotenv()
 
-from flask import Flask
+from flask import Flask, jsonify
+from pymongo.errors import ConnectionFailure
 from config.config import get_config
-from db import init_db, get_db_client
+from db import init_db, get_db_client, get_breaker, check_breaker
+from db.breaker import DatabaseUnavailable
 from auth.routes import auth_bp
-from video.routes import video_bp, dashboard_bp
+from auth.email_filter import init_email_filter
+from analytics.routes import analytics_bp
+from video.routes import video_bp, dashboard_bp, catalog_bp, history_bp
+from video.catalog import init_catalog
+from video.watch_sets import init_watch_sets
+from middleware import init_admission, init_capture, init_profiling
+from thumbnails import init_thumbnails
 from flask_cors import CORS
 
 
@@ -39,21 +47,62 @@ def create_app(config_name: str | None = None) -> Flask:
 
     app.config.from_object(get_config(config_name))
 
+    init_capture(app)
+    init_profiling(app)
     init_db(app)
+    init_admission(app)
+    init_catalog(app)
+    init_watch_sets(app)
+    init_email_filter(app)
 
     app.register_blueprint(auth_bp)
     app.register_blueprint(video_bp)
     app.register_blueprint(dashboard_bp)
+    app.register_blueprint(catalog_bp)
+    app.register_blueprint(history_bp)
+    app.register_blueprint(analytics_bp)
+    init_thumbnails(app)
 
     @app.get("/")
     def home():
         return {"message": "Video API is running", "status": "ok"}
 
+    @app.errorhandler(ConnectionFailure)
+    def database_unavailable(exc):
+        breaker = get_breaker()
+        if isinstance(exc, DatabaseUnavailable):
+            retry_after = exc.retry_after
+        else:
+            logging.error(f"Database connection failure: {exc}")
+            retry_after = breaker.retry_after() if breaker is not None else 1
+        response = jsonify({"success": False, "error": "database unavailable"})
+        response.status_code = 503
+        response.headers["Retry-After"] = str(retry_after)
+        return response
+
+    @app.get("/metrics")
+    def metrics():
+        breaker = get_breaker()
+        admission = app.extensions.get("admission")
+        capture = app.extensions.get("capture")
+        email_filter = app.extensions.get("email_filter")
+        return {
+            "db_breaker": breaker.stats() if breaker is not None else None,
+            "admission": admission.stats() if admission is not None else None,
+            "watch_sets": app.extensions["watch_sets"].stats(),
+            "thumbnails": app.extensions["thumbnail_store"].stats(),
+            "capture": capture.stats() if capture is not None else None,
+            "email_filter": email_filter.stats() if email_filter is not None else None,
+        }
+
     @app.get("/health")
     def health():
         try:
+            check_breaker()
             get_db_client().admin.command("ping")
             return {"status": "ok", "db": "ok"}
+        except DatabaseUnavailable:
+            return {"status": "ok", "db": "unavailable", "breaker": "open"}, 503
         except Exception as e:
             logging.error(f"Health check failed: {e}")
             return {"status": "ok", "db": "error", "error": str(e)}, 500
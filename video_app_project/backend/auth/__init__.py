@@ -1,4 +1,4 @@
+from .email_filter import get_email_filter, init_email_filter
 from .routes import auth_bp
 
-__all__ = ["auth_bp"]
-
+__all__ = ["auth_bp", "get_email_filter", "init_email_filter"]
@@ -1,33 +1,22 @@
 import logging
-import re
 from datetime import datetime, timedelta
 from uuid import uuid4
 
 import jwt
 from flask import Blueprint, current_app, jsonify, request
+from pymongo.errors import ConnectionFailure, DuplicateKeyError
 from werkzeug.security import check_password_hash
 
-from db.mongo import get_db_client
+from auth.email_filter import get_email_filter
+from auth.tokens import bearer_token, decode_token, encode_token, token_digest
+from auth.validation import is_strong_password, is_valid_email
+from db.collections import get_collection
+from db.fallback import profile_fallback
 
 auth_bp = Blueprint("auth", __name__, url_prefix="/auth")
 logger = logging.getLogger(__name__)
 
 
-def is_valid_email(value: str) -> bool:
-    pattern = r"^[^@]+@[^@]+\.[^@]+$"
-    return bool(re.match(pattern, value))
-
-
-def is_strong_password(value: str) -> bool:
-    if len(value) < 8:
-        return False
-    has_lower = any(c.islower() for c in value)
-    has_upper = any(c.isupper() for c in value)
-    has_digit = any(c.isdigit() for c in value)
-    has_special = any(not c.isalnum() for c in value)
-    return has_lower and has_upper and has_digit and has_special
-
-
 def log_login_event(ip: str, email: str | None, status: str, reason: str | None = None) -> None:
     logger.info(
         "login_event",
@@ -41,15 +30,14 @@ def log_login_event(ip: str, email: str | None, status: str, reason: str | None
 
 
 def get_user_id_from_token():
-    auth_header = request.headers.get("Authorization", "")
-    if not auth_header.startswith("Bearer "):
+    token = bearer_token(request.headers.get("Authorization", ""))
+    if token is None:
         logger.warning(
             "token_error",
             extra={"error": "missing_bearer_prefix", "ip": request.remote_addr or "unknown"},
         )
         return None, jsonify({"success": False, "error": "invalid token"}), 401
 
-    token = auth_header[7:].strip()
     if not token:
         logger.warning(
             "token_error",
@@ -57,22 +45,26 @@ def get_user_id_from_token():
         )
         return None, jsonify({"success": False, "error": "invalid token"}), 401
 
-    client = get_db_client()
-    db = client.get_default_database()
-    blacklist = db["token_blacklist"]
+    try:
+        blacklisted = get_collection("token_blacklist").find_one({"token_hash": token_digest(token)})
+    except ConnectionFailure:
+        if not current_app.config.get("BREAKER_ALLOW_STALE_AUTH", False):
+            raise
+        logger.warning(
+            "token_warning",
+            extra={"error": "blacklist_unavailable", "ip": request.remote_addr or "unknown"},
+        )
+        blacklisted = None
 
-    if blacklist.find_one({"token": token}):
+    if blacklisted:
         logger.warning(
             "token_error",
             extra={"error": "blacklisted_token", "ip": request.remote_addr or "unknown"},
         )
         return None, jsonify({"success": False, "error": "token invalidated"}), 401
 
-    jwt_secret = current_app.config.get("JWT_SECRET_KEY")
-    jwt_algorithm = current_app.config.get("JWT_ALGORITHM", "HS256")
-
     try:
-        payload = jwt.decode(token, jwt_secret, algorithms=[jwt_algorithm])
+        payload = decode_token(token)
         user_id = payload.get("user_id")
         if not user_id:
             logger.warning(
@@ -131,14 +123,16 @@ def signup():
         logger.info("Signup validation failed")
         return jsonify({"success": False, "errors": errors}), 400
 
-    client = get_db_client()
-    db = client.get_default_database()
-    users = db["users"]
+    users = get_collection("users")
+    email_filter = get_email_filter()
 
-    existing = users.find_one({"email": email})
-    if existing:
-        logger.info("Signup failed: email already exists")
-        return jsonify({"success": False, "error": "email already exists"}), 400
+    # A definite miss skips the lookup; the unique email index still
+    # rejects a duplicate on insert.
+    if email_filter is None or email_filter.might_exist(email):
+        existing = users.find_one({"email": email})
+        if existing:
+            logger.info("Signup failed: email already exists")
+            return jsonify({"success": False, "error": "email already exists"}), 400
 
     from werkzeug.security import generate_password_hash
 
@@ -156,10 +150,17 @@ def signup():
 
     try:
         users.insert_one(user_doc)
+    except DuplicateKeyError:
+        logger.info("Signup failed: email already exists")
+        if email_filter is not None:
+            email_filter.add(email)
+        return jsonify({"success": False, "error": "email already exists"}), 400
     except Exception:
         logger.exception("Signup failed during persistence")
         return jsonify({"success": False, "error": "signup failed"}), 500
 
+    if email_filter is not None:
+        email_filter.add(email)
     logger.info("Signup succeeded")
     return jsonify({"success": True, "message": "signup successful"}), 201
 
@@ -172,9 +173,7 @@ def login():
     password = payload.get("password") or ""
     ip_address = request.remote_addr or "unknown"
 
-    client = get_db_client()
-    db = client.get_default_database()
-    attempts_collection = db["login_attempts"]
+    attempts_collection = get_collection("login_attempts")
     window_start = attempt_time - timedelta(minutes=5)
     filters = [{"ip": ip_address}]
     if email:
@@ -225,9 +224,11 @@ def login():
         )
         return jsonify({"success": False, "error": "password is required"}), 400
 
-    users = db["users"]
-
-    user = users.find_one({"email": email})
+    email_filter = get_email_filter()
+    if email_filter is not None and not email_filter.might_exist(email):
+        user = None
+    else:
+        user = get_collection("users").find_one({"email": email})
     if not user:
         log_login_event(ip_address, email, "failed", "email_not_found")
         attempts_collection.insert_one(
@@ -266,8 +267,6 @@ def login():
         )
         return jsonify({"success": False, "error": "login failed"}), 500
 
-    jwt_secret = current_app.config.get("JWT_SECRET_KEY")
-    jwt_algorithm = current_app.config.get("JWT_ALGORITHM", "HS256")
     expiry_time = datetime.utcnow() + timedelta(hours=24)
 
     token_payload = {
@@ -276,7 +275,7 @@ def login():
     }
 
     try:
-        token = jwt.encode(token_payload, jwt_secret, algorithm=jwt_algorithm)
+        token = encode_token(token_payload)
     except Exception:
         log_login_event(ip_address, email, "failed", "jwt_generation_error")
         logger.exception("login_jwt_generation_error")
@@ -309,35 +308,35 @@ def get_profile():
     if error_response:
         return error_response, status_code
 
-    client = get_db_client()
-    db = client.get_default_database()
-    users = db["users"]
+    try:
+        users = get_collection("users")
+
+        user = users.find_one({"user_id": user_id})
+    except ConnectionFailure:
+        cached = profile_fallback.get(user_id)
+        if cached is None:
+            raise
+        full_name, email = cached
+        return jsonify({"success": True, "full_name": full_name, "email": email, "stale": True}), 200
 
-    user = users.find_one({"user_id": user_id})
     if not user:
         return jsonify({"success": False, "error": "user not found"}), 404
 
     full_name = user.get("full_name", "")
     email = user.get("email", "")
+    profile_fallback.put(user_id, (full_name, email))
 
     return jsonify({"success": True, "full_name": full_name, "email": email}), 200
 
 
 @auth_bp.post("/logout")
 def logout():
-    auth_header = request.headers.get("Authorization", "")
-    if not auth_header.startswith("Bearer "):
-        return jsonify({"success": False, "error": "invalid token"}), 401
-
-    token = auth_header[7:].strip()
+    token = bearer_token(request.headers.get("Authorization", ""))
     if not token:
         return jsonify({"success": False, "error": "invalid token"}), 401
 
-    jwt_secret = current_app.config.get("JWT_SECRET_KEY")
-    jwt_algorithm = current_app.config.get("JWT_ALGORITHM", "HS256")
-
     try:
-        payload = jwt.decode(token, jwt_secret, algorithms=[jwt_algorithm])
+        payload = decode_token(token)
     except jwt.ExpiredSignatureError:
         return jsonify({"success": False, "error": "token expired"}), 401
     except jwt.InvalidTokenError:
@@ -345,11 +344,10 @@ def logout():
     except Exception:
         return jsonify({"success": False, "error": "invalid token"}), 401
 
-    client = get_db_client()
-    db = client.get_default_database()
-    blacklist = db["token_blacklist"]
+    blacklist = get_collection("token_blacklist")
 
-    existing = blacklist.find_one({"token": token})
+    digest = token_digest(token)
+    existing = blacklist.find_one({"token_hash": digest})
     if existing:
         return jsonify({"success": True, "message": "logout successful"}), 200
 
@@ -365,7 +363,7 @@ def logout():
         expires_at = datetime.utcnow() + timedelta(hours=24)
 
     blacklist_doc = {
-        "token": token,
+        "token_hash": digest,
         "invalidated_at": datetime.utcnow(),
         "expires_at": expires_at,
     }
@@ -386,10 +384,8 @@ def refresh():
     refresh_token = payload.get("refresh_token") or ""
     if not refresh_token:
         return jsonify({"success": False, "error": "refresh_token is required"}), 400
-    client = get_db_client()
-    db = client.get_default_database()
-    tokens = db["refresh_tokens"]
-    record = tokens.find_one({"token": refresh_token})
+    tokens = get_collection("refresh_tokens")
+    record = tokens.find_one({"token_hash": token_digest(refresh_token)})
     if not record:
         return jsonify({"success": False, "error": "invalid refresh token"}), 401
     now = datetime.utcnow()
@@ -397,10 +393,8 @@ def refresh():
     if expires_at and expires_at < now:
         tokens.delete_one({"_id": record["_id"]})
         return jsonify({"success": False, "error": "refresh token expired"}), 401
-    jwt_secret = current_app.config.get("JWT_SECRET_KEY")
-    jwt_algorithm = current_app.config.get("JWT_ALGORITHM", "HS256")
     try:
-        decoded = jwt.decode(refresh_token, jwt_secret, algorithms=[jwt_algorithm])
+        decoded = decode_token(refresh_token)
     except jwt.ExpiredSignatureError:
         tokens.delete_one({"_id": record["_id"]})
         return jsonify({"success": False, "error": "refresh token expired"}), 401
@@ -417,7 +411,7 @@ def refresh():
         "exp": access_expiry,
     }
     try:
-        access_token = jwt.encode(access_payload, jwt_secret, algorithm=jwt_algorithm)
+        access_token = encode_token(access_payload)
     except Exception:
         logger.exception("Access token generation failed during refresh")
         return jsonify({"success": False, "error": "refresh failed"}), 500
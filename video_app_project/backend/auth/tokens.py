@@ -0,0 +1,134 @@
+"""
+Token helpers shared by the auth, video and analytics routes.
+
+``encode_token``/``decode_token`` sign and verify JWTs with the app's
+JWT_SECRET_KEY. For HS256/384/512 the key is validated and prepared once per
+(secret, algorithm) and the HMAC state is copied per token; PyJWT repeats
+that preparation on every call. Tokens with the header we mint and only
+``exp`` as a registered claim are handled here; anything else (other
+algorithms, other headers, ``nbf``/``iat``/``aud``/``iss`` claims, a bad
+signature) goes through ``jwt.decode`` so errors and edge cases behave
+exactly as before. ``python -m benchmarks.auth_hot_path`` measures both.
+"""
+
+import base64
+import calendar
+import hashlib
+import hmac
+import json
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+import jwt
+from bson.binary import Binary
+from flask import current_app
+from jwt.algorithms import HMACAlgorithm
+
+TOKEN_DIGEST_BYTES = 16
+
+HMAC_DIGESTS = {"HS256": hashlib.sha256, "HS384": hashlib.sha384, "HS512": hashlib.sha512}
+TIME_CLAIMS = ("exp", "iat", "nbf")
+# Registered claims the fast path leaves to PyJWT's validation.
+DEFERRED_CLAIMS = frozenset(("iat", "nbf", "aud", "iss"))
+
+
+def token_digest(token: str) -> Binary:
+    """Fixed-size key for stored tokens: the first 16 bytes of SHA-256."""
+    return Binary(hashlib.sha256(token.encode("utf-8")).digest()[:TOKEN_DIGEST_BYTES])
+
+
+def bearer_token(auth_header: str) -> Optional[str]:
+    """The token from an ``Authorization: Bearer`` header; None without the prefix, "" if empty."""
+    if not auth_header.startswith("Bearer "):
+        return None
+    return auth_header[7:].strip()
+
+
+def _b64encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def _b64decode(data: bytes) -> bytes:
+    return base64.urlsafe_b64decode(data + b"=" * (-len(data) % 4))
+
+
+class TokenCodec:
+    def __init__(self, secret: str, algorithm: str = "HS256"):
+        self.secret = secret
+        self.algorithm = algorithm
+        self._mac = None
+        digest = HMAC_DIGESTS.get(algorithm)
+        if digest is not None:
+            key = HMACAlgorithm(digest).prepare_key(secret)
+            self._mac = hmac.new(key, digestmod=digest)
+            header = json.dumps({"alg": algorithm, "typ": "JWT"}, separators=(",", ":"), sort_keys=True)
+            self._header = _b64encode(header.encode("utf-8"))
+
+    def _sign(self, signing_input: bytes) -> bytes:
+        mac = self._mac.copy()
+        mac.update(signing_input)
+        return _b64encode(mac.digest())
+
+    def encode(self, payload: Dict[str, Any]) -> str:
+        if self._mac is None:
+            return jwt.encode(payload, self.secret, algorithm=self.algorithm)
+        claims = dict(payload)
+        for claim in TIME_CLAIMS:
+            if isinstance(claims.get(claim), datetime):
+                claims[claim] = calendar.timegm(claims[claim].utctimetuple())
+        body = _b64encode(json.dumps(claims, separators=(",", ":")).encode("utf-8"))
+        signing_input = self._header + b"." + body
+        return (signing_input + b"." + self._sign(signing_input)).decode("ascii")
+
+    def decode(self, token: str) -> Dict[str, Any]:
+        """Verify ``token``; raises ``jwt.ExpiredSignatureError`` or ``jwt.InvalidTokenError`` like jwt.decode."""
+        claims = self._decode_fast(token) if self._mac is not None else None
+        if claims is None:
+            return jwt.decode(token, self.secret, algorithms=[self.algorithm])
+        exp = claims.get("exp")
+        if exp is not None and exp <= time.time():
+            raise jwt.ExpiredSignatureError("Signature has expired")
+        return claims
+
+    def _decode_fast(self, token: str) -> Optional[Dict[str, Any]]:
+        try:
+            raw = token.encode("ascii")
+        except (AttributeError, UnicodeEncodeError):
+            return None
+        signing_input, _, signature = raw.rpartition(b".")
+        header, _, body = signing_input.partition(b".")
+        if header != self._header or not hmac.compare_digest(self._sign(signing_input), signature):
+            return None
+        try:
+            claims = json.loads(_b64decode(body))
+        except ValueError:
+            return None
+        if not isinstance(claims, dict) or not DEFERRED_CLAIMS.isdisjoint(claims):
+            return None
+        exp = claims.get("exp")
+        if exp is not None and (isinstance(exp, bool) or not isinstance(exp, (int, float))):
+            return None
+        return claims
+
+
+_codecs: Dict[Tuple[str, str], TokenCodec] = {}
+
+
+def get_codec(secret: str, algorithm: str = "HS256") -> TokenCodec:
+    codec = _codecs.get((secret, algorithm))
+    if codec is None:
+        codec = _codecs[(secret, algorithm)] = TokenCodec(secret, algorithm)
+    return codec
+
+
+def _app_codec() -> TokenCodec:
+    return get_codec(current_app.config.get("JWT_SECRET_KEY"), current_app.config.get("JWT_ALGORITHM", "HS256"))
+
+
+def encode_token(payload: Dict[str, Any]) -> str:
+    return _app_codec().encode(payload)
+
+
+def decode_token(token: str) -> Dict[str, Any]:
+    return _app_codec().decode(token)
@@ -0,0 +1,32 @@
+"""
+Signup input checks, shared by the auth routes and traffic capture.
+"""
+
+import re
+
+EMAIL_PATTERN = re.compile(r"^[^@]+@[^@]+\.[^@]+$")
+
+
+def is_valid_email(value: str) -> bool:
+    return EMAIL_PATTERN.match(value) is not None
+
+
+def is_strong_password(value: str) -> bool:
+    if len(value) < 8:
+        return False
+    # One pass over the characters, stopping once every class has been seen.
+    has_lower = has_upper = has_digit = has_special = False
+    for c in value:
+        if c.islower():
+            has_lower = True
+        elif c.isupper():
+            has_upper = True
+        elif c.isdigit():
+            has_digit = True
+        elif not c.isalnum():
+            has_special = True
+        else:
+            continue
+        if has_lower and has_upper and has_digit and has_special:
+            return True
+    return False
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks for the per-request auth primitives, against pinned baselines
+Run: python -m benchmarks.auth_hot_path                  # measure and compare
+     python -m benchmarks.auth_hot_path --check          # exit 1 on a regression
+     python -m benchmarks.auth_hot_path --update         # re-pin auth_hot_path.json
+
+Each case times one call in a tight loop and reports the best of --repeat
+runs in nanoseconds. "legacy" cases are the implementations the routes used
+before (an uncompiled regex, four passes over the password, PyJWT preparing
+the key on every call) and are kept as a reference, not checked.
+``get_user_id_from_token`` runs inside a request context on the memory
+backend, so it includes the blacklist lookup. Baselines are per machine:
+re-pin after moving the check to different hardware.
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import timeit
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import jwt
+
+BASELINES = Path(__file__).with_name("auth_hot_path.json")
+SECRET = "benchmark-secret-key-32-bytes-long"
+
+
+def legacy_is_valid_email(value):
+    pattern = r"^[^@]+@[^@]+\.[^@]+$"
+    return bool(re.match(pattern, value))
+
+
+def legacy_is_strong_password(value):
+    if len(value) < 8:
+        return False
+    has_lower = any(c.islower() for c in value)
+    has_upper = any(c.isupper() for c in value)
+    has_digit = any(c.isdigit() for c in value)
+    has_special = any(not c.isalnum() for c in value)
+    return has_lower and has_upper and has_digit and has_special
+
+
+def legacy_bearer_token(auth_header):
+    if not auth_header.startswith("Bearer "):
+        return None
+    return auth_header[7:].strip()
+
+
+def build_cases(app):
+    from auth.routes import get_user_id_from_token
+    from auth.validation import is_strong_password, is_valid_email
+    from auth.tokens import bearer_token, get_codec
+
+    codec = get_codec(SECRET, "HS256")
+    payload = {"user_id": "bench-user", "exp": datetime.utcnow() + timedelta(hours=1)}
+    token = codec.encode(payload)
+    header = f"Bearer {token}"
+    email = "someone.with.a.longer.address@example-domain.com"
+    password = "correct-Horse-battery-staple-9"
+
+    def user_id_from_token():
+        with app.test_request_context("/auth/me", headers={"Authorization": header}):
+            return get_user_id_from_token()
+
+    return {
+        "is_valid_email": lambda: is_valid_email(email),
+        "is_valid_email.legacy": lambda: legacy_is_valid_email(email),
+        "is_strong_password": lambda: is_strong_password(password),
+        "is_strong_password.legacy": lambda: legacy_is_strong_password(password),
+        "bearer_token": lambda: bearer_token(header),
+        "bearer_token.legacy": lambda: legacy_bearer_token(header),
+        "encode_token": lambda: codec.encode(payload),
+        "encode_token.legacy": lambda: jwt.encode(payload, SECRET, algorithm="HS256"),
+        "decode_token": lambda: codec.decode(token),
+        "decode_token.legacy": lambda: jwt.decode(token, SECRET, algorithms=["HS256"]),
+        "get_user_id_from_token": user_id_from_token,
+    }
+
+
+def measure(fn, repeat, min_seconds):
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    number = max(number, int(number * min_seconds / 0.2))
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-seconds", type=float, default=0.2, help="minimum time per repeat")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed slowdown over the baseline")
+    parser.add_argument("--check", action="store_true", help="exit 1 if a case is slower than its baseline")
+    parser.add_argument("--update", action="store_true", help=f"write the results to {BASELINES.name}")
+    parser.add_argument("cases", nargs="*", help="only run these cases")
+    args = parser.parse_args()
+
+    os.environ.update({"MONGO_BACKEND": "memory", "CATALOG_REFRESH_SECONDS": "0", "JWT_SECRET_KEY": SECRET})
+    import logging
+    logging.disable(logging.WARNING)
+
+    from app import create_app
+
+    app = create_app("production")
+    cases = build_cases(app)
+    selected = args.cases or list(cases)
+    unknown = [name for name in selected if name not in cases]
+    if unknown:
+        raise SystemExit(f"unknown cases: {', '.join(unknown)}")
+
+    baselines = json.loads(BASELINES.read_text()) if BASELINES.exists() else {}
+    results = {}
+    regressions = []
+    for name in selected:
+        ns = results[name] = measure(cases[name], args.repeat, args.min_seconds)
+        line = f"{name:<28} {ns:10.0f} ns"
+        pinned = baselines.get(name)
+        if pinned:
+            change = ns / pinned - 1
+            line += f"  baseline {pinned:8.0f} ns ({change:+6.1%})"
+            if not name.endswith(".legacy") and change > args.tolerance:
+                regressions.append(name)
+                line += "  REGRESSION"
+        if name.endswith(".legacy"):
+            current = results.get(name[: -len(".legacy")])
+            if current:
+                line += f"  {ns / current:4.1f}x current"
+        print(line)
+
+    if args.update:
+        baselines.update({name: round(ns, 1) for name, ns in results.items()})
+        BASELINES.write_text(json.dumps(dict(sorted(baselines.items())), indent=2) + "\n")
+        print(f"pinned {len(results)} baselines in {BASELINES}")
+    if args.check and regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Latency of each consistency tier
+Run: MONGO_URI=mongodb+srv://... python -m benchmarks.consistency [--ops 200]
+     python -m benchmarks.consistency --latency-ms 2 --replication-ms 3   # memory backend
+
+Reads and writes go through the same PolicyCollection wrapper the routes
+get from get_collection(), configured with one tier at a time. Against a
+cluster, writes go to a scratch collection that is dropped afterwards; tier
+differences only show up against a replica set, since a standalone server
+acks w=majority as fast as w=1. Without MONGO_URI the memory backend is
+used, with --latency-ms per command and --replication-ms added to majority
+writes as a model of the secondary round trip.
+
+Memory-backend numbers are a model, not a measurement: every tier costs the
+injected latency, majority writes add the injected replication delay, and
+read preference and read concern change nothing. They show which tiers pay
+for a majority ack, not what that ack costs on a real replica set.
+"""
+
+import argparse
+import os
+import statistics
+import time
+
+from pymongo import MongoClient
+
+from db.collections import TIERS, PolicyCollection
+from db.memory import MemoryClient
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def timed(fn, ops):
+    timings = []
+    for i in range(ops):
+        started = time.perf_counter()
+        fn(i)
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def report(label, timings):
+    print(
+        f"{label:<24} p50={percentile(timings, 50):8.2f}ms "
+        f"p99={percentile(timings, 99):8.2f}ms mean={statistics.mean(timings):8.2f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ops", type=int, default=200)
+    parser.add_argument("--collection", default="bench_consistency")
+    parser.add_argument("--latency-ms", type=float, default=2.0, help="memory backend only")
+    parser.add_argument("--replication-ms", type=float, default=3.0, help="memory backend only")
+    args = parser.parse_args()
+
+    uri = os.getenv("MONGO_URI")
+    if uri:
+        client = MongoClient(uri, serverSelectionTimeoutMS=5000)
+        print(f"cluster: {client.address}")
+    else:
+        client = MemoryClient(latency_ms=args.latency_ms, replication_ms=args.replication_ms)
+        print(
+            f"MODEL, not a measurement: memory backend with {args.latency_ms}ms per command, "
+            f"+{args.replication_ms}ms for w=majority; set MONGO_URI to a replica set for real numbers"
+        )
+    scratch = client.get_default_database()[args.collection]
+    scratch.drop()
+    scratch.insert_many([{"seq": i, "payload": "x" * 64} for i in range(args.ops)])
+    scratch.create_index("seq")
+
+    try:
+        for name, tier in TIERS.items():
+            collection = PolicyCollection(scratch, tier, tier)
+            writes = timed(lambda i: collection.insert_one({"tier": name, "seq": i}), args.ops)
+            reads = timed(lambda i: collection.find_one({"seq": i}), args.ops)
+            report(f"{name} write", writes)
+            report(f"{name} read", reads)
+    finally:
+        scratch.drop()
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Memory of /me/history/export against history size, on the memory backend
+Run: python -m benchmarks.history_export [--events 1000000] [--format ndjson]
+
+Seeds one synthetic user with --events watch events (plus a smaller run for
+comparison) and streams the export through the test client, measuring
+Python allocations with tracemalloc while the body streams. The stand-in
+sorts its matching documents when the cursor opens, which a real server
+does by walking the user_id/watched_at index; that step is reported
+separately as "cursor open".
+"""
+
+import argparse
+import os
+import random
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import jwt
+
+
+def seed(db, user_id, events, video_ids):
+    history = db["video_watch_history"]
+    started = datetime.utcnow() - timedelta(seconds=events)
+    rng = random.Random(events)
+    batch = []
+    for i in range(events):
+        batch.append({"user_id": user_id, "video_id": rng.choice(video_ids), "watched_at": started + timedelta(seconds=i)})
+        if len(batch) == 10000:
+            history.insert_many(batch)
+            batch = []
+    if batch:
+        history.insert_many(batch)
+
+
+def measure(app, token, fmt):
+    client = app.test_client()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    response = client.get(
+        f"/me/history/export?format={fmt}",
+        headers={"Authorization": f"Bearer {token}"},
+        buffered=False,
+    )
+    opened = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    streaming_base = opened[0]
+    rows = size = 0
+    for chunk in response.response:
+        size += len(chunk)
+        rows += chunk.count(b"\n") if isinstance(chunk, bytes) else chunk.count("\n")
+    response.close()
+    elapsed = time.perf_counter() - started
+    streaming_peak = tracemalloc.get_traced_memory()[1] - streaming_base
+    tracemalloc.stop()
+    return {
+        "status": response.status_code,
+        "rows": rows,
+        "bytes": size,
+        "seconds": elapsed,
+        "open_peak_kb": (opened[1] - baseline) / 1024,
+        "stream_peak_kb": streaming_peak / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=1000000)
+    parser.add_argument("--compare", type=int, default=10000, help="smaller history measured first")
+    parser.add_argument("--format", choices=["ndjson", "csv"], default="ndjson")
+    parser.add_argument("--videos", type=int, default=1000)
+    args = parser.parse_args()
+
+    os.environ.update({"MONGO_BACKEND": "memory", "CATALOG_REFRESH_SECONDS": "0", "ADMISSION_ENABLED": "false"})
+    import logging
+    logging.disable(logging.WARNING)
+
+    from app import create_app
+    from db.mongo import get_db_client
+
+    app = create_app("production")
+    db = get_db_client().get_default_database()
+    video_ids = [str(_id) for _id in db["videos"].insert_many(
+        [{"title": f"Synthetic video {i}", "is_active": True} for i in range(args.videos)]
+    ).inserted_ids]
+    app.extensions["catalog"].refresh(db["videos"])
+
+    secret = app.config.get("JWT_SECRET_KEY")
+    algorithm = app.config.get("JWT_ALGORITHM", "HS256")
+    for events in (args.compare, args.events):
+        user_id = f"bench-user-{events}"
+        seed(db, user_id, events, video_ids)
+        token = jwt.encode({"user_id": user_id, "exp": datetime.utcnow() + timedelta(hours=1)}, secret,
+                           algorithm=algorithm)
+        result = measure(app, token, args.format)
+        print(
+            f"{events:>9} events: status={result['status']} rows={result['rows'] - (args.format == 'csv')} "
+            f"{result['bytes'] / 1e6:8.1f} MB in {result['seconds']:6.2f}s  "
+            f"streaming peak={result['stream_peak_kb']:8.1f} KB  cursor open={result['open_peak_kb']:10.1f} KB"
+        )
+
+
+if __name__ == "__main__":
+    main()
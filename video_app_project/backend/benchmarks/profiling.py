@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Per-request overhead of the sampling profiler when a request is not profiled
+Run: python -m benchmarks.profiling [--path /dashboard] [--requests 5000]
+
+Whole-request timings on a shared machine vary by far more than the 1%
+being measured, so the profiler's own work is timed directly instead, with
+timeit (best of --repeat): Flask's before/after/teardown cycle with the
+profiler's hook attached against the same cycle with it detached, plus
+the command listener's calls multiplied by the number of Mongo commands the
+endpoint issues. That sum is compared with the median time of a full
+request through the test client on the memory backend. A profiled request
+(signed X-Profile-Token) is timed for reference.
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+import timeit
+
+from pymongo import monitoring
+
+SECRET = "benchmark-profiling-secret"
+
+
+class ProfilerSwitch:
+    """Attach or detach the request hooks init_profiling registered on ``app``."""
+
+    def __init__(self, app):
+        self.hooks = [
+            (registry[None], func)
+            for registry in (app.before_request_funcs, app.after_request_funcs, app.teardown_request_funcs)
+            for func in registry.get(None, [])
+            if func.__module__ == "middleware.profiling"
+        ]
+
+    def set(self, enabled):
+        for registry, func in self.hooks:
+            if enabled and func not in registry:
+                registry.append(func)
+            elif not enabled and func in registry:
+                registry.remove(func)
+
+
+class CommandCounter(monitoring.CommandListener):
+    def __init__(self):
+        self.count = 0
+
+    def started(self, event):
+        self.count += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def best(fn, repeat, number=20000):
+    return min(timeit.repeat(fn, repeat=repeat, number=number)) / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", default="/dashboard")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=7)
+    args = parser.parse_args()
+
+    os.environ.update({
+        "MONGO_BACKEND": "memory",
+        "CATALOG_REFRESH_SECONDS": "0",
+        "ADMISSION_ENABLED": "false",
+        "PROFILING_ENABLED": "true",
+        "PROFILING_SECRET": SECRET,
+        "PROFILING_SPOOL_DIR": tempfile.mkdtemp(prefix="bench-profiles-"),
+    })
+    import logging
+    logging.disable(logging.WARNING)
+
+    from app import create_app
+    from db.memory import CommandEvent
+    from db.mongo import get_db_client
+    from middleware.profiling import PROFILE_HEADER, ProfilingCommandListener, sign_profile_token
+
+    app = create_app("production")
+    db_client = get_db_client()
+    db_client.get_default_database()["videos"].insert_many(
+        [{"title": f"video {i}", "is_active": True} for i in range(50)]
+    )
+    switch = ProfilerSwitch(app)
+    listener = next(item for item in db_client._listeners if isinstance(item, ProfilingCommandListener))
+    if not switch.hooks:
+        raise SystemExit("profiling hooks not found; is PROFILING_ENABLED honoured?")
+
+    client = app.test_client()
+    counter = CommandCounter()
+    db_client._listeners.append(counter)
+    client.get(args.path)
+    db_client._listeners.remove(counter)
+
+    timings = []
+    for _ in range(args.requests):
+        started = time.perf_counter()
+        client.get(args.path)
+        timings.append((time.perf_counter() - started) * 1e6)
+    request_us = statistics.median(timings)
+
+    with app.test_request_context(args.path):
+        response = app.response_class()
+
+        def cycle():
+            app.preprocess_request()
+            app.process_response(response)
+            app.do_teardown_request()
+
+        switch.set(False)
+        detached = best(cycle, args.repeat)
+        switch.set(True)
+        attached = best(cycle, args.repeat)
+
+    event = CommandEvent("aggregate")
+
+    def listen():
+        listener.started(event)
+        listener.succeeded(event)
+
+    per_command = best(listen, args.repeat)
+    hooks_us = attached - detached
+    overhead = hooks_us + per_command * counter.count
+    profiled = statistics.median(
+        _timed(client, args.path, {PROFILE_HEADER: sign_profile_token(SECRET)}) for _ in range(50)
+    )
+
+    print(f"GET {args.path}: median {request_us:8.1f} us over {args.requests} requests, "
+          f"{counter.count} Mongo command(s)")
+    print(f"request hook              {hooks_us:8.2f} us  (cycle {detached:.2f} -> {attached:.2f} us)")
+    print(f"command listener          {per_command:8.2f} us x {counter.count}")
+    print(f"not-selected overhead     {overhead:8.2f} us  ({overhead / request_us:.2%} of a request)")
+    print(f"profiled request          {profiled:8.1f} us")
+
+
+def _timed(client, path, headers):
+    started = time.perf_counter()
+    client.get(path, headers=headers)
+    return (time.perf_counter() - started) * 1e6
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Search index benchmark on a synthetic catalog
+Run: python -m benchmarks.search [--docs 1000000] [--queries 2000]
+
+Latency is reported for all queries and separately for whole-word queries and
+typed-prefix queries, whose last word is cut to half its length.
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+from video.search_index import SearchIndex
+
+
+def synthetic_vocabulary(size, rng):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(letters) for _ in range(rng.randint(3, 10))))
+    return sorted(words)
+
+
+def zipf_sampler(vocabulary, rng, exponent=1.1):
+    weights = [1 / (rank ** exponent) for rank in range(1, len(vocabulary) + 1)]
+    cumulative = []
+    total = 0.0
+    for weight in weights:
+        total += weight
+        cumulative.append(total)
+
+    def sample(k):
+        return rng.choices(vocabulary, cum_weights=cumulative, k=k)
+
+    return sample
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--docs", type=int, default=1_000_000)
+    parser.add_argument("--vocabulary", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    vocabulary = synthetic_vocabulary(args.vocabulary, rng)
+    sample = zipf_sampler(vocabulary, rng)
+
+    index = SearchIndex()
+    started = time.perf_counter()
+    for ordinal in range(args.docs):
+        title = " ".join(sample(rng.randint(3, 8)))
+        description = " ".join(sample(rng.randint(8, 25)))
+        index.add(ordinal, title, description)
+    build_seconds = time.perf_counter() - started
+    print(f"built {args.docs} docs in {build_seconds:.1f}s: {index.stats()}")
+
+    # Queries draw from the same distribution, so common words show up as
+    # often as they would in real traffic; a third are typed-prefix queries.
+    queries = []
+    for _ in range(args.queries):
+        words = sample(rng.randint(1, 3))
+        typed = rng.random() < 0.33
+        if typed:
+            words[-1] = words[-1][: max(2, len(words[-1]) // 2)]
+        queries.append((" ".join(words), typed))
+
+    timings = {"word": [], "prefix": []}
+    for query, typed in queries:
+        started = time.perf_counter()
+        index.search(query, limit=10)
+        timings["prefix" if typed else "word"].append((time.perf_counter() - started) * 1000)
+
+    timings["all"] = timings["word"] + timings["prefix"]
+    for kind in ("all", "word", "prefix"):
+        values = timings[kind]
+        print(
+            f"{kind:<6} query latency ms: "
+            f"p50={percentile(values, 50):.3f} "
+            f"p95={percentile(values, 95):.3f} "
+            f"p99={percentile(values, 99):.3f} "
+            f"mean={statistics.mean(values):.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
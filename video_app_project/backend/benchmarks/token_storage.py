@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Index size and lookup latency: full JWT string keys vs 16-byte token_hash
+Run: MONGO_URI=mongodb://localhost:27017/bench python -m benchmarks.token_storage [--tokens 100000]
+     python -m benchmarks.token_storage --tokens 100000          # SQLite estimate
+
+Builds two scratch collections holding the same tokens, one keyed on the
+token string and one on token_digest(), and drops both afterwards. Without
+MONGO_URI the same comparison runs on two SQLite indexes in memory: a
+different B-tree (no prefix compression, so string keys look somewhat
+worse than under WiredTiger) but the same key sizes and page fan-out.
+
+SQLite numbers are an estimate of the ratio between the two key layouts,
+not MongoDB index sizes: the index bytes come from SQLite's dbstat, and the
+lookups are in-process, with no network or server time. Any mongod,
+including a local one, gives the real collStats/indexSizes figures.
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import time
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import jwt
+from pymongo import MongoClient
+
+from auth.tokens import token_digest
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def make_tokens(count):
+    expiry = datetime.utcnow() + timedelta(hours=24)
+    return [
+        jwt.encode({"user_id": str(uuid4()), "exp": expiry}, "benchmark-secret-key-32-bytes-long", algorithm="HS256")
+        for _ in range(count)
+    ]
+
+
+def load(collection, docs, batch_size=5000):
+    for start in range(0, len(docs), batch_size):
+        collection.insert_many(docs[start:start + batch_size], ordered=False)
+
+
+def measure(db, collection, field, keys, lookups):
+    stats = db.command("collStats", collection.name)
+    index_bytes = stats["indexSizes"].get(f"{field}_1", 0)
+    timings = []
+    for key in random.sample(keys, lookups):
+        started = time.perf_counter()
+        collection.find_one({field: key}, {"_id": 1})
+        timings.append((time.perf_counter() - started) * 1000)
+    print(
+        f"{field:<11} index={index_bytes / 1024 / 1024:8.2f} MiB "
+        f"lookup p50={percentile(timings, 50):.3f}ms p99={percentile(timings, 99):.3f}ms "
+        f"mean={statistics.mean(timings):.3f}ms"
+    )
+
+
+def measure_sqlite(tokens, digests, lookups):
+    db = sqlite3.connect(":memory:")
+    db.execute("CREATE TABLE by_string (token TEXT, expires_at INTEGER)")
+    db.execute("CREATE TABLE by_hash (token_hash BLOB, expires_at INTEGER)")
+    db.executemany("INSERT INTO by_string VALUES (?, 0)", ((t,) for t in tokens))
+    db.executemany("INSERT INTO by_hash VALUES (?, 0)", ((bytes(d),) for d in digests))
+    db.execute("CREATE UNIQUE INDEX token_1 ON by_string (token)")
+    db.execute("CREATE UNIQUE INDEX token_hash_1 ON by_hash (token_hash)")
+    for table, field, keys in (("by_string", "token", tokens), ("by_hash", "token_hash", [bytes(d) for d in digests])):
+        index_bytes = db.execute("SELECT SUM(pgsize) FROM dbstat WHERE name = ?", (f"{field}_1",)).fetchone()[0]
+        timings = []
+        for key in random.sample(keys, lookups):
+            started = time.perf_counter()
+            db.execute(f"SELECT rowid FROM {table} WHERE {field} = ?", (key,)).fetchone()
+            timings.append((time.perf_counter() - started) * 1000)
+        print(
+            f"{field:<11} index={index_bytes / 1024 / 1024:8.2f} MiB ({index_bytes / len(keys):5.1f} B/key) "
+            f"lookup p50={percentile(timings, 50) * 1000:.1f}us p99={percentile(timings, 99) * 1000:.1f}us"
+        )
+    db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tokens", type=int, default=100_000)
+    parser.add_argument("--lookups", type=int, default=2000)
+    args = parser.parse_args()
+
+    tokens = make_tokens(args.tokens)
+    digests = [token_digest(token) for token in tokens]
+    print(f"average token length: {statistics.mean(len(t) for t in tokens):.0f} bytes")
+    lookups = min(args.lookups, args.tokens)
+
+    uri = os.getenv("MONGO_URI")
+    if not uri:
+        print("ESTIMATE, not MongoDB: no MONGO_URI, so SQLite B-tree index sizes and in-process lookups")
+        measure_sqlite(tokens, digests, lookups)
+        return
+
+    client = MongoClient(uri, serverSelectionTimeoutMS=5000)
+    db = client.get_default_database()
+    expires_at = datetime.utcnow() + timedelta(hours=24)
+
+    by_string = db["bench_tokens_string"]
+    by_hash = db["bench_tokens_hash"]
+    try:
+        for collection in (by_string, by_hash):
+            collection.drop()
+        by_string.create_index("token", unique=True)
+        by_hash.create_index("token_hash", unique=True)
+        load(by_string, [{"token": t, "expires_at": expires_at} for t in tokens])
+        load(by_hash, [{"token_hash": d, "expires_at": expires_at} for d in digests])
+
+        measure(db, by_string, "token", tokens, lookups)
+        measure(db, by_hash, "token_hash", digests, lookups)
+    finally:
+        by_string.drop()
+        by_hash.drop()
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -12,6 +12,105 @@ class BaseConfig:
     JWT_ALGORITHM: str = os.getenv("JWT_ALGORITHM", "HS256")
 
     MONGO_URI: str = os.getenv("MONGO_URI", "mongodb://localhost:27017/mobile_api")
+    # "atlas" connects to the cluster; "memory" uses the in-process stand-in
+    MONGO_BACKEND: str = os.getenv("MONGO_BACKEND", "atlas")
+    MONGO_LATENCY_MS: float = float(os.getenv("MONGO_LATENCY_MS", "0"))
+    MONGO_JITTER_MS: float = float(os.getenv("MONGO_JITTER_MS", "0"))
+    # Extra wait the memory backend adds to w="majority" writes
+    MONGO_REPLICATION_MS: float = float(os.getenv("MONGO_REPLICATION_MS", "0"))
+
+    # Admission control in front of the Mongo pool
+    ADMISSION_ENABLED: bool = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+    ADMISSION_MAX_CONCURRENCY: int = int(os.getenv("ADMISSION_MAX_CONCURRENCY", "32"))
+    ADMISSION_MAX_QUEUE: int = int(os.getenv("ADMISSION_MAX_QUEUE", "128"))
+    # Longest a request may wait for a slot while the queue is healthy
+    ADMISSION_QUEUE_TIMEOUT_MS: int = int(os.getenv("ADMISSION_QUEUE_TIMEOUT_MS", "2000"))
+    # Queue time the controller tries to hold; sustained waits above it mean overload
+    ADMISSION_TARGET_QUEUE_MS: int = int(os.getenv("ADMISSION_TARGET_QUEUE_MS", "50"))
+    ADMISSION_INTERVAL_MS: int = int(os.getenv("ADMISSION_INTERVAL_MS", "500"))
+    # "endpoint=limit" pairs, comma separated
+    ADMISSION_ENDPOINT_LIMITS: str = os.getenv(
+        "ADMISSION_ENDPOINT_LIMITS",
+        "auth.signup=4,auth.login=8,history.export_history=2",
+    )
+    # "endpoint=priority" pairs, lower runs first; unlisted endpoints get 1
+    ADMISSION_PRIORITIES: str = os.getenv(
+        "ADMISSION_PRIORITIES",
+        "video.stream_video=0,dashboard.get_dashboard=0,auth.signup=2",
+    )
+
+    # Circuit breaker around database access
+    BREAKER_ENABLED: bool = os.getenv("BREAKER_ENABLED", "true").lower() == "true"
+    BREAKER_FAILURE_THRESHOLD: int = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+    # Calls slower than this count as failures
+    BREAKER_LATENCY_THRESHOLD_MS: float = float(os.getenv("BREAKER_LATENCY_THRESHOLD_MS", "1000"))
+    BREAKER_OPEN_SECONDS: float = float(os.getenv("BREAKER_OPEN_SECONDS", "10"))
+    BREAKER_HALF_OPEN_PROBES: int = int(os.getenv("BREAKER_HALF_OPEN_PROBES", "1"))
+    BREAKER_PROFILE_CACHE_SIZE: int = int(os.getenv("BREAKER_PROFILE_CACHE_SIZE", "1024"))
+    # Accept signature-valid tokens when the blacklist cannot be reached. Off by
+    # default: a logged-out or stolen token works again for the whole outage.
+    BREAKER_ALLOW_STALE_AUTH: bool = os.getenv("BREAKER_ALLOW_STALE_AUTH", "false").lower() == "true"
+
+    # Per-request sampling profiler
+    PROFILING_ENABLED: bool = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+    # HMAC key for X-Profile-Token; without it the header is ignored
+    PROFILING_SECRET: str = os.getenv("PROFILING_SECRET", "")
+    # Profile every Nth request; 0 profiles only signed requests
+    PROFILING_SAMPLE_EVERY: int = int(os.getenv("PROFILING_SAMPLE_EVERY", "0"))
+    PROFILING_INTERVAL_MS: float = float(os.getenv("PROFILING_INTERVAL_MS", "2"))
+    PROFILING_SPOOL_DIR: str = os.getenv("PROFILING_SPOOL_DIR", "profiles")
+    PROFILING_SPOOL_MAX_FILES: int = int(os.getenv("PROFILING_SPOOL_MAX_FILES", "50"))
+
+    # In-process video catalog and search index
+    CATALOG_REFRESH_SECONDS: float = float(os.getenv("CATALOG_REFRESH_SECONDS", "30"))
+    CATALOG_RECONCILE_EVERY: int = int(os.getenv("CATALOG_RECONCILE_EVERY", "10"))
+    SEARCH_BM25_K1: float = float(os.getenv("SEARCH_BM25_K1", "1.2"))
+    SEARCH_BM25_B: float = float(os.getenv("SEARCH_BM25_B", "0.75"))
+    # A typed prefix expands to its most frequent completions; shorter prefixes match whole words only
+    SEARCH_MAX_PREFIX_TERMS: int = int(os.getenv("SEARCH_MAX_PREFIX_TERMS", "8"))
+    SEARCH_MIN_PREFIX_LENGTH: int = int(os.getenv("SEARCH_MIN_PREFIX_LENGTH", "3"))
+    # Postings a single query may walk; longer lists only re-score leaders
+    SEARCH_MAX_POSTINGS_SCAN: int = int(os.getenv("SEARCH_MAX_POSTINGS_SCAN", "512"))
+
+    # "random" samples active videos; "unwatched" prefers videos the signed-in user has not watched
+    DASHBOARD_MODE: str = os.getenv("DASHBOARD_MODE", "random")
+    DASHBOARD_SAMPLE_SIZE: int = int(os.getenv("DASHBOARD_SAMPLE_SIZE", "2"))
+    # Users whose watched-video bitmaps stay cached; each costs catalog_size / 8 bytes
+    WATCH_SET_CACHE_SIZE: int = int(os.getenv("WATCH_SET_CACHE_SIZE", "10000"))
+
+    # Local thumbnail proxy
+    THUMBNAIL_CACHE_DIR: str = os.getenv("THUMBNAIL_CACHE_DIR", "thumbnail_cache")
+    # Origin URL template with {video_id}/{youtube_id}; empty uses each video's thumbnail_url
+    THUMBNAIL_ORIGIN_URL: str = os.getenv("THUMBNAIL_ORIGIN_URL", "")
+    THUMBNAIL_ORIGIN_TIMEOUT_SECONDS: float = float(os.getenv("THUMBNAIL_ORIGIN_TIMEOUT_SECONDS", "5"))
+    THUMBNAIL_WIDTHS: str = os.getenv("THUMBNAIL_WIDTHS", "160,320,480,640")
+    THUMBNAIL_MAX_AGE_SECONDS: int = int(os.getenv("THUMBNAIL_MAX_AGE_SECONDS", "86400"))
+    # Point dashboard thumbnail_url at the proxy instead of the origin
+    THUMBNAIL_PROXY_ENABLED: bool = os.getenv("THUMBNAIL_PROXY_ENABLED", "false").lower() == "true"
+    THUMBNAIL_DASHBOARD_WIDTH: int = int(os.getenv("THUMBNAIL_DASHBOARD_WIDTH", "320"))
+
+    # Traffic capture for replay_traffic.py
+    CAPTURE_ENABLED: bool = os.getenv("CAPTURE_ENABLED", "false").lower() == "true"
+    CAPTURE_FILE: str = os.getenv("CAPTURE_FILE", "captures/traffic.ndjson")
+    # Key for identity pseudonyms; set it to link users across processes
+    CAPTURE_SECRET: str = os.getenv("CAPTURE_SECRET", "")
+    CAPTURE_SAMPLE_EVERY: int = int(os.getenv("CAPTURE_SAMPLE_EVERY", "1"))
+    CAPTURE_MAX_BYTES: int = int(os.getenv("CAPTURE_MAX_BYTES", str(100 * 1024 * 1024)))
+
+    # Bloom filter of registered emails; with several processes, a new user can
+    # be rejected by the others for up to EMAIL_FILTER_REFRESH_SECONDS
+    EMAIL_FILTER_ENABLED: bool = os.getenv("EMAIL_FILTER_ENABLED", "false").lower() == "true"
+    EMAIL_FILTER_CAPACITY: int = int(os.getenv("EMAIL_FILTER_CAPACITY", "1000000"))
+    EMAIL_FILTER_FP_RATE: float = float(os.getenv("EMAIL_FILTER_FP_RATE", "0.001"))
+    EMAIL_FILTER_REFRESH_SECONDS: float = float(os.getenv("EMAIL_FILTER_REFRESH_SECONDS", "2"))
+    EMAIL_FILTER_REBUILD_SECONDS: float = float(os.getenv("EMAIL_FILTER_REBUILD_SECONDS", "3600"))
+
+    # Comma-separated user_ids allowed to read the global /analytics stats
+    ANALYTICS_ADMIN_USER_IDS: str = os.getenv("ANALYTICS_ADMIN_USER_IDS", "")
+
+    # Watch-history export: cursor batch size and rows per response chunk
+    HISTORY_EXPORT_BATCH_SIZE: int = int(os.getenv("HISTORY_EXPORT_BATCH_SIZE", "1000"))
+    HISTORY_EXPORT_ROWS_PER_CHUNK: int = int(os.getenv("HISTORY_EXPORT_ROWS_PER_CHUNK", "500"))
 
     DEBUG: bool = False
     TESTING: bool = False
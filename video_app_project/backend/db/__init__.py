@@ -1,3 +1,11 @@
-from .mongo import init_db, get_db_client
+from .mongo import init_db, get_db_client, get_breaker, check_breaker, add_command_listener
+from .collections import get_collection
 
-__all__ = ["init_db", "get_db_client"]
\ No newline at end of file
+__all__ = [
+    "init_db",
+    "get_db_client",
+    "get_breaker",
+    "check_breaker",
+    "add_command_listener",
+    "get_collection",
+]
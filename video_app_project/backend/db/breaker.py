@@ -0,0 +1,203 @@
+"""
+Circuit breaker around database access.
+
+Outcomes are fed in by pymongo monitoring only, so each failure is counted
+once: ``BreakerCommandListener`` sees commands that fail or run slow on an
+established connection, and ``BreakerHeartbeatListener`` sees an unreachable
+cluster, where server selection fails before any command starts. After
+``failure_threshold`` consecutive failures the breaker opens and every
+database operation started through ``get_collection()`` raises
+``DatabaseUnavailable`` immediately instead of waiting for
+serverSelectionTimeoutMS. After ``open_seconds`` one probe operation is let
+through (half-open); its outcome closes or re-opens the breaker. Background
+refreshers check with ``probe=False``: they fail fast until the breaker is
+closed and never take the probe from a request.
+
+Commands tagged with ``SCAN_COMMENT`` (reads in the reporting and
+primary_scan tiers) are long scans by design; their duration is not held
+against the latency threshold, only their errors count.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional, Set
+
+from pymongo import monitoring
+from pymongo.errors import ConnectionFailure
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+NETWORK_ERROR_TYPES = {
+    "AutoReconnect",
+    "ConnectionFailure",
+    "NetworkTimeout",
+    "NotPrimaryError",
+    "ServerSelectionTimeoutError",
+}
+
+
+# Comment the scan tiers attach to their reads, so the breaker can tell them apart.
+SCAN_COMMENT = "scan"
+
+
+class DatabaseUnavailable(ConnectionFailure):
+    def __init__(self, retry_after: int):
+        super().__init__("database circuit breaker is open")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        latency_threshold_ms: float = 1000.0,
+        open_seconds: float = 10.0,
+        half_open_probes: int = 1,
+    ):
+        self.failure_threshold = failure_threshold
+        self.latency_threshold = latency_threshold_ms / 1000.0
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes: list[float] = []
+        self.transitions: Dict[str, int] = {}
+        self.rejected = 0
+
+    @classmethod
+    def from_config(cls, config: dict) -> "CircuitBreaker":
+        return cls(
+            failure_threshold=config.get("BREAKER_FAILURE_THRESHOLD", 5),
+            latency_threshold_ms=config.get("BREAKER_LATENCY_THRESHOLD_MS", 1000.0),
+            open_seconds=config.get("BREAKER_OPEN_SECONDS", 10.0),
+            half_open_probes=config.get("BREAKER_HALF_OPEN_PROBES", 1),
+        )
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def _transition(self, state: str) -> None:
+        key = f"{self._state}->{state}"
+        self.transitions[key] = self.transitions.get(key, 0) + 1
+        logger.warning("db_breaker_transition", extra={"transition": key, "failures": self._failures})
+        self._state = state
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+            self._probes = []
+        elif state == CLOSED:
+            self._failures = 0
+            self._probes = []
+
+    def retry_after(self) -> int:
+        remaining = self.open_seconds - (time.monotonic() - self._opened_at)
+        return max(1, int(remaining + 0.999))
+
+    def allow(self, probe: bool = True) -> bool:
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if not probe:
+                self.rejected += 1
+                return False
+            now = time.monotonic()
+            if self._state == OPEN:
+                if now - self._opened_at < self.open_seconds:
+                    self.rejected += 1
+                    return False
+                self._transition(HALF_OPEN)
+            # A probe that never reported back is written off after open_seconds.
+            self._probes = [t for t in self._probes if now - t < self.open_seconds]
+            if len(self._probes) < self.half_open_probes:
+                self._probes.append(now)
+                return True
+            self.rejected += 1
+            return False
+
+    def check(self, probe: bool = True) -> None:
+        if not self.allow(probe):
+            raise DatabaseUnavailable(self.retry_after())
+
+    def record_success(self, duration: float) -> None:
+        if duration > self.latency_threshold:
+            self.record_failure()
+            return
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._transition(CLOSED)
+            elif self._state == CLOSED:
+                self._failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._transition(OPEN)
+            elif self._state == CLOSED:
+                self._failures += 1
+                if self._failures >= self.failure_threshold:
+                    self._transition(OPEN)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "state": self._state,
+                "consecutive_failures": self._failures,
+                "rejected": self.rejected,
+                "transitions": dict(self.transitions),
+            }
+
+
+class BreakerCommandListener(monitoring.CommandListener):
+    def __init__(self, breaker: CircuitBreaker):
+        self.breaker = breaker
+        # request_ids of scan commands in flight; getMores carry the comment too.
+        self._scans: Set[int] = set()
+
+    def _duration(self, event: Any) -> float:
+        if event.request_id in self._scans:
+            self._scans.discard(event.request_id)
+            return 0.0
+        return event.duration_micros / 1_000_000
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        if event.command.get("comment") == SCAN_COMMENT:
+            self._scans.add(event.request_id)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self.breaker.record_success(self._duration(event))
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        # Server-side errors (duplicate keys, bad queries) still mean the
+        # database answered; only network-level failures trip the breaker.
+        duration = self._duration(event)
+        failure: Optional[dict] = event.failure
+        if failure and failure.get("errtype") in NETWORK_ERROR_TYPES:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success(duration)
+
+
+class BreakerHeartbeatListener(monitoring.ServerHeartbeatListener):
+    """Count failed heartbeats; server selection retries them while the cluster is unreachable."""
+
+    def __init__(self, breaker: CircuitBreaker):
+        self.breaker = breaker
+
+    def started(self, event: monitoring.ServerHeartbeatStartedEvent) -> None:
+        pass
+
+    def succeeded(self, event: monitoring.ServerHeartbeatSucceededEvent) -> None:
+        pass
+
+    def failed(self, event: monitoring.ServerHeartbeatFailedEvent) -> None:
+        self.breaker.record_failure()
@@ -0,0 +1,199 @@
+"""
+Per-collection consistency policy.
+
+Routes get collections through ``get_collection(name)`` instead of
+``get_default_database()[name]``. The returned wrapper sends reads and
+writes to copies of the collection configured with the read and write tier
+declared for it in ``POLICIES``, and applies the tier's maxTimeMS to reads.
+Each operation on the wrapper, not each ``get_collection`` call, checks the
+circuit breaker once; wrappers fetched with ``background=True`` fail fast
+while it is not closed instead of taking the half-open probe.
+
+Tiers:
+
+- ``durable``: majority write concern, primary reads with majority read
+  concern. Account and token state that must survive a failover.
+- ``primary``: primary reads with local read concern. Read-your-writes
+  lookups (login, blacklist, rate limit) that must not see a lagging secondary.
+- ``catalog``: secondaryPreferred reads. The video catalog changes rarely and
+  may be served slightly stale.
+- ``reporting``: secondaryPreferred reads with a long time limit, for
+  one-off scans (exports) that should stay off the primary.
+- ``primary_scan``: primary reads with the same long time limit, for readers
+  that advance a checkpoint (catalog and email-filter refresh, rollups). A
+  lagging secondary could return rows past a write it has not applied yet,
+  and the checkpoint would then move past that write for good.
+- ``fast_write``: w=1 without journal wait. Append-only analytics events
+  where losing a write on failover is acceptable.
+
+``python -m benchmarks.consistency`` measures the latency of each tier.
+"""
+
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from pymongo import ReadPreference
+from pymongo.read_concern import ReadConcern
+from pymongo.write_concern import WriteConcern
+
+from db.breaker import SCAN_COMMENT
+from db.mongo import check_breaker, get_db_client
+
+
+@dataclass(frozen=True)
+class ConsistencyTier:
+    write_concern: WriteConcern
+    read_preference: Any
+    read_concern: ReadConcern
+    max_time_ms: Optional[int] = None
+    # Long scans by design: reads carry SCAN_COMMENT and their duration does
+    # not count against the breaker's latency threshold.
+    scan: bool = False
+
+
+TIERS: Dict[str, ConsistencyTier] = {
+    "durable": ConsistencyTier(
+        WriteConcern(w="majority", wtimeout=5000), ReadPreference.PRIMARY, ReadConcern("majority"), 3000
+    ),
+    "primary": ConsistencyTier(
+        WriteConcern(w="majority", wtimeout=5000), ReadPreference.PRIMARY, ReadConcern("local"), 2000
+    ),
+    "catalog": ConsistencyTier(
+        WriteConcern(w="majority", wtimeout=5000), ReadPreference.SECONDARY_PREFERRED, ReadConcern("local"), 1000
+    ),
+    "reporting": ConsistencyTier(
+        WriteConcern(w=1), ReadPreference.SECONDARY_PREFERRED, ReadConcern("local"), 30000, scan=True
+    ),
+    "primary_scan": ConsistencyTier(
+        WriteConcern(w="majority", wtimeout=5000), ReadPreference.PRIMARY, ReadConcern("local"), 30000, scan=True
+    ),
+    "fast_write": ConsistencyTier(
+        WriteConcern(w=1, j=False), ReadPreference.PRIMARY, ReadConcern("local"), 2000
+    ),
+}
+
+
+@dataclass(frozen=True)
+class CollectionPolicy:
+    read: str
+    write: str
+
+
+DEFAULT_POLICY = CollectionPolicy(read="primary", write="durable")
+
+POLICIES: Dict[str, CollectionPolicy] = {
+    "users": CollectionPolicy(read="primary", write="durable"),
+    "token_blacklist": CollectionPolicy(read="primary", write="durable"),
+    "refresh_tokens": CollectionPolicy(read="primary", write="durable"),
+    "videos": CollectionPolicy(read="catalog", write="durable"),
+    "login_attempts": CollectionPolicy(read="primary", write="fast_write"),
+    "video_watch_history": CollectionPolicy(read="reporting", write="fast_write"),
+    "rollup_checkpoints": CollectionPolicy(read="primary", write="durable"),
+    "rollup_hourly": CollectionPolicy(read="catalog", write="durable"),
+    "rollup_daily": CollectionPolicy(read="catalog", write="durable"),
+    "rollup_video_daily": CollectionPolicy(read="catalog", write="durable"),
+}
+
+READ_METHODS = {"find", "find_one", "count_documents", "aggregate", "distinct", "estimated_document_count"}
+WRITE_METHODS = {
+    "insert_one",
+    "insert_many",
+    "update_one",
+    "update_many",
+    "replace_one",
+    "delete_one",
+    "delete_many",
+    "bulk_write",
+    "find_one_and_update",
+    "find_one_and_delete",
+}
+
+
+def _configure(collection: Any, tier: ConsistencyTier) -> Any:
+    return collection.with_options(
+        write_concern=tier.write_concern,
+        read_preference=tier.read_preference,
+        read_concern=tier.read_concern,
+    )
+
+
+class PolicyCollection:
+    def __init__(self, collection: Any, read_tier: ConsistencyTier, write_tier: ConsistencyTier,
+                 background: bool = False):
+        self.name = collection.name
+        self.read_tier = read_tier
+        self.write_tier = write_tier
+        self.background = background
+        self._reader = _configure(collection, read_tier)
+        self._writer = _configure(collection, write_tier)
+
+    def _read_options(self, kwargs: Dict[str, Any], max_time_key: str) -> Dict[str, Any]:
+        check_breaker(probe=not self.background)
+        if self.read_tier.max_time_ms:
+            kwargs.setdefault(max_time_key, self.read_tier.max_time_ms)
+        if self.read_tier.scan:
+            kwargs.setdefault("comment", SCAN_COMMENT)
+        return kwargs
+
+    def find(self, *args: Any, **kwargs: Any) -> Any:
+        return self._reader.find(*args, **self._read_options(kwargs, "max_time_ms"))
+
+    def find_one(self, *args: Any, **kwargs: Any) -> Any:
+        return self._reader.find_one(*args, **self._read_options(kwargs, "max_time_ms"))
+
+    def count_documents(self, *args: Any, **kwargs: Any) -> int:
+        return self._reader.count_documents(*args, **self._read_options(kwargs, "maxTimeMS"))
+
+    def aggregate(self, *args: Any, **kwargs: Any) -> Any:
+        return self._reader.aggregate(*args, **self._read_options(kwargs, "maxTimeMS"))
+
+    def _checked(self, method: Any) -> Any:
+        def call(*args: Any, **kwargs: Any) -> Any:
+            check_breaker(probe=not self.background)
+            return method(*args, **kwargs)
+
+        return call
+
+    def __getattr__(self, name: str) -> Any:
+        if name in READ_METHODS:
+            return self._checked(getattr(self._reader, name))
+        if name in WRITE_METHODS:
+            return self._checked(getattr(self._writer, name))
+        # Index management and everything else runs with write settings.
+        return getattr(self._writer, name)
+
+
+# Wrappers for the live client only, checked by identity: MongoClient
+# compares equal by address, and cached collections hold their client, so a
+# dict (or WeakKeyDictionary) keyed on clients would keep replaced ones alive.
+_cache: Tuple[Any, Dict[Tuple[str, str, str, bool], PolicyCollection]] = (None, {})
+_cache_lock = threading.Lock()
+
+
+def get_collection(name: str, read: Optional[str] = None, write: Optional[str] = None,
+                   background: bool = False) -> PolicyCollection:
+    """
+    Return ``name`` wrapped with its declared tiers; ``read``/``write`` override
+    them by tier name. Pass ``background=True`` from refresher threads.
+    """
+    global _cache
+    client = get_db_client()
+    policy = POLICIES.get(name, DEFAULT_POLICY)
+    read_name = read or policy.read
+    write_name = write or policy.write
+    key = (name, read_name, write_name, background)
+    owner, wrappers = _cache
+    if owner is client:
+        cached = wrappers.get(key)
+        if cached is not None:
+            return cached
+    with _cache_lock:
+        if _cache[0] is not client:
+            _cache = (client, {})
+        collection = client.get_default_database()[name]
+        wrapped = PolicyCollection(collection, TIERS[read_name], TIERS[write_name], background)
+        _cache[1][key] = wrapped
+        return wrapped
@@ -0,0 +1,488 @@
+"""
+In-process stand-in for the subset of the MongoClient API used by the app.
+
+Selected with MONGO_BACKEND=memory. Every operation sleeps for
+``latency_ms`` (plus up to ``jitter_ms``) before touching the data, so a slow
+Atlas link can be reproduced locally without a network. Setting ``outage``
+makes every operation fail the way an unreachable cluster does. Writes whose
+``with_options`` write concern is ``w="majority"`` also wait
+``replication_ms``, the secondary round trip a replica set adds, so the
+consistency tiers can be compared locally. A cursor's ``max_time_ms`` is
+charged with the latency of every batch it fetches, as the server charges
+getMores, and raises ExecutionTimeout once exceeded. Command
+listeners receive started/succeeded events like they would from pymongo,
+and heartbeat listeners a failed heartbeat for each operation in an outage.
+"""
+
+from __future__ import annotations
+
+import copy
+import itertools
+import random
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from bson import ObjectId
+from pymongo import monitoring
+from pymongo.errors import DuplicateKeyError, ExecutionTimeout, ServerSelectionTimeoutError
+
+
+def _compare(value: Any, op: str, operand: Any) -> bool:
+    if op == "$exists":
+        return (value is not None) == bool(operand)
+    if op == "$in":
+        return value in operand
+    if op == "$nin":
+        return value not in operand
+    if op == "$ne":
+        return value != operand
+    if op == "$eq":
+        return value == operand
+    if value is None:
+        return False
+    try:
+        if op == "$gt":
+            return value > operand
+        if op == "$gte":
+            return value >= operand
+        if op == "$lt":
+            return value < operand
+        if op == "$lte":
+            return value <= operand
+    except TypeError:
+        return False
+    raise ValueError(f"Unsupported query operator '{op}'")
+
+
+def matches(doc: Dict[str, Any], query: Optional[Dict[str, Any]]) -> bool:
+    if not query:
+        return True
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(matches(doc, sub) for sub in condition):
+                return False
+            continue
+        if key == "$and":
+            if not all(matches(doc, sub) for sub in condition):
+                return False
+            continue
+        value = doc.get(key)
+        if isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition):
+            if not all(_compare(value, op, operand) for op, operand in condition.items()):
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+def _project(doc: Dict[str, Any], projection: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    if not projection:
+        return copy.deepcopy(doc)
+    include = {k for k, v in projection.items() if v and k != "_id"}
+    if include:
+        result = {k: copy.deepcopy(doc[k]) for k in include if k in doc}
+        if projection.get("_id", 1) and "_id" in doc:
+            result["_id"] = doc["_id"]
+        return result
+    exclude = {k for k, v in projection.items() if not v}
+    return {k: copy.deepcopy(v) for k, v in doc.items() if k not in exclude}
+
+
+class InsertOneResult:
+    def __init__(self, inserted_id: Any):
+        self.inserted_id = inserted_id
+
+
+class InsertManyResult:
+    def __init__(self, inserted_ids: List[Any]):
+        self.inserted_ids = inserted_ids
+
+
+class UpdateResult:
+    def __init__(self, matched_count: int, modified_count: int, upserted_id: Any = None):
+        self.matched_count = matched_count
+        self.modified_count = modified_count
+        self.upserted_id = upserted_id
+
+
+class BulkWriteResult:
+    def __init__(self, modified_count: int, upserted_ids: Dict[int, Any]):
+        self.modified_count = modified_count
+        self.upserted_ids = upserted_ids
+        self.upserted_count = len(upserted_ids)
+
+
+class DeleteResult:
+    def __init__(self, deleted_count: int):
+        self.deleted_count = deleted_count
+
+
+class CommandEvent:
+    def __init__(self, command_name: str, duration_micros: int = 0, request_id: int = 0,
+                 comment: Optional[str] = None):
+        self.command_name = command_name
+        self.command: Dict[str, Any] = {command_name: 1}
+        if comment is not None:
+            self.command["comment"] = comment
+        self.request_id = request_id
+        self.duration_micros = duration_micros
+        self.failure = None
+
+
+class HeartbeatFailedEvent:
+    def __init__(self, reply: Exception, duration_micros: int = 0):
+        self.connection_id = ("memory", 27017)
+        self.reply = reply
+        self.duration_micros = duration_micros
+        self.awaited = False
+
+
+class MemoryCursor:
+    def __init__(self, collection: "MemoryCollection", query: Optional[Dict[str, Any]],
+                 projection: Optional[Dict[str, Any]]):
+        self._collection = collection
+        self._query = query
+        self._projection = projection
+        self._sort: List[tuple] = []
+        self._limit = 0
+        self._batch_size = 0
+        self._max_time_ms: Optional[int] = None
+        self._comment: Optional[str] = None
+        self._server_ms = 0.0
+        self._iterator: Optional[Iterator[Dict[str, Any]]] = None
+
+    def sort(self, key_or_list: Any, direction: int = 1) -> "MemoryCursor":
+        if isinstance(key_or_list, str):
+            self._sort = [(key_or_list, direction)]
+        else:
+            self._sort = list(key_or_list)
+        return self
+
+    def limit(self, limit: int) -> "MemoryCursor":
+        self._limit = limit
+        return self
+
+    def batch_size(self, batch_size: int) -> "MemoryCursor":
+        self._batch_size = batch_size
+        return self
+
+    def max_time_ms(self, max_time_ms: Optional[int]) -> "MemoryCursor":
+        self._max_time_ms = max_time_ms
+        return self
+
+    def _generate(self) -> Iterator[Dict[str, Any]]:
+        docs: Iterable[Dict[str, Any]]
+        if self._sort:
+            docs = self._collection._snapshot()
+            for key, direction in reversed(self._sort):
+                docs.sort(key=lambda d: (d.get(key) is not None, d.get(key)), reverse=direction < 0)
+        else:
+            # Walk the live list by position, like a server-side cursor, rather
+            # than copying it.
+            docs = self._collection._iter_live()
+        returned = 0
+        batch = self._batch_size or 101
+        for position, doc in enumerate(docs):
+            if position % batch == 0:
+                started = time.perf_counter()
+                self._collection._client._delay("getMore", comment=self._comment)
+                self._server_ms += (time.perf_counter() - started) * 1000
+                if self._max_time_ms and self._server_ms > self._max_time_ms:
+                    raise ExecutionTimeout("operation exceeded time limit", 50)
+            if not matches(doc, self._query):
+                continue
+            yield _project(doc, self._projection)
+            returned += 1
+            if self._limit and returned >= self._limit:
+                return
+
+    def __iter__(self) -> "MemoryCursor":
+        return self
+
+    def __next__(self) -> Dict[str, Any]:
+        if self._iterator is None:
+            self._iterator = self._generate()
+        return next(self._iterator)
+
+    def close(self) -> None:
+        self._iterator = iter(())
+
+
+class MemoryCollection:
+    def __init__(self, client: "MemoryClient", name: str):
+        self._client = client
+        self.name = name
+        self._docs: List[Dict[str, Any]] = []
+        self._unique: List[str] = []
+        self.write_concern: Any = None
+        self.read_preference: Any = None
+        self.read_concern: Any = None
+
+    def _snapshot(self) -> List[Dict[str, Any]]:
+        with self._client._lock:
+            return list(self._docs)
+
+    def _iter_live(self) -> Iterator[Dict[str, Any]]:
+        position = 0
+        while True:
+            try:
+                doc = self._docs[position]
+            except IndexError:
+                return
+            yield doc
+            position += 1
+
+    def _check_unique(self, doc: Dict[str, Any], ignore: Optional[Dict[str, Any]] = None) -> None:
+        for field in self._unique:
+            if field not in doc:
+                continue
+            for existing in self._docs:
+                if existing is not ignore and existing.get(field) == doc[field]:
+                    raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: {field}_1")
+
+    def with_options(self, **kwargs: Any) -> "MemoryCollection":
+        # Shares the documents and indexes; only the options differ.
+        view = copy.copy(self)
+        for option in ("write_concern", "read_preference", "read_concern"):
+            if kwargs.get(option) is not None:
+                setattr(view, option, kwargs[option])
+        return view
+
+    def _ack_ms(self) -> float:
+        if self.write_concern is not None and self.write_concern.document.get("w") == "majority":
+            return self._client.replication_ms
+        return 0.0
+
+    def drop(self) -> None:
+        with self._client._lock:
+            self._docs.clear()
+            self._unique.clear()
+
+    def create_index(self, keys: Any, unique: bool = False, **kwargs: Any) -> str:
+        field = keys if isinstance(keys, str) else keys[0][0]
+        if unique and field not in self._unique:
+            self._unique.append(field)
+        return f"{field}_1"
+
+    def insert_one(self, document: Dict[str, Any], **kwargs: Any) -> InsertOneResult:
+        self._client._delay("insert", self._ack_ms())
+        document.setdefault("_id", ObjectId())
+        with self._client._lock:
+            self._check_unique(document)
+            self._docs.append(copy.deepcopy(document))
+        return InsertOneResult(document["_id"])
+
+    def insert_many(self, documents: List[Dict[str, Any]], **kwargs: Any) -> InsertManyResult:
+        self._client._delay("insert", self._ack_ms())
+        ids = []
+        with self._client._lock:
+            for document in documents:
+                document.setdefault("_id", ObjectId())
+                self._check_unique(document)
+                self._docs.append(copy.deepcopy(document))
+                ids.append(document["_id"])
+        return InsertManyResult(ids)
+
+    def find(self, filter: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, Any]] = None,
+             **kwargs: Any) -> MemoryCursor:
+        cursor = MemoryCursor(self, filter, projection)
+        if "sort" in kwargs:
+            cursor.sort(kwargs["sort"])
+        if kwargs.get("limit"):
+            cursor.limit(kwargs["limit"])
+        if kwargs.get("batch_size"):
+            cursor.batch_size(kwargs["batch_size"])
+        if kwargs.get("max_time_ms"):
+            cursor.max_time_ms(kwargs["max_time_ms"])
+        cursor._comment = kwargs.get("comment")
+        return cursor
+
+    def find_one(self, filter: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, Any]] = None,
+                 **kwargs: Any) -> Optional[Dict[str, Any]]:
+        self._client._delay("find", comment=kwargs.get("comment"))
+        with self._client._lock:
+            for doc in self._docs:
+                if matches(doc, filter):
+                    return _project(doc, projection)
+        return None
+
+    def count_documents(self, filter: Dict[str, Any], **kwargs: Any) -> int:
+        self._client._delay("count", comment=kwargs.get("comment"))
+        with self._client._lock:
+            return sum(1 for doc in self._docs if matches(doc, filter))
+
+    def estimated_document_count(self, **kwargs: Any) -> int:
+        self._client._delay("count")
+        return len(self._docs)
+
+    def _apply_update(self, doc: Dict[str, Any], update: Dict[str, Any]) -> None:
+        for op, fields in update.items():
+            for key, value in fields.items():
+                if op == "$set":
+                    doc[key] = copy.deepcopy(value)
+                elif op == "$setOnInsert":
+                    continue
+                elif op == "$inc":
+                    doc[key] = doc.get(key, 0) + value
+                elif op == "$max":
+                    if doc.get(key) is None or value > doc[key]:
+                        doc[key] = value
+                elif op == "$min":
+                    if doc.get(key) is None or value < doc[key]:
+                        doc[key] = value
+                elif op == "$addToSet":
+                    values = value["$each"] if isinstance(value, dict) and "$each" in value else [value]
+                    current = doc.setdefault(key, [])
+                    for item in values:
+                        if item not in current:
+                            current.append(item)
+                elif op == "$unset":
+                    doc.pop(key, None)
+                else:
+                    raise ValueError(f"Unsupported update operator '{op}'")
+
+    def update_one(self, filter: Dict[str, Any], update: Dict[str, Any], upsert: bool = False,
+                   **kwargs: Any) -> UpdateResult:
+        self._client._delay("update", self._ack_ms())
+        with self._client._lock:
+            for doc in self._docs:
+                if matches(doc, filter):
+                    self._apply_update(doc, update)
+                    return UpdateResult(1, 1)
+            if not upsert:
+                return UpdateResult(0, 0)
+            doc = {k: copy.deepcopy(v) for k, v in filter.items() if not k.startswith("$")
+                   and not isinstance(v, dict)}
+            doc.update(copy.deepcopy(update.get("$setOnInsert", {})))
+            self._apply_update(doc, update)
+            doc.setdefault("_id", ObjectId())
+            self._check_unique(doc)
+            self._docs.append(doc)
+            return UpdateResult(0, 0, doc["_id"])
+
+    def update_many(self, filter: Dict[str, Any], update: Dict[str, Any], **kwargs: Any) -> UpdateResult:
+        self._client._delay("update", self._ack_ms())
+        count = 0
+        with self._client._lock:
+            for doc in self._docs:
+                if matches(doc, filter):
+                    self._apply_update(doc, update)
+                    count += 1
+        return UpdateResult(count, count)
+
+    def bulk_write(self, requests: List[Any], **kwargs: Any) -> BulkWriteResult:
+        upserted_ids: Dict[int, Any] = {}
+        modified = 0
+        for position, request in enumerate(requests):
+            # pymongo's UpdateOne keeps its arguments in private attributes.
+            result = self.update_one(request._filter, request._doc, upsert=bool(request._upsert))
+            if result.upserted_id is not None:
+                upserted_ids[position] = result.upserted_id
+            modified += result.modified_count
+        return BulkWriteResult(modified, upserted_ids)
+
+    def delete_one(self, filter: Dict[str, Any], **kwargs: Any) -> DeleteResult:
+        self._client._delay("delete", self._ack_ms())
+        with self._client._lock:
+            for index, doc in enumerate(self._docs):
+                if matches(doc, filter):
+                    del self._docs[index]
+                    return DeleteResult(1)
+        return DeleteResult(0)
+
+    def delete_many(self, filter: Dict[str, Any], **kwargs: Any) -> DeleteResult:
+        self._client._delay("delete", self._ack_ms())
+        with self._client._lock:
+            kept = [doc for doc in self._docs if not matches(doc, filter)]
+            deleted = len(self._docs) - len(kept)
+            self._docs[:] = kept
+        return DeleteResult(deleted)
+
+    def aggregate(self, pipeline: List[Dict[str, Any]], **kwargs: Any) -> Iterator[Dict[str, Any]]:
+        self._client._delay("aggregate", comment=kwargs.get("comment"))
+        docs = self._snapshot()
+        for stage in pipeline:
+            (name, spec), = stage.items()
+            if name == "$match":
+                docs = [doc for doc in docs if matches(doc, spec)]
+            elif name == "$sample":
+                docs = random.sample(docs, min(spec["size"], len(docs)))
+            elif name == "$project":
+                docs = [_project(doc, spec) for doc in docs]
+            elif name == "$limit":
+                docs = docs[:spec]
+            else:
+                raise ValueError(f"Unsupported aggregation stage '{name}'")
+        return iter([copy.deepcopy(doc) for doc in docs])
+
+
+class MemoryDatabase:
+    def __init__(self, client: "MemoryClient", name: str):
+        self._client = client
+        self.name = name
+        self._collections: Dict[str, MemoryCollection] = {}
+
+    def __getitem__(self, name: str) -> MemoryCollection:
+        return self.get_collection(name)
+
+    def get_collection(self, name: str, **kwargs: Any) -> MemoryCollection:
+        with self._client._lock:
+            if name not in self._collections:
+                self._collections[name] = MemoryCollection(self._client, name)
+            return self._collections[name]
+
+    def command(self, command: Any, *args: Any, **kwargs: Any) -> Dict[str, Any]:
+        self._client._delay("ping")
+        return {"ok": 1.0}
+
+
+class MemoryClient:
+    def __init__(self, db_name: str = "video_app", latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                 event_listeners: Optional[List[Any]] = None, replication_ms: float = 0.0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.replication_ms = replication_ms
+        self.outage = False
+        self._listeners = list(event_listeners or [])
+        self._request_ids = itertools.count(1)
+        self._lock = threading.RLock()
+        self._db_name = db_name
+        self._databases: Dict[str, MemoryDatabase] = {}
+        self.admin = self.get_database("admin")
+
+    def _delay(self, command_name: str, extra_ms: float = 0.0, comment: Optional[str] = None) -> None:
+        started = time.perf_counter()
+        delay = self.latency_ms + extra_ms
+        if self.jitter_ms:
+            delay += random.uniform(0, self.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+        duration = int((time.perf_counter() - started) * 1_000_000)
+        if self.outage:
+            error = ServerSelectionTimeoutError("memory stand-in outage")
+            for listener in self._listeners:
+                if isinstance(listener, monitoring.ServerHeartbeatListener):
+                    listener.failed(HeartbeatFailedEvent(error, duration))
+            raise error
+        if self._listeners:
+            event = CommandEvent(command_name, duration, next(self._request_ids), comment)
+            for listener in self._listeners:
+                if isinstance(listener, monitoring.CommandListener):
+                    listener.started(event)
+                    listener.succeeded(event)
+
+    def __getitem__(self, name: str) -> MemoryDatabase:
+        return self.get_database(name)
+
+    def get_database(self, name: str, **kwargs: Any) -> MemoryDatabase:
+        with self._lock:
+            if name not in self._databases:
+                self._databases[name] = MemoryDatabase(self, name)
+            return self._databases[name]
+
+    def get_default_database(self, **kwargs: Any) -> MemoryDatabase:
+        return self.get_database(self._db_name)
+
+    def close(self) -> None:
+        pass
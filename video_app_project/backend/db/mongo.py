@@ -1,13 +1,48 @@
 from flask import Flask
-from pymongo import MongoClient
-from typing import Optional
+from pymongo import MongoClient, monitoring
+from typing import List, Optional
 from urllib.parse import quote_plus
 import os
 
+from db.breaker import BreakerCommandListener, BreakerHeartbeatListener, CircuitBreaker
+from db.fallback import profile_fallback
+from db.memory import MemoryClient
+
 _client: Optional[MongoClient] = None
+_breaker: Optional[CircuitBreaker] = None
+_command_listeners: List[monitoring.CommandListener] = []
+
+
+def add_command_listener(listener: monitoring.CommandListener) -> None:
+    """Register a listener for clients created by later init_db() calls."""
+    if listener not in _command_listeners:
+        _command_listeners.append(listener)
+
 
 def init_db(app: Flask) -> None:
-    global _client
+    global _client, _breaker
+
+    listeners = list(_command_listeners)
+    _breaker = None
+    if app.config.get("BREAKER_ENABLED", False):
+        _breaker = CircuitBreaker.from_config(app.config)
+        listeners.append(BreakerCommandListener(_breaker))
+        listeners.append(BreakerHeartbeatListener(_breaker))
+        profile_fallback.capacity = app.config.get("BREAKER_PROFILE_CACHE_SIZE", 1024)
+
+    if app.config.get("MONGO_BACKEND") == "memory":
+        _client = MemoryClient(
+            db_name=os.getenv("MONGO_DB") or "video_app",
+            latency_ms=app.config.get("MONGO_LATENCY_MS", 0.0),
+            jitter_ms=app.config.get("MONGO_JITTER_MS", 0.0),
+            replication_ms=app.config.get("MONGO_REPLICATION_MS", 0.0),
+            event_listeners=listeners,
+        )
+        # seed_data.py never runs against the stand-in; signup relies on
+        # this index to reject a duplicate email it did not look up first.
+        _client.get_default_database()["users"].create_index("email", unique=True)
+        app.config["MONGO_URI"] = "memory://"
+        return
 
     user = os.getenv("MONGO_USER")
     password = os.getenv("MONGO_PASSWORD")
@@ -28,7 +63,8 @@ def init_db(app: Flask) -> None:
     _client = MongoClient(
         uri,
         serverSelectionTimeoutMS=5000,
-        tls=True
+        tls=True,
+        event_listeners=listeners,
     )
 
     _client.admin.command("ping")
@@ -37,4 +73,15 @@ def init_db(app: Flask) -> None:
 def get_db_client() -> MongoClient:
     if _client is None:
         raise RuntimeError("MongoDB not initialized")
-    return _client
\ No newline at end of file
+    return _client
+
+
+def check_breaker(probe: bool = True) -> None:
+    """Raise DatabaseUnavailable while the breaker is open; call once per database operation."""
+    if _breaker is not None:
+        _breaker.check(probe)
+
+
+def get_breaker() -> Optional[CircuitBreaker]:
+    return _breaker
+
@@ -0,0 +1,12 @@
+from .admission import AdmissionController, AdmissionRejected, init_admission
+from .capture import init_capture
+from .profiling import init_profiling, sign_profile_token
+
+__all__ = [
+    "AdmissionController",
+    "AdmissionRejected",
+    "init_admission",
+    "init_capture",
+    "init_profiling",
+    "sign_profile_token",
+]
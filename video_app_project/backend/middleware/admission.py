@@ -0,0 +1,246 @@
+"""
+Admission control in front of the Mongo connection pool.
+
+Requests take a slot before their handler runs. When no slot is free they
+wait in a bounded priority queue; the wait deadline is derived from observed
+queue time in the style of CoDel: if the shortest wait seen over an interval
+stays above the target, the queue is standing rather than absorbing a burst,
+so requests above priority 0 are shed on arrival while priority-0 endpoints
+still queue with the full timeout. Anything that cannot be served in
+time gets an immediate 503 with Retry-After instead of piling onto the pool.
+"""
+
+from __future__ import annotations
+
+import bisect
+import itertools
+import logging
+import math
+import threading
+import time
+from typing import Dict, List, Optional
+
+from flask import Flask, g, jsonify, request
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PRIORITY = 1
+# Endpoints admitted without a slot. All but health never touch the Mongo
+# pool; health sends one ping and must answer while the queue is full, or
+# the load balancer would pull a busy instance out of rotation.
+EXEMPT_ENDPOINTS = {"home", "health", "metrics", "static", "thumbnails.get_thumbnail"}
+
+
+def parse_pairs(value: str) -> Dict[str, int]:
+    pairs: Dict[str, int] = {}
+    for item in (value or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        name, _, number = item.partition("=")
+        pairs[name.strip()] = int(number)
+    return pairs
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ("endpoint", "priority", "seq", "enqueued_at", "event", "granted", "evicted")
+
+    def __init__(self, endpoint: str, priority: int, seq: int):
+        self.endpoint = endpoint
+        self.priority = priority
+        self.seq = seq
+        self.enqueued_at = time.monotonic()
+        self.event = threading.Event()
+        self.granted = False
+        self.evicted = False
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        max_concurrency: int,
+        max_queue: int,
+        queue_timeout_ms: int,
+        target_queue_ms: int,
+        interval_ms: int,
+        endpoint_limits: Optional[Dict[str, int]] = None,
+        priorities: Optional[Dict[str, int]] = None,
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout_ms / 1000.0
+        self.target = target_queue_ms / 1000.0
+        self.interval = interval_ms / 1000.0
+        self.endpoint_limits = endpoint_limits or {}
+        self.priorities = priorities or {}
+
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        self._queue: List[_Waiter] = []
+        self._active = 0
+        self._active_by_endpoint: Dict[str, int] = {}
+
+        self._interval_end = time.monotonic() + self.interval
+        self._interval_min: Optional[float] = None
+        self._overloaded = False
+        self._avg_delay = 0.0
+
+        self.admitted = 0
+        self.rejected = 0
+
+    @classmethod
+    def from_config(cls, config: dict) -> "AdmissionController":
+        return cls(
+            max_concurrency=config.get("ADMISSION_MAX_CONCURRENCY", 32),
+            max_queue=config.get("ADMISSION_MAX_QUEUE", 128),
+            queue_timeout_ms=config.get("ADMISSION_QUEUE_TIMEOUT_MS", 2000),
+            target_queue_ms=config.get("ADMISSION_TARGET_QUEUE_MS", 50),
+            interval_ms=config.get("ADMISSION_INTERVAL_MS", 500),
+            endpoint_limits=parse_pairs(config.get("ADMISSION_ENDPOINT_LIMITS", "")),
+            priorities=parse_pairs(config.get("ADMISSION_PRIORITIES", "")),
+        )
+
+    def priority_of(self, endpoint: str) -> int:
+        return self.priorities.get(endpoint, DEFAULT_PRIORITY)
+
+    def _has_capacity(self, endpoint: str) -> bool:
+        if self._active >= self.max_concurrency:
+            return False
+        limit = self.endpoint_limits.get(endpoint)
+        return limit is None or self._active_by_endpoint.get(endpoint, 0) < limit
+
+    def _take_slot(self, endpoint: str) -> None:
+        self._active += 1
+        self._active_by_endpoint[endpoint] = self._active_by_endpoint.get(endpoint, 0) + 1
+
+    def _record_delay(self, delay: float) -> None:
+        self._avg_delay += 0.2 * (delay - self._avg_delay)
+        if self._interval_min is None or delay < self._interval_min:
+            self._interval_min = delay
+        now = time.monotonic()
+        if now >= self._interval_end:
+            overloaded = self._interval_min is not None and self._interval_min > self.target
+            if overloaded != self._overloaded:
+                logger.warning("admission_state", extra={"overloaded": overloaded})
+            self._overloaded = overloaded
+            self._interval_min = None
+            self._interval_end = now + self.interval
+
+    def _retry_after(self) -> int:
+        return max(1, math.ceil(max(self._avg_delay, self.target) * 2))
+
+    def _dispatch(self) -> None:
+        index = 0
+        while index < len(self._queue) and self._active < self.max_concurrency:
+            waiter = self._queue[index]
+            if not self._has_capacity(waiter.endpoint):
+                index += 1
+                continue
+            del self._queue[index]
+            self._take_slot(waiter.endpoint)
+            waiter.granted = True
+            waiter.event.set()
+
+    def acquire(self, endpoint: str) -> float:
+        priority = self.priority_of(endpoint)
+        with self._lock:
+            # Hand free slots to runnable waiters first; whatever is still
+            # queued afterwards is blocked by its own endpoint limit (or
+            # the pool is full) and must not hold this request back.
+            if self._queue:
+                self._dispatch()
+            if self._has_capacity(endpoint):
+                self._take_slot(endpoint)
+                self._record_delay(0.0)
+                self.admitted += 1
+                return 0.0
+
+            if self._overloaded and priority > 0:
+                self.rejected += 1
+                raise AdmissionRejected("shed_on_arrival", self._retry_after())
+
+            if len(self._queue) >= self.max_queue:
+                worst = self._queue[-1]
+                if worst.priority <= priority:
+                    self.rejected += 1
+                    raise AdmissionRejected("queue_full", self._retry_after())
+                self._queue.pop()
+                worst.evicted = True
+                worst.event.set()
+
+            waiter = _Waiter(endpoint, priority, next(self._seq))
+            bisect.insort(self._queue, waiter)
+
+        waiter.event.wait(self.queue_timeout)
+
+        with self._lock:
+            delay = time.monotonic() - waiter.enqueued_at
+            self._record_delay(delay)
+            if waiter.granted:
+                self.admitted += 1
+                return delay
+            if not waiter.evicted:
+                self._queue.remove(waiter)
+            self.rejected += 1
+            reason = "evicted" if waiter.evicted else "queue_timeout"
+            raise AdmissionRejected(reason, self._retry_after())
+
+    def release(self, endpoint: str) -> None:
+        with self._lock:
+            self._active -= 1
+            self._active_by_endpoint[endpoint] -= 1
+            self._dispatch()
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "active": self._active,
+                "queued": len(self._queue),
+                "overloaded": self._overloaded,
+                "avg_queue_ms": round(self._avg_delay * 1000, 3),
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+            }
+
+
+def init_admission(app: Flask) -> None:
+    if not app.config.get("ADMISSION_ENABLED", False):
+        return
+
+    controller = AdmissionController.from_config(app.config)
+    app.extensions["admission"] = controller
+
+    @app.before_request
+    def admit_request():
+        endpoint = request.endpoint
+        if endpoint is None or endpoint in EXEMPT_ENDPOINTS or request.method == "OPTIONS":
+            return None
+        try:
+            controller.acquire(endpoint)
+        except AdmissionRejected as exc:
+            logger.warning(
+                "admission_rejected",
+                extra={"endpoint": endpoint, "reason": exc.reason, "ip": request.remote_addr or "unknown"},
+            )
+            response = jsonify({"success": False, "error": "service overloaded"})
+            response.status_code = 503
+            response.headers["Retry-After"] = str(exc.retry_after)
+            return response
+        g.admission_endpoint = endpoint
+        return None
+
+    @app.teardown_request
+    def release_slot(exc):
+        endpoint = g.pop("admission_endpoint", None)
+        if endpoint is not None:
+            controller.release(endpoint)
@@ -0,0 +1,199 @@
+"""
+Opt-in traffic capture for offline replay.
+
+Each captured request becomes one NDJSON line with its endpoint, URL rule,
+timing, status and response size. Nothing that identifies a user is kept:
+
+- the bearer token becomes ``<user:…>``, a keyed hash of its ``user_id``
+  claim, so one user's requests stay linked without revealing who they are;
+- emails and client addresses become ``<email:…>`` and ``<ip:…>`` with the
+  same keyed hash;
+- passwords become ``<strong>``/``<weak>`` and ``confirm_password``
+  ``<match>``/``<mismatch>``, which is all the handlers branch on;
+- path ids become ``<video:…>``, playback and refresh tokens ``<token>``,
+  and any other string ``<str:N>`` with its length.
+
+The hash key is CAPTURE_SECRET, or a random per-process key when unset.
+Lines are handed to a writer thread through a bounded queue; when the queue
+is full the line is dropped and counted rather than slowing the request.
+``replay_traffic.py`` re-issues a capture against the memory backend.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import hmac
+import itertools
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import jwt
+from flask import Flask, g, request
+
+from auth.validation import is_strong_password
+
+logger = logging.getLogger(__name__)
+
+# Query arguments whose values carry no user data and are kept verbatim
+PLAIN_ARGS = {"mode", "limit", "w", "date", "from", "to", "format"}
+TOKEN_FIELDS = {"token", "refresh_token"}
+
+
+class Pseudonymizer:
+    def __init__(self, secret: str = ""):
+        self._key = secret.encode() if secret else os.urandom(32)
+
+    def tag(self, kind: str, value: str) -> str:
+        digest = hmac.new(self._key, value.encode(), hashlib.sha256).hexdigest()[:12]
+        return f"<{kind}:{digest}>"
+
+    def identity(self, auth_header: str) -> Optional[str]:
+        if not auth_header.startswith("Bearer "):
+            return None
+        token = auth_header[7:].strip()
+        try:
+            claims = jwt.decode(token, options={"verify_signature": False, "verify_exp": False})
+            subject = str(claims.get("user_id") or token)
+        except jwt.InvalidTokenError:
+            subject = token
+        return self.tag("user", subject)
+
+    def value(self, name: str, value: Any, body: Dict[str, Any]) -> Any:
+        if name == "email" and isinstance(value, str):
+            return self.tag("email", value.strip().lower())
+        if name == "password":
+            return "<strong>" if isinstance(value, str) and is_strong_password(value) else "<weak>"
+        if name == "confirm_password":
+            return "<match>" if value == body.get("password") else "<mismatch>"
+        if name in TOKEN_FIELDS:
+            return "<token>" if value else ""
+        if isinstance(value, str):
+            return f"<str:{len(value)}>"
+        if isinstance(value, (bool, int, float)) or value is None:
+            return value
+        return f"<{type(value).__name__}>"
+
+    def record(self) -> Dict[str, Any]:
+        body = request.get_json(silent=True) if request.is_json else None
+        view_args = {
+            name: self.tag(name.split("_")[0], str(value)) for name, value in (request.view_args or {}).items()
+        }
+        args = {
+            name: value if name in PLAIN_ARGS else self.value(name, value, {})
+            for name, value in request.args.items()
+        }
+        return {
+            "method": request.method,
+            "endpoint": request.endpoint,
+            "rule": request.url_rule.rule if request.url_rule is not None else None,
+            "view_args": view_args,
+            "args": args,
+            "identity": self.identity(request.headers.get("Authorization", "")),
+            "client": self.tag("ip", request.remote_addr or "unknown"),
+            "body": (
+                {name: self.value(name, value, body) for name, value in body.items()}
+                if isinstance(body, dict) else None
+            ),
+        }
+
+
+class CaptureWriter:
+    def __init__(self, path: str, max_bytes: int, queue_size: int = 10000):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._queue: "queue.Queue[str]" = queue.Queue(maxsize=queue_size)
+        self.written = 0
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._run, name="traffic-capture", daemon=True)
+        self._thread.start()
+
+    def put(self, record: Dict[str, Any]) -> None:
+        try:
+            self._queue.put_nowait(json.dumps(record, separators=(",", ":")))
+        except queue.Full:
+            self.dropped += 1
+
+    def _open(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        return open(self.path, "a", encoding="utf-8")
+
+    def _run(self) -> None:
+        handle = None
+        while True:
+            line = self._queue.get()
+            try:
+                if handle is None:
+                    handle = self._open()
+                # Drain whatever queued up meanwhile before flushing.
+                while line is not None:
+                    handle.write(line + "\n")
+                    self.written += 1
+                    try:
+                        line = self._queue.get_nowait()
+                    except queue.Empty:
+                        line = None
+                handle.flush()
+                if self.max_bytes and handle.tell() >= self.max_bytes:
+                    handle.close()
+                    os.replace(self.path, self.path + ".1")
+                    handle = self._open()
+            except OSError:
+                logger.exception("capture_write_error")
+                # Start the next batch on a fresh handle: a failed rotation
+                # leaves this one closed, and a failed write may leave it
+                # pointing at a file that is gone.
+                if handle is not None:
+                    try:
+                        handle.close()
+                    except OSError:
+                        pass
+                    handle = None
+
+    def stats(self) -> Dict[str, int]:
+        return {"written": self.written, "dropped": self.dropped, "queued": self._queue.qsize()}
+
+
+def init_capture(app: Flask) -> None:
+    if not app.config.get("CAPTURE_ENABLED", False):
+        return
+
+    pseudonyms = Pseudonymizer(app.config.get("CAPTURE_SECRET", ""))
+    writer = CaptureWriter(
+        app.config.get("CAPTURE_FILE", "captures/traffic.ndjson"),
+        app.config.get("CAPTURE_MAX_BYTES", 100 * 1024 * 1024),
+    )
+    sample_every = max(1, app.config.get("CAPTURE_SAMPLE_EVERY", 1))
+    counter = itertools.count()
+    app.extensions["capture"] = writer
+
+    @app.before_request
+    def start_capture():
+        if next(counter) % sample_every == 0:
+            g.capture_started = time.perf_counter()
+            g.capture_ts = time.time()
+
+    @app.after_request
+    def capture_request(response):
+        started = g.pop("capture_started", None)
+        if started is None or request.endpoint is None:
+            return response
+        try:
+            record = pseudonyms.record()
+        except Exception:
+            logger.exception("capture_error")
+            return response
+        record.update({
+            "ts": round(g.capture_ts, 6),
+            "status": response.status_code,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+            "bytes": response.content_length,
+        })
+        writer.put(record)
+        return response
@@ -0,0 +1,284 @@
+"""
+On-demand per-request sampling profiler.
+
+A request is profiled when it carries a valid signed ``X-Profile-Token``
+header (see ``sign_profile_token``) or when it is picked by 1-in-N sampling.
+Tokens are only accepted with an explicit PROFILING_SECRET; there is no
+fallback to SECRET_KEY, whose default is public.
+While the handler runs, a sampler thread snapshots the handler thread's
+stack every PROFILING_INTERVAL_MS and a command listener records the Mongo
+commands issued from that thread. The result is written to the spool
+directory as collapsed stacks (``.folded``), a speedscope file and a
+``.meta.json`` with the Mongo timings; only the newest
+PROFILING_SPOOL_MAX_FILES profiles are kept.
+
+With nothing selected for profiling the per-request cost is a header lookup
+and a counter increment, and the command listener returns on an empty-dict
+check; ``python -m benchmarks.profiling`` measures it.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import hmac
+import itertools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from types import GeneratorType
+from typing import Dict, List, Optional, Tuple
+from uuid import uuid4
+
+from flask import Flask, after_this_request, request
+from pymongo import monitoring
+
+from db import add_command_listener
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "X-Profile-Token"
+PROFILE_ENVIRON_KEY = "HTTP_X_PROFILE_TOKEN"
+Frame = Tuple[str, str, int]
+
+
+def sign_profile_token(secret: str, ttl_seconds: int = 300) -> str:
+    expires = str(int(time.time()) + ttl_seconds)
+    digest = hmac.new(secret.encode(), expires.encode(), hashlib.sha256).hexdigest()
+    return f"{expires}.{digest}"
+
+
+def verify_profile_token(secret: str, token: str) -> bool:
+    expires, _, digest = token.partition(".")
+    if not expires.isdigit() or int(expires) < time.time():
+        return False
+    expected = hmac.new(secret.encode(), expires.encode(), hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, digest)
+
+
+class RequestProfile:
+    def __init__(self, thread_id: int, interval: float, max_depth: int = 128, max_seconds: float = 300.0):
+        self.profile_id = uuid4().hex[:12]
+        self.thread_id = thread_id
+        self.interval = interval
+        self.max_depth = max_depth
+        # Bounds the sampler if the response is never closed (an exception
+        # propagated past Flask in debug mode).
+        self.max_seconds = max_seconds
+        self.stacks: Counter = Counter()
+        self.commands: List[Dict[str, object]] = []
+        self._pending: Dict[int, float] = {}
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._run, name=f"profiler-{self.profile_id}", daemon=True)
+        self.started_at = time.perf_counter()
+        self.duration = 0.0
+
+    def start(self) -> None:
+        self._sampler.start()
+
+    def stop(self) -> None:
+        self.duration = time.perf_counter() - self.started_at
+        self._stop.set()
+        self._sampler.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval) and time.perf_counter() - self.started_at < self.max_seconds:
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack: List[Frame] = []
+            while frame is not None and len(stack) < self.max_depth:
+                code = frame.f_code
+                stack.append((code.co_name, code.co_filename, frame.f_lineno))
+                frame = frame.f_back
+            stack.reverse()
+            self.stacks[tuple(stack)] += 1
+
+    def command_started(self, request_id: int) -> None:
+        self._pending[request_id] = time.perf_counter()
+
+    def command_finished(self, request_id: int, command_name: str, duration_micros: int, failed: bool) -> None:
+        started = self._pending.pop(request_id, None)
+        self.commands.append({
+            "command": command_name,
+            "duration_ms": round(duration_micros / 1000, 3),
+            "offset_ms": round(((started or time.perf_counter()) - self.started_at) * 1000, 3),
+            "failed": failed,
+        })
+
+    def collapsed(self) -> str:
+        lines = []
+        for stack, count in self.stacks.most_common():
+            names = ";".join(f"{name} ({os.path.basename(path)}:{line})" for name, path, line in stack)
+            lines.append(f"{names} {count}")
+        return "\n".join(lines) + "\n"
+
+    def speedscope(self, name: str) -> Dict[str, object]:
+        frames: List[Dict[str, object]] = []
+        index: Dict[Frame, int] = {}
+        samples: List[List[int]] = []
+        weights: List[float] = []
+        for stack, count in self.stacks.items():
+            sample = []
+            for frame in stack:
+                if frame not in index:
+                    index[frame] = len(frames)
+                    frames.append({"name": frame[0], "file": frame[1], "line": frame[2]})
+                sample.append(index[frame])
+            samples.append(sample)
+            weights.append(round(count * self.interval * 1000, 3))
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": round(self.duration * 1000, 3),
+                "samples": samples,
+                "weights": weights,
+            }],
+            "name": name,
+            "exporter": "video_app profiling",
+        }
+
+
+class ProfilingCommandListener(monitoring.CommandListener):
+    def __init__(self):
+        self.active: Dict[int, RequestProfile] = {}
+
+    def _profile(self) -> Optional[RequestProfile]:
+        if not self.active:
+            return None
+        return self.active.get(threading.get_ident())
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        profile = self._profile()
+        if profile is not None:
+            profile.command_started(getattr(event, "request_id", id(event)))
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        profile = self._profile()
+        if profile is not None:
+            profile.command_finished(getattr(event, "request_id", id(event)), event.command_name,
+                                     event.duration_micros, False)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        profile = self._profile()
+        if profile is not None:
+            profile.command_finished(getattr(event, "request_id", id(event)), event.command_name,
+                                     event.duration_micros, True)
+
+
+class ProfileSpool:
+    def __init__(self, directory: str, max_files: int):
+        self.directory = directory
+        self.max_files = max_files
+        self._lock = threading.Lock()
+
+    def write(self, profile: RequestProfile, meta: Dict[str, object]) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        stem = f"{int(time.time() * 1000)}-{meta['endpoint']}-{profile.profile_id}"
+        base = os.path.join(self.directory, stem)
+        with open(base + ".folded", "w") as handle:
+            handle.write(profile.collapsed())
+        with open(base + ".speedscope.json", "w") as handle:
+            json.dump(profile.speedscope(f"{meta['method']} {meta['path']}"), handle)
+        with open(base + ".meta.json", "w") as handle:
+            json.dump(meta, handle, indent=2)
+        self._trim()
+        return stem
+
+    def _trim(self) -> None:
+        with self._lock:
+            stems = sorted(
+                name[: -len(".meta.json")]
+                for name in os.listdir(self.directory)
+                if name.endswith(".meta.json")
+            )
+            for stem in stems[: max(0, len(stems) - self.max_files)]:
+                for suffix in (".folded", ".speedscope.json", ".meta.json"):
+                    try:
+                        os.remove(os.path.join(self.directory, stem + suffix))
+                    except FileNotFoundError:
+                        pass
+
+
+def init_profiling(app: Flask) -> None:
+    """Must run before init_db so the command listener reaches the client."""
+    if not app.config.get("PROFILING_ENABLED", False):
+        return
+
+    secret = app.config.get("PROFILING_SECRET", "")
+    sample_every = app.config.get("PROFILING_SAMPLE_EVERY", 0)
+    if not secret:
+        # Refuse signed requests rather than verify them against a guessable key.
+        if not sample_every:
+            logger.warning("profiling_disabled", extra={"reason": "PROFILING_SECRET is not set"})
+            return
+        logger.warning("profiling_tokens_disabled", extra={"reason": "PROFILING_SECRET is not set"})
+    interval = app.config.get("PROFILING_INTERVAL_MS", 2) / 1000.0
+    spool = ProfileSpool(
+        app.config.get("PROFILING_SPOOL_DIR", "profiles"),
+        app.config.get("PROFILING_SPOOL_MAX_FILES", 50),
+    )
+    listener = ProfilingCommandListener()
+    add_command_listener(listener)
+    counter = itertools.count(1)
+    app.extensions["profiling"] = spool
+
+    @app.before_request
+    def start_profile():
+        token = request.environ.get(PROFILE_ENVIRON_KEY)
+        if token is None:
+            if not sample_every or next(counter) % sample_every:
+                return None
+            reason = "sampled"
+        elif secret and verify_profile_token(secret, token):
+            reason = "requested"
+        else:
+            logger.warning("profile_token_rejected", extra={"ip": request.remote_addr or "unknown"})
+            return None
+        profile = RequestProfile(threading.get_ident(), interval)
+        listener.active[profile.thread_id] = profile
+        profile.start()
+        # Per-request callbacks rather than app-wide after/teardown hooks, so
+        # requests that are not profiled pay for this one hook only.
+        after_this_request(lambda response: tag_profile(profile, reason, response))
+        return None
+
+    def tag_profile(profile, reason, response):
+        response.headers["X-Profile-Id"] = profile.profile_id
+        meta = {
+            "profile_id": profile.profile_id,
+            "reason": reason,
+            "endpoint": request.endpoint or "unknown",
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+        }
+        if isinstance(response.response, GeneratorType):
+            # A generated body runs after this; end the profile when it is sent.
+            response.call_on_close(lambda: finish_profile(profile, meta))
+        else:
+            finish_profile(profile, meta)
+        return response
+
+    def finish_profile(profile, meta):
+        listener.active.pop(profile.thread_id, None)
+        profile.stop()
+        meta.update({
+            "duration_ms": round(profile.duration * 1000, 3),
+            "interval_ms": round(profile.interval * 1000, 3),
+            "samples": sum(profile.stacks.values()),
+            "mongo_total_ms": round(sum(c["duration_ms"] for c in profile.commands), 3),
+            "mongo_commands": profile.commands,
+        })
+        try:
+            spool.write(profile, meta)
+        except OSError:
+            logger.exception("profile_spool_error")
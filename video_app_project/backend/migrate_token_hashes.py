@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Migrate token_blacklist and refresh_tokens from full token strings to
+16-byte token_hash keys, then replace the string indexes.
+Run it together with the deploy: old code cannot read migrated documents.
+Run: python migrate_token_hashes.py [--batch-size 500] [--dry-run]
+"""
+
+import argparse
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from flask import Flask
+from pymongo import UpdateOne
+
+from auth.tokens import token_digest
+from config.config import get_config
+from db.mongo import get_db_client, init_db
+
+COLLECTIONS = ["token_blacklist", "refresh_tokens"]
+
+
+def migrate_collection(collection, batch_size, dry_run):
+    """Add token_hash and drop the token string on every unmigrated document"""
+    pending = collection.count_documents({"token": {"$exists": True}})
+    print(f"{collection.name}: {pending} documents to migrate")
+    if dry_run or not pending:
+        return 0
+
+    migrated = 0
+    batch = []
+    cursor = collection.find({"token": {"$exists": True}}, {"token": 1}).batch_size(batch_size)
+    for doc in cursor:
+        batch.append(
+            UpdateOne(
+                {"_id": doc["_id"]},
+                {"$set": {"token_hash": token_digest(doc["token"])}, "$unset": {"token": ""}},
+            )
+        )
+        if len(batch) >= batch_size:
+            collection.bulk_write(batch, ordered=False)
+            migrated += len(batch)
+            batch = []
+    if batch:
+        collection.bulk_write(batch, ordered=False)
+        migrated += len(batch)
+    print(f"✓ {collection.name}: migrated {migrated} documents")
+    return migrated
+
+
+def drop_token_indexes(collection, dry_run):
+    """Drop indexes on the token string; a unique one would reject hashed docs"""
+    for name, info in collection.index_information().items():
+        if info.get("key") == [("token", 1)]:
+            print(f"{collection.name}: dropping index {name}")
+            if not dry_run:
+                collection.drop_index(name)
+
+
+def create_hash_indexes(collection, dry_run):
+    """Key on token_hash and expire documents at expires_at"""
+    if dry_run:
+        return
+    collection.create_index("token_hash", unique=True)
+    collection.create_index("expires_at", expireAfterSeconds=0)
+    print(f"✓ {collection.name}: token_hash unique and expires_at TTL indexes in place")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--config", default="production")
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    app.config.from_object(get_config(args.config))
+    init_db(app)
+    db = get_db_client().get_default_database()
+
+    for name in COLLECTIONS:
+        collection = db[name]
+        drop_token_indexes(collection, args.dry_run)
+        migrate_collection(collection, args.batch_size, args.dry_run)
+        create_hash_indexes(collection, args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+Replay captured traffic (see middleware/capture.py) against the in-memory Mongo stand-in
+Run: python replay_traffic.py captures/traffic.ndjson
+     python replay_traffic.py captures/traffic.ndjson --speed 10 --latency-ms 20 --jitter-ms 5
+     python replay_traffic.py captures/*.ndjson --speed 0 --concurrency 128   # as fast as possible
+
+Placeholders in the capture are mapped to synthetic users, videos and tokens
+seeded into the memory backend, so each pseudonymous user replays as the same
+synthetic user. Requests keep their original spacing divided by --speed.
+Each pseudonymous user (bearer identity, else email, else client address)
+has at most one request in flight and replays in capture order, so a signup
+is answered before the login that follows it even with --speed 0.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import statistics
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+load_dotenv()
+
+RULE_PARAM = re.compile(r"<(?:[^:>]+:)?([^>]+)>")
+PLACEHOLDER = re.compile(r"^<(\w+):([^>]*)>$")
+PASSWORD = "Replay-Passw0rd!"
+WORDS = ["intro", "python", "flask", "mongo", "music", "live", "tutorial", "review", "travel", "cooking",
+         "guide", "news", "game", "design", "history", "science", "space", "ocean", "city", "night"]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def load_records(paths, limit=0):
+    records = []
+    for path in paths:
+        with open(path, encoding="utf-8") as handle:
+            records.extend(json.loads(line) for line in handle if line.strip())
+    records.sort(key=lambda record: record["ts"])
+    return records[:limit] if limit else records
+
+
+def parse_placeholder(value):
+    match = PLACEHOLDER.match(value) if isinstance(value, str) else None
+    return match.groups() if match else (None, None)
+
+
+class ReplayWorld:
+    """Synthetic users, videos and tokens standing in for the captured placeholders."""
+
+    def __init__(self, app, records, min_videos, rng):
+        self.app = app
+        self.rng = rng
+        self.secret = app.config.get("JWT_SECRET_KEY")
+        self.algorithm = app.config.get("JWT_ALGORITHM", "HS256")
+        self.video_ids = {}
+        self.tokens = {}
+        self.clients = {}
+        self._seed(records, min_videos)
+
+    @staticmethod
+    def email_for(digest):
+        return f"{digest}@replay.invalid"
+
+    def _seed(self, records, min_videos):
+        import jwt
+        from werkzeug.security import generate_password_hash
+        from db.mongo import get_db_client
+
+        placeholders, identities, registered, signed_up = [], set(), set(), set()
+        for record in records:
+            for value in record.get("view_args", {}).values():
+                if value not in placeholders:
+                    placeholders.append(value)
+            if record.get("identity"):
+                identities.add(record["identity"])
+            email = (record.get("body") or {}).get("email")
+            if record["endpoint"] == "auth.signup" and record["status"] == 201:
+                signed_up.add(email)
+            elif record["endpoint"] == "auth.login" and record["status"] == 200 and email not in signed_up:
+                registered.add(email)
+
+        db = get_db_client().get_default_database()
+        videos = [
+            {
+                "title": " ".join(self.rng.sample(WORDS, 3)),
+                "description": "replay video",
+                "thumbnail_url": "",
+                "youtube_id": f"replay{i}",
+                "is_active": True,
+                "created_at": datetime.utcnow(),
+            }
+            for i in range(max(min_videos, len(placeholders), 1))
+        ]
+        seeded = [str(_id) for _id in db["videos"].insert_many(videos).inserted_ids]
+        for position, placeholder in enumerate(placeholders):
+            self.video_ids[placeholder] = seeded[position % len(seeded)]
+        self.app.extensions["catalog"].refresh(db["videos"])
+
+        password_hash = generate_password_hash(PASSWORD)
+        users = []
+        for email in registered:
+            _, digest = parse_placeholder(email)
+            users.append({"user_id": f"replay-{digest}", "full_name": "Replay User",
+                          "email": self.email_for(digest), "password_hash": password_hash})
+        expires = datetime.utcnow() + timedelta(days=1)
+        for identity in identities:
+            _, digest = parse_placeholder(identity)
+            user_id = f"replay-user-{digest}"
+            users.append({"user_id": user_id, "full_name": "Replay User",
+                          "email": self.email_for(f"user-{digest}"), "password_hash": password_hash})
+            self.tokens[identity] = jwt.encode({"user_id": user_id, "exp": expires}, self.secret,
+                                               algorithm=self.algorithm)
+        if users:
+            for user in users:
+                user["created_at"] = datetime.utcnow()
+            db["users"].insert_many(users)
+
+    def _client_addr(self, tag):
+        if tag not in self.clients:
+            digest = hashlib.sha256((tag or "").encode()).digest()
+            self.clients[tag] = f"10.{digest[0]}.{digest[1]}.{digest[2]}"
+        return self.clients[tag]
+
+    def _text(self, length):
+        words = []
+        while sum(len(word) + 1 for word in words) < length:
+            words.append(self.rng.choice(WORDS))
+        return " ".join(words) or self.rng.choice(WORDS)
+
+    def _value(self, value, body):
+        if value == "<match>":
+            return self._value(body.get("password"), body)
+        kind, detail = parse_placeholder(value)
+        if kind == "email":
+            return self.email_for(detail)
+        if kind == "str":
+            return "x" * int(detail)
+        return {
+            "<strong>": PASSWORD,
+            "<weak>": "weak",
+            "<mismatch>": PASSWORD + "x",
+            "<token>": "replay-token",
+        }.get(value, value)
+
+    def request_for(self, record):
+        import jwt
+
+        view_values = {}
+        for name, value in record.get("view_args", {}).items():
+            view_values[name] = self.video_ids.get(value, value)
+        path = RULE_PARAM.sub(lambda match: view_values.get(match.group(1), match.group(0)), record["rule"])
+
+        query = {}
+        for name, value in record.get("args", {}).items():
+            kind, detail = parse_placeholder(value)
+            if value == "<token>" and name == "token":
+                query[name] = jwt.encode(
+                    {"video_id": view_values.get("video_id", ""), "exp": datetime.utcnow() + timedelta(minutes=5)},
+                    self.secret, algorithm=self.algorithm,
+                )
+            elif kind == "str":
+                query[name] = self._text(int(detail))
+            else:
+                query[name] = value
+
+        body = record.get("body")
+        payload = None
+        if body is not None:
+            payload = {}
+            for name, value in body.items():
+                payload[name] = self._value(value, body)
+
+        headers = {}
+        identity = record.get("identity")
+        if identity:
+            headers["Authorization"] = f"Bearer {self.tokens.get(identity, 'replay-invalid')}"
+        environ = {"REMOTE_ADDR": self._client_addr(record.get("client"))}
+        return record["method"], path, query, headers, payload, environ
+
+
+def lane_key(record):
+    return record.get("identity") or (record.get("body") or {}).get("email") or record.get("client")
+
+
+def replay(app, world, records, speed, concurrency):
+    results = []
+    lock = threading.Lock()
+    local = threading.local()
+    # lane key -> requests waiting behind that user's request in flight
+    lanes = {}
+    remaining = [len(records)]
+    finished_all = threading.Event()
+
+    def issue(record, due):
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = app.test_client()
+        method, path, query, headers, payload, environ = world.request_for(record)
+        started = time.perf_counter()
+        response = client.open(path, method=method, query_string=query, headers=headers, json=payload,
+                               environ_base=environ)
+        response.get_data()
+        finished = time.perf_counter()
+        with lock:
+            results.append({
+                "endpoint": record["endpoint"],
+                "status": response.status_code,
+                "captured_status": record["status"],
+                "latency_ms": (finished - started) * 1000,
+                "captured_ms": record.get("duration_ms"),
+                "lag_ms": max(0.0, (started - due) * 1000),
+            })
+
+    def run(key, record, due):
+        try:
+            issue(record, due)
+        finally:
+            with lock:
+                waiting = lanes.get(key)
+                following = waiting.popleft() if waiting else None
+                if following is None:
+                    lanes.pop(key, None)
+                remaining[0] -= 1
+                if not remaining[0]:
+                    finished_all.set()
+            if following is not None:
+                pool.submit(run, key, *following)
+
+    first = records[0]["ts"]
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        started = time.perf_counter()
+        for record in records:
+            due = started + ((record["ts"] - first) / speed if speed else 0.0)
+            wait = due - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+            key = lane_key(record)
+            with lock:
+                if key in lanes:
+                    lanes[key].append((record, due))
+                    continue
+                lanes[key] = deque()
+            pool.submit(run, key, record, due)
+        # Lanes submit their next request from worker threads, so the pool
+        # must stay open until every request has run.
+        finished_all.wait()
+    return results, time.perf_counter() - started
+
+
+def summarize(results, elapsed):
+    by_endpoint = defaultdict(list)
+    for result in results:
+        by_endpoint[result["endpoint"]].append(result)
+    endpoints = {}
+    for endpoint, rows in sorted(by_endpoint.items()):
+        latencies = [row["latency_ms"] for row in rows]
+        captured = [row["captured_ms"] for row in rows if row["captured_ms"] is not None]
+        statuses = defaultdict(int)
+        for row in rows:
+            statuses[row["status"]] += 1
+        endpoints[endpoint] = {
+            "count": len(rows),
+            "p50_ms": round(percentile(latencies, 50), 3),
+            "p90_ms": round(percentile(latencies, 90), 3),
+            "p99_ms": round(percentile(latencies, 99), 3),
+            "max_ms": round(max(latencies), 3),
+            "mean_ms": round(statistics.mean(latencies), 3),
+            "captured_p50_ms": round(percentile(captured, 50), 3) if captured else None,
+            "captured_p99_ms": round(percentile(captured, 99), 3) if captured else None,
+            "status": dict(statuses),
+            "status_mismatches": sum(1 for row in rows if row["status"] != row["captured_status"]),
+        }
+    latencies = [result["latency_ms"] for result in results]
+    lags = [result["lag_ms"] for result in results]
+    return {
+        "requests": len(results),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(results) / elapsed, 1) if elapsed else None,
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "schedule_lag_p99_ms": round(percentile(lags, 99), 3),
+        "endpoints": endpoints,
+    }
+
+
+def print_summary(summary):
+    print(
+        f"{summary['requests']} requests in {summary['elapsed_s']}s "
+        f"({summary['throughput_rps']} req/s), p50={summary['p50_ms']}ms p99={summary['p99_ms']}ms, "
+        f"schedule lag p99={summary['schedule_lag_p99_ms']}ms"
+    )
+    print(f"{'endpoint':<28}{'count':>7}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}{'cap p50':>9}{'cap p99':>9}  status")
+    for endpoint, row in summary["endpoints"].items():
+        captured = [row["captured_p50_ms"], row["captured_p99_ms"]]
+        print(
+            f"{endpoint:<28}{row['count']:>7}{row['p50_ms']:>9.2f}{row['p90_ms']:>9.2f}{row['p99_ms']:>9.2f}"
+            f"{row['max_ms']:>9.2f}"
+            + "".join(f"{value:>9.2f}" if value is not None else f"{'-':>9}" for value in captured)
+            + f"  {row['status']} mismatched={row['status_mismatches']}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("captures", nargs="+")
+    parser.add_argument("--config", default="development")
+    parser.add_argument("--speed", type=float, default=1.0, help="time compression; 0 replays back to back")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="injected per-command Mongo latency")
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--videos", type=int, default=100, help="minimum size of the synthetic catalog")
+    parser.add_argument("--limit", type=int, default=0, help="replay only the first N requests")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="also write the summary to this file")
+    args = parser.parse_args()
+
+    # Config is read from the environment at import time.
+    os.environ.update({
+        "MONGO_BACKEND": "memory",
+        "MONGO_LATENCY_MS": str(args.latency_ms),
+        "MONGO_JITTER_MS": str(args.jitter_ms),
+        "CAPTURE_ENABLED": "false",
+    })
+    import logging
+    logging.disable(logging.WARNING)
+    from app import create_app
+
+    records = [record for record in load_records(args.captures, args.limit) if record.get("rule")]
+    if not records:
+        parser.error("no replayable requests in the capture")
+
+    app = create_app(args.config)
+    world = ReplayWorld(app, records, args.videos, random.Random(args.seed))
+    results, elapsed = replay(app, world, records, args.speed, args.concurrency)
+    summary = summarize(results, elapsed)
+    print_summary(summary)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as handle:
+            json.dump(summary, handle, indent=2)
+
+
+if __name__ == "__main__":
+    main()
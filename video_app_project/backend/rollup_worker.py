@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Analytics rollup worker: folds watch and login events into hourly/daily summaries
+Run: python rollup_worker.py                 # loop every --interval seconds
+     python rollup_worker.py --once
+     python rollup_worker.py --backfill --since 2026-01-01 --until 2026-02-01 --workers 8
+"""
+
+import argparse
+import logging
+import time
+from datetime import datetime
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from flask import Flask
+
+from analytics.rollup import SOURCES, ensure_indexes, run_backfill, run_incremental
+from config.config import get_config
+from db.mongo import init_db
+
+logger = logging.getLogger("rollup_worker")
+
+
+def run_once(batch_size, lag_seconds):
+    """Process new events from every source"""
+    for source in SOURCES:
+        try:
+            count = run_incremental(source, batch_size=batch_size, lag_seconds=lag_seconds)
+            print(f"✓ {source}: {count} new events")
+        except Exception:
+            logger.exception("rollup_failed", extra={"source": source})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--config", default="production")
+    parser.add_argument("--once", action="store_true")
+    parser.add_argument("--interval", type=int, default=60, help="seconds between passes; keep under the 5 minute login_attempts TTL")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--lag-seconds", type=int, default=5)
+    parser.add_argument("--backfill", action="store_true")
+    parser.add_argument("--source", choices=sorted(SOURCES), default="video_watch_history")
+    parser.add_argument("--since", type=lambda v: datetime.strptime(v, "%Y-%m-%d"))
+    parser.add_argument("--until", type=lambda v: datetime.strptime(v, "%Y-%m-%d"))
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+    app = Flask(__name__)
+    app.config.from_object(get_config(args.config))
+    init_db(app)
+    ensure_indexes()
+
+    if args.backfill:
+        if not args.since or not args.until:
+            parser.error("--backfill needs --since and --until")
+        count = run_backfill(args.source, args.since, args.until, workers=args.workers, batch_size=args.batch_size)
+        print(f"✓ Backfilled {count} {args.source} events")
+        return
+
+    while True:
+        run_once(args.batch_size, args.lag_seconds)
+        if args.once:
+            return
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -89,9 +89,19 @@ def seed_indexes():
     db["login_attempts"].create_index("timestamp", expireAfterSeconds=300)
     print("✓ Created login_attempts TTL index (5 min)")
     
-    # Token blacklist index
+    # Token blacklist indexes
+    db["token_blacklist"].create_index("token_hash", unique=True)
     db["token_blacklist"].create_index("expires_at", expireAfterSeconds=0)
-    print("✓ Created token_blacklist TTL index")
+    print("✓ Created token_blacklist token_hash unique and TTL indexes")
+
+    # Refresh token indexes
+    db["refresh_tokens"].create_index("token_hash", unique=True)
+    db["refresh_tokens"].create_index("expires_at", expireAfterSeconds=0)
+    print("✓ Created refresh_tokens token_hash unique and TTL indexes")
+
+    # Watch history index, serving per-user scans and the ordered export
+    db["video_watch_history"].create_index([("user_id", 1), ("watched_at", 1)])
+    print("✓ Created video_watch_history user_id/watched_at index")
 
 if __name__ == "__main__":
     print("Seeding MongoDB with test data...")
@@ -0,0 +1,75 @@
+"""
+Shared fixtures. Config is read from the environment when config.config is
+imported, so the memory backend and test settings are set here, before any
+app module is loaded.
+"""
+
+import os
+from datetime import datetime, timedelta
+
+os.environ.update({
+    "MONGO_BACKEND": "memory",
+    "MONGO_LATENCY_MS": "0",
+    "CATALOG_REFRESH_SECONDS": "0",
+    "ADMISSION_ENABLED": "false",
+    "BREAKER_ENABLED": "true",
+    "PROFILING_ENABLED": "false",
+    "CAPTURE_ENABLED": "false",
+    "EMAIL_FILTER_ENABLED": "false",
+    "JWT_SECRET_KEY": "test-secret-" + "k" * 52,
+    "JWT_ALGORITHM": "HS256",
+})
+
+import pytest
+
+SECRET = os.environ["JWT_SECRET_KEY"]
+
+
+@pytest.fixture
+def app():
+    from app import create_app
+
+    app = create_app("testing")
+    yield app
+    for name in ("catalog_refresh_stop", "email_filter_stop"):
+        stop = app.extensions.get(name)
+        if stop is not None:
+            stop.set()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def db_client(app):
+    from db.mongo import get_db_client
+
+    return get_db_client()
+
+
+@pytest.fixture
+def db(db_client):
+    return db_client.get_default_database()
+
+
+def _make_token(user_id="user-1", expires_in=timedelta(hours=1), **claims):
+    from auth.tokens import get_codec
+
+    payload = {"user_id": user_id, "exp": datetime.utcnow() + expires_in, **claims}
+    return get_codec(SECRET, "HS256").encode(payload)
+
+
+@pytest.fixture
+def make_token():
+    """Sign an access token the way /auth/login does."""
+    return _make_token
+
+
+@pytest.fixture
+def auth_headers():
+    def build(user_id="user-1"):
+        return {"Authorization": f"Bearer {_make_token(user_id)}"}
+
+    return build
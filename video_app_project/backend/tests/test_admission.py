@@ -0,0 +1,143 @@
+import threading
+import time
+
+import pytest
+
+from middleware.admission import AdmissionController, AdmissionRejected
+
+
+def controller(**overrides):
+    settings = dict(
+        max_concurrency=1,
+        max_queue=4,
+        queue_timeout_ms=2000,
+        target_queue_ms=50,
+        interval_ms=500,
+        endpoint_limits={},
+        priorities={"video.stream_video": 0, "auth.signup": 2},
+    )
+    settings.update(overrides)
+    return AdmissionController(**settings)
+
+
+def wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached")
+        time.sleep(0.001)
+
+
+def start_waiter(admission, endpoint, order):
+    def run():
+        try:
+            admission.acquire(endpoint)
+        except AdmissionRejected as exc:
+            order.append((endpoint, exc.reason))
+            return
+        order.append(endpoint)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+def test_admits_immediately_while_slots_are_free():
+    admission = controller(max_concurrency=2)
+    assert admission.acquire("a") == 0.0
+    assert admission.acquire("b") == 0.0
+    assert admission.stats()["active"] == 2
+
+
+def test_queued_requests_run_in_priority_order():
+    admission = controller()
+    admission.acquire("holder")
+    order = []
+    threads = []
+    for endpoint in ("auth.signup", "other", "video.stream_video"):
+        threads.append(start_waiter(admission, endpoint, order))
+        wait_for(lambda: admission.stats()["queued"] == len(threads))
+
+    running = "holder"
+    for count in range(1, 4):
+        admission.release(running)
+        wait_for(lambda: len(order) == count)
+        running = order[-1]
+    for thread in threads:
+        thread.join(1)
+    assert order == ["video.stream_video", "other", "auth.signup"]
+
+
+def test_full_queue_sheds_the_lowest_priority():
+    admission = controller(max_queue=1)
+    admission.acquire("holder")
+    order = []
+    low = start_waiter(admission, "auth.signup", order)
+    wait_for(lambda: admission.stats()["queued"] == 1)
+
+    # A higher-priority arrival evicts the queued low-priority request...
+    high = start_waiter(admission, "video.stream_video", order)
+    low.join(1)
+    assert order == [("auth.signup", "evicted")]
+    wait_for(lambda: admission.stats()["queued"] == 1)
+
+    # ...and an equal-or-lower one is turned away.
+    with pytest.raises(AdmissionRejected) as excinfo:
+        admission.acquire("auth.signup")
+    assert excinfo.value.reason == "queue_full"
+    assert excinfo.value.retry_after >= 1
+
+    admission.release("holder")
+    high.join(1)
+    assert order[-1] == "video.stream_video"
+
+
+def test_queue_timeout_rejects_with_retry_after():
+    admission = controller(queue_timeout_ms=20)
+    admission.acquire("holder")
+    with pytest.raises(AdmissionRejected) as excinfo:
+        admission.acquire("other")
+    assert excinfo.value.reason == "queue_timeout"
+    assert admission.stats()["queued"] == 0
+
+
+def test_standing_queue_sheds_low_priority_on_arrival():
+    admission = controller(queue_timeout_ms=100, target_queue_ms=5, interval_ms=0)
+    admission.acquire("holder")
+    with pytest.raises(AdmissionRejected):
+        admission.acquire("other")
+    assert admission.stats()["overloaded"]
+
+    # Everything above priority 0 is shed without queueing...
+    for endpoint in ("other", "auth.signup"):
+        started = time.monotonic()
+        with pytest.raises(AdmissionRejected) as excinfo:
+            admission.acquire(endpoint)
+        assert excinfo.value.reason == "shed_on_arrival"
+        assert time.monotonic() - started < 0.01
+
+    # ...while priority 0 still queues with the full timeout.
+    order = []
+    stream = start_waiter(admission, "video.stream_video", order)
+    wait_for(lambda: admission.stats()["queued"] == 1)
+    # Past the 5 ms target that used to cut low-priority deadlines short.
+    time.sleep(0.03)
+    admission.release("holder")
+    stream.join(1)
+    assert order == ["video.stream_video"]
+
+
+def test_arrival_is_not_held_behind_a_waiter_at_its_endpoint_limit():
+    admission = controller(max_concurrency=4, endpoint_limits={"auth.login": 1})
+    admission.acquire("auth.login")
+    order = []
+    blocked = start_waiter(admission, "auth.login", order)
+    wait_for(lambda: admission.stats()["queued"] == 1)
+
+    # The pool has free slots; only the queued login's own limit is full.
+    assert admission.acquire("other") == 0.0
+    assert admission.stats()["queued"] == 1
+
+    admission.release("auth.login")
+    blocked.join(1)
+    assert order == ["auth.login"]
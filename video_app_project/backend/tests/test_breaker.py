@@ -0,0 +1,167 @@
+import time
+
+import pytest
+from pymongo.errors import ServerSelectionTimeoutError
+
+from db.breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    SCAN_COMMENT,
+    BreakerCommandListener,
+    BreakerHeartbeatListener,
+    CircuitBreaker,
+    DatabaseUnavailable,
+)
+from db.collections import get_collection
+from db.memory import MemoryClient
+from db.mongo import get_breaker
+
+
+def breaker_client(latency_ms=0.0, **settings):
+    breaker = CircuitBreaker(**{"failure_threshold": 3, "open_seconds": 0.05, **settings})
+    client = MemoryClient(
+        latency_ms=latency_ms,
+        event_listeners=[BreakerCommandListener(breaker), BreakerHeartbeatListener(breaker)],
+    )
+    return breaker, client.get_default_database()["things"], client
+
+
+def fail(collection, times):
+    for _ in range(times):
+        with pytest.raises(ServerSelectionTimeoutError):
+            collection.find_one({})
+
+
+def test_opens_after_consecutive_failures_counted_once_each():
+    breaker, collection, client = breaker_client()
+    client.outage = True
+    fail(collection, 2)
+    assert breaker.state == CLOSED
+    assert breaker.stats()["consecutive_failures"] == 2
+    fail(collection, 1)
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+
+def test_success_resets_the_failure_count():
+    breaker, collection, client = breaker_client()
+    client.outage = True
+    fail(collection, 2)
+    client.outage = False
+    collection.find_one({})
+    assert breaker.stats()["consecutive_failures"] == 0
+
+
+def test_half_open_probe_closes_on_success():
+    breaker, collection, client = breaker_client()
+    client.outage = True
+    fail(collection, 3)
+    client.outage = False
+    time.sleep(0.06)
+
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    # Only one probe at a time.
+    assert not breaker.allow()
+    collection.find_one({})
+    assert breaker.state == CLOSED
+
+
+def test_half_open_probe_reopens_on_failure():
+    breaker, collection, client = breaker_client()
+    client.outage = True
+    fail(collection, 3)
+    time.sleep(0.06)
+
+    assert breaker.allow()
+    fail(collection, 1)
+    assert breaker.state == OPEN
+    assert breaker.stats()["transitions"] == {"closed->open": 1, "open->half_open": 1, "half_open->open": 1}
+
+
+def test_slow_commands_count_as_failures():
+    breaker, collection, _ = breaker_client(latency_ms=5, latency_threshold_ms=1)
+    for _ in range(3):
+        collection.find_one({})
+    assert breaker.state == OPEN
+
+
+def test_slow_scans_do_not_count_as_failures():
+    breaker, collection, _ = breaker_client(latency_ms=5, latency_threshold_ms=1)
+    collection.insert_one({"n": 1})
+    breaker._failures = 0
+    for _ in range(3):
+        collection.find_one({}, comment=SCAN_COMMENT)
+        list(collection.find({}, comment=SCAN_COMMENT).batch_size(1))
+    assert breaker.state == CLOSED
+    assert breaker.stats()["consecutive_failures"] == 0
+
+
+def test_scan_tiers_tag_their_reads(app):
+    for read, comment in (("reporting", SCAN_COMMENT), ("primary_scan", SCAN_COMMENT), ("primary", None)):
+        cursor = get_collection("video_watch_history", read=read).find({})
+        assert cursor._comment == comment
+
+
+def open_breaker():
+    breaker = get_breaker()
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    assert breaker.state == OPEN
+    return breaker
+
+
+def test_breaker_is_checked_per_operation_not_per_lookup(app):
+    breaker = open_breaker()
+    users = get_collection("users")
+    with pytest.raises(DatabaseUnavailable):
+        users.find_one({})
+    with pytest.raises(DatabaseUnavailable):
+        users.insert_one({"n": 1})
+
+    # Half-open: fetching collections does not use up the probe...
+    breaker.open_seconds = 0
+    for _ in range(3):
+        get_collection("users")
+    assert breaker.state == OPEN
+    # ...the first operation is the probe, and its success closes the breaker.
+    users.find_one({})
+    assert breaker.state == CLOSED
+
+
+def test_background_readers_never_take_the_probe(app):
+    breaker = open_breaker()
+    breaker.open_seconds = 0
+    refresher = get_collection("users", read="primary_scan", background=True)
+    for _ in range(3):
+        with pytest.raises(DatabaseUnavailable):
+            refresher.find_one({})
+    assert breaker.state == OPEN
+
+    get_collection("users").find_one({})
+    assert breaker.state == CLOSED
+    assert refresher.find_one({}) is None
+
+
+def test_open_breaker_fails_fast_with_503(client, db_client, auth_headers):
+    db_client.outage = True
+    for _ in range(5):
+        assert client.get("/auth/me", headers=auth_headers()).status_code == 503
+    db_client.outage = False
+
+    started = time.perf_counter()
+    response = client.get("/auth/me", headers=auth_headers())
+    assert response.status_code == 503
+    assert int(response.headers["Retry-After"]) >= 1
+    assert time.perf_counter() - started < 0.5
+
+
+def test_blacklist_outage_fails_closed(client, db, db_client, make_token):
+    from auth.tokens import token_digest
+
+    token = make_token("revoked-user")
+    db["token_blacklist"].insert_one({"token_hash": token_digest(token)})
+    db_client.outage = True
+    response = client.get("/auth/me", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 503
@@ -0,0 +1,138 @@
+import json
+import os
+import random
+import time
+
+import pytest
+
+import replay_traffic
+from middleware.capture import CaptureWriter, Pseudonymizer
+
+EMAIL = "Ada.Lovelace@Example.com"
+PASSWORD = "Str0ng-Passw0rd!"
+
+
+def wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached")
+        time.sleep(0.005)
+
+
+@pytest.fixture
+def build_app(monkeypatch):
+    """create_app with overridden settings; config is read at init time."""
+    from config.config import TestingConfig
+
+    def build(**settings):
+        for name, value in settings.items():
+            monkeypatch.setattr(TestingConfig, name, value)
+        from app import create_app
+
+        return create_app("testing")
+
+    return build
+
+
+def test_pseudonyms_are_stable_and_reveal_nothing(make_token):
+    pseudonyms = Pseudonymizer("capture-secret")
+    first = pseudonyms.identity(f"Bearer {make_token('u1')}")
+    assert first == pseudonyms.identity(f"Bearer {make_token('u1')}")
+    assert first != pseudonyms.identity(f"Bearer {make_token('u2')}")
+    assert first.startswith("<user:") and "u1" not in first
+    assert pseudonyms.identity("Token abc") is None
+    # Another key gives unrelated tags, so captures from two runs don't link.
+    assert Pseudonymizer("other-secret").identity(f"Bearer {make_token('u1')}") != first
+
+    body = {"email": EMAIL, "password": PASSWORD, "confirm_password": PASSWORD, "full_name": "Ada"}
+    assert pseudonyms.value("email", EMAIL, body) == pseudonyms.tag("email", EMAIL.lower())
+    assert pseudonyms.value("password", PASSWORD, body) == "<strong>"
+    assert pseudonyms.value("password", "short", body) == "<weak>"
+    assert pseudonyms.value("confirm_password", PASSWORD, body) == "<match>"
+    assert pseudonyms.value("confirm_password", "other", body) == "<mismatch>"
+    assert pseudonyms.value("full_name", "Ada", body) == "<str:3>"
+    assert pseudonyms.value("refresh_token", "abc", body) == "<token>"
+    assert pseudonyms.value("limit", 5, body) == 5
+
+
+@pytest.fixture
+def captured(build_app, tmp_path):
+    path = tmp_path / "traffic.ndjson"
+    app = build_app(CAPTURE_ENABLED=True, CAPTURE_FILE=str(path), CAPTURE_SECRET="capture-secret")
+    client = app.test_client()
+    environ = {"REMOTE_ADDR": "203.0.113.7"}
+    signup = {"full_name": "Ada", "email": EMAIL, "password": PASSWORD, "confirm_password": PASSWORD}
+    assert client.post("/auth/signup", json=signup, environ_base=environ).status_code == 201
+    login = client.post("/auth/login", json={"email": EMAIL, "password": PASSWORD}, environ_base=environ)
+    token = login.get_json()["token"]
+    assert client.get("/auth/me", headers={"Authorization": f"Bearer {token}"}, environ_base=environ).status_code == 200
+    assert client.post("/auth/login", json={"email": EMAIL, "password": "wrong"}, environ_base=environ).status_code == 401
+
+    writer = app.extensions["capture"]
+    wait_for(lambda: writer.stats()["written"] == 4)
+    return path, token
+
+
+def test_capture_keeps_request_shape_without_user_data(captured):
+    path, token = captured
+    text = path.read_text()
+    for secret in (EMAIL, EMAIL.lower(), PASSWORD, "wrong", "203.0.113.7", token, "Ada"):
+        assert secret not in text
+
+    records = [json.loads(line) for line in text.splitlines()]
+    assert [(r["endpoint"], r["status"]) for r in records] == [
+        ("auth.signup", 201), ("auth.login", 200), ("auth.get_profile", 200), ("auth.login", 401),
+    ]
+    signup, login, me, failed = records
+    assert signup["body"]["email"] == login["body"]["email"] == failed["body"]["email"]
+    assert signup["body"]["password"] == "<strong>"
+    assert failed["body"]["password"] == "<weak>"
+    assert me["identity"].startswith("<user:")
+    assert len({r["client"] for r in records}) == 1
+    assert all(r["duration_ms"] >= 0 and r["ts"] for r in records)
+
+
+def test_replay_reproduces_the_captured_statuses(captured, build_app):
+    path, _ = captured
+    records = replay_traffic.load_records([str(path)])
+    # A fresh app and database, as replay_traffic.py runs it.
+    app = build_app(CAPTURE_ENABLED=False)
+    world = replay_traffic.ReplayWorld(app, records, 5, random.Random(1))
+    results, _ = replay_traffic.replay(app, world, records, speed=0, concurrency=4)
+
+    summary = replay_traffic.summarize(results, 1.0)
+    assert summary["requests"] == 4
+    assert all(row["status_mismatches"] == 0 for row in summary["endpoints"].values())
+
+
+def test_a_users_requests_replay_in_capture_order(captured):
+    path, _ = captured
+    records = replay_traffic.load_records([str(path)])
+    signup, login = records[0], records[1]
+    # Keyed by email before the user has a token, so login waits for signup.
+    assert replay_traffic.lane_key(signup) == replay_traffic.lane_key(login)
+
+
+def test_writer_rotates_and_recovers_from_write_errors(tmp_path):
+    blocker = tmp_path / "blocked"
+    blocker.write_text("a file where the capture directory should be")
+    writer = CaptureWriter(str(blocker / "traffic.ndjson"), max_bytes=0)
+    writer.put({"n": 1})
+    wait_for(lambda: writer.stats()["queued"] == 0)
+    time.sleep(0.05)
+    assert writer.stats()["written"] == 0
+
+    # Once the path is usable again the next line gets through.
+    os.remove(blocker)
+    writer.put({"n": 2})
+    wait_for(lambda: writer.stats()["written"] == 1)
+    assert (blocker / "traffic.ndjson").read_text() == '{"n":2}\n'
+
+    rotating = CaptureWriter(str(tmp_path / "rotating.ndjson"), max_bytes=20)
+    for n in range(3):
+        rotating.put({"line": n})
+        wait_for(lambda: rotating.stats()["written"] == n + 1)
+    assert (tmp_path / "rotating.ndjson.1").exists()
+    lines = (tmp_path / "rotating.ndjson.1").read_text() + (tmp_path / "rotating.ndjson").read_text()
+    assert [json.loads(line)["line"] for line in lines.splitlines()] == [0, 1, 2]
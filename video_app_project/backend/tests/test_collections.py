@@ -0,0 +1,92 @@
+import threading
+import time
+
+from pymongo import ReadPreference
+
+from db.collections import TIERS, PolicyCollection, get_collection
+from db.memory import MemoryClient
+
+
+def timed(fn):
+    started = time.perf_counter()
+    fn()
+    return (time.perf_counter() - started) * 1000
+
+
+def test_majority_writes_wait_for_replication():
+    client = MemoryClient(replication_ms=30)
+    scratch = client.get_default_database()["scratch"]
+    durable = PolicyCollection(scratch, TIERS["durable"], TIERS["durable"])
+    fast = PolicyCollection(scratch, TIERS["fast_write"], TIERS["fast_write"])
+
+    assert timed(lambda: durable.insert_one({"n": 1})) >= 30
+    assert timed(lambda: fast.insert_one({"n": 2})) < 30
+    # Both views write to the same documents.
+    assert scratch.count_documents({}) == 2
+
+
+def test_reads_and_writes_use_their_own_tier():
+    client = MemoryClient()
+    scratch = client.get_default_database()["scratch"]
+    wrapped = PolicyCollection(scratch, TIERS["reporting"], TIERS["durable"])
+
+    assert wrapped._reader.read_preference == TIERS["reporting"].read_preference
+    assert wrapped._writer.write_concern.document == {"w": "majority", "wtimeout": 5000}
+    assert wrapped.find({})._max_time_ms == TIERS["reporting"].max_time_ms
+    assert wrapped.find({}, max_time_ms=None)._max_time_ms is None
+
+
+def test_get_collection_applies_policies_and_overrides(app):
+    history = get_collection("video_watch_history")
+    assert history.read_tier is TIERS["reporting"]
+    assert history.write_tier is TIERS["fast_write"]
+    assert get_collection("video_watch_history") is history
+
+    overridden = get_collection("video_watch_history", read="primary")
+    assert overridden.read_tier is TIERS["primary"]
+    assert overridden is not history
+
+
+def test_get_collection_cache_follows_the_live_client(app):
+    from app import create_app
+
+    first = get_collection("users")
+    first.insert_one({"email": "a@example.com"})
+    create_app("testing")
+    second = get_collection("users")
+    assert second is not first
+    assert second.find_one({"email": "a@example.com"}) is None
+
+
+def test_checkpointed_readers_read_from_the_primary(app, db, monkeypatch):
+    from analytics import rollup
+    from auth import email_filter
+    from video import catalog, watch_sets
+
+    reads = []
+
+    def recording(name, **options):
+        wrapped = get_collection(name, **options)
+        reads.append((name, wrapped.read_tier))
+        return wrapped
+
+    for module in (rollup, email_filter, catalog, watch_sets):
+        monkeypatch.setattr(module, "get_collection", recording)
+
+    bloom = email_filter.EmailFilter(capacity=100, fp_rate=0.01)
+    bloom.rebuild()
+    bloom.refresh()
+    rollup.run_incremental("video_watch_history")
+    app.extensions["watch_sets"].get("u1")
+    stop = threading.Event()
+    refresher = threading.Thread(target=catalog._refresh_loop, args=(app.extensions["catalog"], 0.001, 1, stop))
+    refresher.start()
+    deadline = time.monotonic() + 2
+    while not any(name == "videos" for name, _ in reads) and time.monotonic() < deadline:
+        time.sleep(0.001)
+    stop.set()
+    refresher.join(1)
+
+    sources = [(name, tier) for name, tier in reads if name in ("users", "videos", "video_watch_history")]
+    assert {name for name, _ in sources} == {"users", "videos", "video_watch_history"}
+    assert all(tier.read_preference == ReadPreference.PRIMARY for _, tier in sources)
@@ -0,0 +1,111 @@
+import math
+import threading
+
+import pytest
+
+from auth import email_filter as email_filter_module
+from auth.email_filter import BloomFilter, EmailFilter
+
+PASSWORD = "Str0ng-Passw0rd!"
+
+
+def signup(client, email):
+    return client.post("/auth/signup", json={
+        "full_name": "Test User", "email": email, "password": PASSWORD, "confirm_password": PASSWORD,
+    })
+
+
+@pytest.fixture
+def email_filter(app, monkeypatch):
+    email_filter = EmailFilter(capacity=1000, fp_rate=0.01)
+    monkeypatch.setattr(email_filter_module, "_email_filter", email_filter)
+    return email_filter
+
+
+def test_bloom_filter_has_no_false_negatives_and_holds_its_fp_rate():
+    bloom = BloomFilter(capacity=5000, fp_rate=0.01)
+    members = [f"user{i}@example.com" for i in range(5000)]
+    for email in members:
+        bloom.add(email)
+    assert all(email in bloom for email in members)
+
+    false_positives = sum(f"other{i}@example.com" in bloom for i in range(20000))
+    assert false_positives / 20000 < 0.02
+    assert math.isclose(bloom.estimated_fp_rate(), 0.01, rel_tol=0.3)
+
+
+def test_every_insert_is_counted():
+    bloom = BloomFilter(capacity=100, fp_rate=0.01)
+    bloom.add("a@example.com")
+    bits = bytes(bloom._array)
+    bloom.add("a@example.com")
+    # No new bit, but the estimate must not treat the filter as emptier than it is.
+    assert bytes(bloom._array) == bits
+    assert bloom.count == 2
+    once = BloomFilter(capacity=100, fp_rate=0.01)
+    once.add("a@example.com")
+    assert bloom.estimated_fp_rate() > once.estimated_fp_rate()
+
+
+def test_answers_maybe_until_built(app, db):
+    db["users"].insert_one({"email": "known@example.com"})
+    email_filter = EmailFilter(capacity=100, fp_rate=0.01)
+    assert email_filter.might_exist("unknown@example.com")
+
+    email_filter.rebuild()
+    assert email_filter.ready
+    assert email_filter.might_exist("known@example.com")
+    assert not email_filter.might_exist("unknown@example.com")
+
+
+def test_signups_during_a_rebuild_are_kept(app, db, monkeypatch):
+    db["users"].insert_one({"email": "old@example.com"})
+    email_filter = EmailFilter(capacity=100, fp_rate=0.01)
+    scanning = threading.Event()
+    release = threading.Event()
+    real_find = type(db["users"]).find
+
+    def slow_find(collection, *args, **kwargs):
+        scanning.set()
+        release.wait(2)
+        return real_find(collection, *args, **kwargs)
+
+    monkeypatch.setattr(type(db["users"]), "find", slow_find)
+    rebuild = threading.Thread(target=email_filter.rebuild)
+    rebuild.start()
+    scanning.wait(2)
+    email_filter.add("new@example.com")
+    release.set()
+    rebuild.join(2)
+
+    assert email_filter.might_exist("new@example.com")
+    assert email_filter.might_exist("old@example.com")
+
+
+def test_refresh_picks_up_users_from_other_processes(app, db):
+    email_filter = EmailFilter(capacity=100, fp_rate=0.01)
+    email_filter.rebuild()
+    db["users"].insert_one({"email": "elsewhere@example.com"})
+    assert not email_filter.might_exist("elsewhere@example.com")
+    assert email_filter.refresh() == 1
+    assert email_filter.might_exist("elsewhere@example.com")
+
+
+def test_login_rejects_unknown_emails_from_the_filter(client, email_filter):
+    email_filter.rebuild()
+    response = client.post("/auth/login", json={"email": "nobody@example.com", "password": PASSWORD})
+    assert response.status_code == 401
+    assert email_filter.rejections == 1
+
+
+def test_signup_filter_miss_still_rejects_duplicates(client, email_filter, db):
+    email_filter.rebuild()
+    assert signup(client, "dup@example.com").status_code == 201
+    assert email_filter.might_exist("dup@example.com")
+
+    # As on another process whose filter has not seen the new user yet.
+    email_filter._filter = BloomFilter(capacity=1000, fp_rate=0.01)
+    assert not email_filter.might_exist("dup@example.com")
+    response = signup(client, "dup@example.com")
+    assert response.status_code == 400
+    assert db["users"].count_documents({"email": "dup@example.com"}) == 1
@@ -0,0 +1,80 @@
+import csv
+import dataclasses
+import io
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from db import collections
+
+
+@pytest.fixture
+def history(app, db):
+    app.config["HISTORY_EXPORT_BATCH_SIZE"] = 10
+    app.config["HISTORY_EXPORT_ROWS_PER_CHUNK"] = 25
+    video = db["videos"].insert_one({"title": "Known video", "is_active": True}).inserted_id
+    app.extensions["catalog"].refresh(db["videos"])
+    start = datetime(2026, 1, 1)
+    # Inserted newest first, so the export has to sort.
+    db["video_watch_history"].insert_many([
+        {"user_id": "u1", "video_id": str(video) if i % 2 else "gone", "watched_at": start + timedelta(minutes=i)}
+        for i in reversed(range(120))
+    ] + [{"user_id": "u2", "video_id": "other", "watched_at": start}])
+    return str(video)
+
+
+def test_ndjson_streams_the_callers_history_in_order(client, history, auth_headers):
+    response = client.get("/me/history/export", headers=auth_headers("u1"))
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    assert response.is_streamed
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert len(rows) == 120
+    assert rows[0] == {"watched_at": "2026-01-01T00:00:00Z", "video_id": "gone", "title": ""}
+    assert rows[1]["title"] == "Known video"
+    assert [row["watched_at"] for row in rows] == sorted(row["watched_at"] for row in rows)
+
+
+def test_csv_has_a_header_row(client, history, auth_headers):
+    response = client.get("/me/history/export?format=csv", headers=auth_headers("u1"))
+    rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+    assert rows[0] == ["watched_at", "video_id", "title"]
+    assert len(rows) == 121
+
+
+def test_empty_history_and_bad_format(client, history, auth_headers):
+    assert client.get("/me/history/export", headers=auth_headers("nobody")).get_data() == b""
+    assert client.get("/me/history/export?format=xml", headers=auth_headers("u1")).status_code == 400
+    assert client.get("/me/history/export").status_code == 401
+
+
+def test_long_exports_are_not_cut_off_by_the_reporting_time_limit(client, db_client, history, auth_headers,
+                                                                  monkeypatch):
+    # 12 batches of 2 ms each against a 10 ms limit that covers the whole cursor.
+    monkeypatch.setitem(
+        collections.TIERS, "reporting", dataclasses.replace(collections.TIERS["reporting"], max_time_ms=10)
+    )
+    monkeypatch.setattr(collections, "_cache", (None, {}))
+    db_client.latency_ms = 2
+    response = client.get("/me/history/export", headers=auth_headers("u1"))
+    assert len(response.get_data(as_text=True).splitlines()) == 120
+
+
+def test_database_failure_mid_stream_ends_with_an_error_line(client, db_client, history, auth_headers):
+    response = client.get("/me/history/export", headers=auth_headers("u1"), buffered=False)
+    chunks = iter(response.response)
+    body = next(chunks)
+    db_client.outage = True
+    body += b"".join(chunks)
+    db_client.outage = False
+
+    # Rows already fetched in the current batch are still sent.
+    *rows, marker = body.decode().splitlines()
+    assert json.loads(marker) == {"error": "export interrupted", "rows": len(rows)}
+    assert 25 <= len(rows) < 120
+
+
+def test_unreachable_database_before_the_first_row_is_a_503(client, db_client, history, auth_headers):
+    db_client.outage = True
+    assert client.get("/me/history/export", headers=auth_headers("u1")).status_code == 503
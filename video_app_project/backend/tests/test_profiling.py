@@ -0,0 +1,148 @@
+import json
+import os
+
+import pytest
+
+from middleware.profiling import PROFILE_HEADER, sign_profile_token
+
+SECRET = "profile-secret"
+
+
+@pytest.fixture
+def build_app(monkeypatch, tmp_path):
+    """create_app with profiling switched on; settings are read at init time."""
+    import db.mongo
+    from config.config import TestingConfig
+
+    # Keep this app's listener out of the clients later tests create.
+    monkeypatch.setattr(db.mongo, "_command_listeners", [])
+    spool = tmp_path / "profiles"
+
+    def build(**overrides):
+        settings = {
+            "PROFILING_ENABLED": True,
+            "PROFILING_SECRET": SECRET,
+            "PROFILING_SAMPLE_EVERY": 0,
+            "PROFILING_INTERVAL_MS": 1,
+            "PROFILING_SPOOL_DIR": str(spool),
+            "PROFILING_SPOOL_MAX_FILES": 50,
+            **overrides,
+        }
+        for name, value in settings.items():
+            monkeypatch.setattr(TestingConfig, name, value)
+        from app import create_app
+
+        app = create_app("testing")
+        db.mongo.get_db_client().latency_ms = 5
+        return app
+
+    build.spool = spool
+    return build
+
+
+def profiles(spool):
+    if not spool.exists():
+        return []
+    return [json.loads((spool / name).read_text()) for name in sorted(os.listdir(spool)) if name.endswith(".meta.json")]
+
+
+def test_signed_request_writes_a_profile_with_its_mongo_commands(build_app, auth_headers):
+    app = build_app()
+    assert "profiling" in app.extensions
+    client = app.test_client()
+    from db.mongo import get_db_client
+
+    get_db_client().get_default_database()["users"].insert_one(
+        {"user_id": "u1", "full_name": "Ada", "email": "ada@example.com"}
+    )
+    headers = {**auth_headers("u1"), PROFILE_HEADER: sign_profile_token(SECRET)}
+    response = client.get("/auth/me", headers=headers)
+    assert response.status_code == 200
+
+    [meta] = profiles(build_app.spool)
+    assert meta["profile_id"] == response.headers["X-Profile-Id"]
+    assert meta["reason"] == "requested"
+    assert meta["endpoint"] == "auth.get_profile"
+    assert meta["status"] == 200
+    # Blacklist check and profile lookup, each behind 5 ms of injected latency.
+    assert [c["command"] for c in meta["mongo_commands"]] == ["find", "find"]
+    assert meta["mongo_total_ms"] >= 10
+    assert meta["samples"] > 0
+
+    stem = next(name for name in os.listdir(build_app.spool) if name.endswith(".meta.json"))[: -len(".meta.json")]
+    folded = (build_app.spool / f"{stem}.folded").read_text()
+    assert "get_profile" in folded
+    speedscope = json.loads((build_app.spool / f"{stem}.speedscope.json").read_text())
+    assert speedscope["profiles"][0]["type"] == "sampled"
+    assert sum(speedscope["profiles"][0]["weights"]) > 0
+
+
+def test_requests_without_a_token_are_not_profiled(build_app):
+    client = build_app().test_client()
+    response = client.get("/")
+    assert "X-Profile-Id" not in response.headers
+    assert profiles(build_app.spool) == []
+
+
+@pytest.mark.parametrize("token", [
+    sign_profile_token("another-secret"),
+    sign_profile_token(SECRET, ttl_seconds=-1),
+    "not-a-token",
+    "",
+])
+def test_invalid_tokens_are_refused(build_app, token):
+    client = build_app().test_client()
+    response = client.get("/", headers={PROFILE_HEADER: token})
+    assert response.status_code == 200
+    assert "X-Profile-Id" not in response.headers
+    assert profiles(build_app.spool) == []
+
+
+def test_tokens_are_refused_without_a_profiling_secret(build_app):
+    client = build_app(PROFILING_SECRET="", PROFILING_SAMPLE_EVERY=1000).test_client()
+    for secret in ("", client.application.config["SECRET_KEY"]):
+        response = client.get("/", headers={PROFILE_HEADER: sign_profile_token(secret)})
+        assert "X-Profile-Id" not in response.headers
+    assert profiles(build_app.spool) == []
+
+
+def test_profiling_stays_off_without_a_secret_or_sampling(build_app):
+    app = build_app(PROFILING_SECRET="")
+    assert "profiling" not in app.extensions
+
+
+def test_sampling_profiles_one_request_in_n(build_app):
+    client = build_app(PROFILING_SAMPLE_EVERY=2).test_client()
+    tagged = [("X-Profile-Id" in client.get("/").headers) for _ in range(4)]
+    assert tagged == [False, True, False, True]
+    assert [meta["reason"] for meta in profiles(build_app.spool)] == ["sampled", "sampled"]
+
+
+def test_spool_keeps_only_the_newest_profiles(build_app):
+    client = build_app(PROFILING_SAMPLE_EVERY=1, PROFILING_SPOOL_MAX_FILES=3).test_client()
+    for _ in range(5):
+        client.get("/")
+    assert len(profiles(build_app.spool)) == 3
+    assert len(os.listdir(build_app.spool)) == 9
+
+
+def test_streamed_export_is_profiled_until_its_last_row(build_app, auth_headers):
+    app = build_app()
+    client = app.test_client()
+    from db.mongo import get_db_client
+
+    history = get_db_client().get_default_database()["video_watch_history"]
+    history.insert_many([{"user_id": "u1", "video_id": "v", "watched_at": None} for _ in range(30)])
+    app.config["HISTORY_EXPORT_BATCH_SIZE"] = 10
+    headers = {**auth_headers("u1"), PROFILE_HEADER: sign_profile_token(SECRET)}
+    response = client.get("/me/history/export", headers=headers)
+    # Nothing is written until the generator has run to the end.
+    assert profiles(build_app.spool) == []
+    assert len(response.get_data(as_text=True).splitlines()) == 30
+    response.close()
+
+    [meta] = profiles(build_app.spool)
+    commands = [c["command"] for c in meta["mongo_commands"]]
+    # The getMores ran after the view returned; they still belong to this profile.
+    assert "find" in commands
+    assert commands.count("getMore") >= 2
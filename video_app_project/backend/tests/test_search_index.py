@@ -0,0 +1,89 @@
+import math
+
+from video.search_index import SearchIndex
+
+
+def ordinals(results):
+    return [ordinal for ordinal, _ in results]
+
+
+def build(docs, **settings):
+    index = SearchIndex(**settings)
+    for ordinal, (title, description) in enumerate(docs):
+        index.add(ordinal, title, description)
+    return index
+
+
+def test_title_matches_outrank_description_matches():
+    index = build([
+        ("Cooking at home", "a python tutorial in the kitchen"),
+        ("Python for beginners", "learn to code"),
+    ])
+    assert ordinals(index.search("python")) == [1, 0]
+
+
+def test_rare_terms_outweigh_common_ones():
+    index = build([("live music", ""), ("live news", ""), ("live music", ""), ("ocean live", "")])
+    results = index.search("live ocean", prefix=False)
+    assert results[0][0] == 3
+
+
+def test_scores_match_bm25():
+    index = build([("alpha beta", ""), ("beta gamma gamma", "")], k1=1.2, b=0.75)
+    (ordinal, score), = index.search("alpha", prefix=False)
+    # alpha: df 1 of 2 docs, tf 2 (title weight) in a doc of length 4; avg length 5.
+    idf = math.log(1 + (2 - 1 + 0.5) / (1 + 0.5))
+    expected = idf * 2.2 * 2 / (2 + 1.2 * (1 - 0.75 + 0.75 * 4 / 5))
+    assert ordinal == 0
+    assert math.isclose(score, expected, rel_tol=1e-9)
+
+
+def test_last_token_matches_as_a_prefix():
+    index = build([("Travel guide", ""), ("Trivia night", "")])
+    assert ordinals(index.search("trav")) == [0]
+    assert index.search("trav", prefix=False) == []
+    assert index.search("trav ") == []
+
+
+def test_prefix_expands_to_its_most_frequent_completions():
+    docs = [("travel", "")] * 5 + [("trav", "")] + [(f"trav{c}", "") for c in "abcdefgh"]
+    index = build(docs, max_prefix_terms=3)
+    assert index._expand("trav") == ["trav", "travel", "trava"]
+    assert sorted(ordinals(index.search("trav", limit=20))) == [0, 1, 2, 3, 4, 5, 6]
+
+
+def test_short_prefixes_match_whole_words_only():
+    index = build([("TV guide", ""), ("Travel guide", "")], min_prefix_length=3)
+    assert ordinals(index.search("tv")) == [0]
+    assert index.search("tr") == []
+    assert ordinals(index.search("tra")) == [1]
+
+
+def test_reindexing_and_removal_replace_old_postings():
+    index = build([("Space documentary", ""), ("Ocean life", "")])
+    index.add(0, "Desert documentary", "")
+    assert index.search("space") == []
+    assert ordinals(index.search("desert")) == [0]
+
+    index.on_catalog_change(1, {"title": "Ocean life", "is_active": False})
+    assert index.search("ocean") == []
+    assert len(index) == 1
+
+
+def test_compaction_keeps_results():
+    index = SearchIndex()
+    for round_ in range(3):
+        for ordinal in range(600):
+            index.add(ordinal, f"video {ordinal}", f"round {round_}")
+    assert index.stats()["documents"] == 600
+    assert ordinals(index.search("video 42", prefix=False, limit=1)) == [42]
+    assert ordinals(index.search("round 2", prefix=False, limit=3))
+
+
+def test_query_cost_is_bounded_by_the_scan_budget():
+    index = SearchIndex(max_scan=50)
+    for ordinal in range(1000):
+        index.add(ordinal, "common words everywhere", "rare" if ordinal == 7 else "")
+    results = index.search("rare common", prefix=False, limit=5)
+    assert results[0][0] == 7
+    assert len(results) <= 5
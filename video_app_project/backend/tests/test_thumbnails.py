@@ -0,0 +1,180 @@
+import io
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from PIL import Image
+
+from thumbnails.store import HttpOrigin, OriginError, ThumbnailStore
+
+
+def png(width=800, height=450):
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 40, 40)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+class StubOrigin:
+    """A local HTTP server standing in for the thumbnail origin."""
+
+    def __init__(self, body, delay=0.0, content_type="image/png"):
+        self.body = body
+        self.delay = delay
+        self.content_type = content_type
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.requests.append(self.path)
+                time.sleep(stub.delay)
+                if self.path.startswith("/missing"):
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", stub.content_type)
+                self.send_header("Content-Length", str(len(stub.body)))
+                self.end_headers()
+                self.wfile.write(stub.body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, args=(0.01,), daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def origin():
+    stub = StubOrigin(png(), delay=0.05)
+    yield stub
+    stub.close()
+
+
+@pytest.fixture
+def store(app, origin, tmp_path):
+    store = ThumbnailStore(str(tmp_path / "cache"), HttpOrigin(origin.url + "/{video_id}.png"), [160, 320])
+    app.extensions["thumbnail_store"] = store
+    return store
+
+
+@pytest.fixture
+def video_id(app, db):
+    video = db["videos"].insert_one({"title": "Thumb", "is_active": True, "youtube_id": "yt1"}).inserted_id
+    app.extensions["catalog"].refresh(db["videos"])
+    return str(video)
+
+
+def test_serves_the_original_and_resized_variants(client, store, origin, video_id):
+    original = client.get(f"/thumbnails/{video_id}")
+    assert original.status_code == 200
+    assert original.mimetype == "image/png"
+    assert original.data == origin.body
+
+    variant = client.get(f"/thumbnails/{video_id}?w=200")
+    assert variant.mimetype == "image/jpeg"
+    assert Image.open(io.BytesIO(variant.data)).size == (320, 180)
+    # The variant is cut from the cached original, not fetched again.
+    assert origin.requests == [f"/{video_id}.png"]
+
+
+def test_concurrent_misses_share_one_fetch_and_one_resize(store, origin, video_id):
+    video = {"_id": video_id}
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: store.variant(video, 160), range(8)))
+
+    assert len(origin.requests) == 1
+    assert store.stats() == {"fetches": 1, "resizes": 1, "in_flight": 0}
+    assert {result.path for result in results} == {os.path.join(store.directory, video_id, "w160.jpg")}
+    assert not [name for name in os.listdir(os.path.dirname(results[0].path)) if name.endswith(".tmp")]
+
+
+def test_conditional_requests_get_304(client, store, video_id):
+    first = client.get(f"/thumbnails/{video_id}?w=160")
+    assert first.headers["ETag"]
+    assert "max-age" in first.headers["Cache-Control"]
+
+    again = client.get(f"/thumbnails/{video_id}?w=160", headers={"If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304
+    assert again.data == b""
+
+    other = client.get(f"/thumbnails/{video_id}?w=320", headers={"If-None-Match": first.headers["ETag"]})
+    assert other.status_code == 200
+
+
+@pytest.mark.parametrize("path", [
+    "/thumbnails/..%2F..%2Fconfig",
+    "/thumbnails/%2e%2e",
+    "/thumbnails/..",
+    "/thumbnails/%2Fetc%2Fpasswd",
+])
+def test_paths_outside_the_catalog_are_not_served(client, store, origin, path):
+    response = client.get(path)
+    assert response.status_code == 404
+    assert origin.requests == []
+    assert not os.path.exists(store.directory)
+
+
+@pytest.mark.parametrize("video_id", ["..", "../escape", "a/b", ""])
+def test_store_rejects_ids_that_leave_the_cache(store, origin, video_id):
+    with pytest.raises(OriginError):
+        store.variant({"_id": video_id}, 160)
+    assert origin.requests == []
+
+
+def test_origin_failure_is_a_502(app, client, origin, video_id, tmp_path):
+    app.extensions["thumbnail_store"] = ThumbnailStore(
+        str(tmp_path / "cache"), HttpOrigin(origin.url + "/missing/{video_id}.png"), [160]
+    )
+    assert client.get(f"/thumbnails/{video_id}").status_code == 502
+
+
+@pytest.mark.parametrize("body, content_type", [
+    (b"<html><body>Sign in</body></html>", "text/html"),
+    (b"<html><body>Sign in</body></html>", "image/png"),
+    (png()[:200], "image/png"),
+    (png(), "image/jpeg"),
+], ids=["html", "html-as-png", "truncated-png", "png-as-jpeg"])
+def test_non_image_origin_responses_are_a_502_and_not_cached(app, client, video_id, tmp_path, body, content_type):
+    stub = StubOrigin(body, content_type=content_type)
+    try:
+        app.extensions["thumbnail_store"] = ThumbnailStore(
+            str(tmp_path / "cache"), HttpOrigin(stub.url + "/{video_id}.png"), [160]
+        )
+        assert client.get(f"/thumbnails/{video_id}").status_code == 502
+        assert client.get(f"/thumbnails/{video_id}?w=160").status_code == 502
+        assert len(stub.requests) == 2
+        assert not (tmp_path / "cache").exists()
+    finally:
+        stub.close()
+
+
+def test_unreadable_cached_original_is_a_502_and_refetched(client, store, origin, video_id):
+    folder = os.path.join(store.directory, video_id)
+    os.makedirs(folder)
+    with open(os.path.join(folder, "original.jpg"), "wb") as handle:
+        handle.write(b"<html>cached by an older version</html>")
+
+    assert client.get(f"/thumbnails/{video_id}?w=160").status_code == 502
+    assert client.get(f"/thumbnails/{video_id}?w=160").status_code == 200
+    assert origin.requests == [f"/{video_id}.png"]
+
+
+def test_failed_resize_leaves_no_temp_file(store, video_id, monkeypatch):
+    def broken_save(self, fp, *args, **kwargs):
+        with open(fp, "wb") as handle:
+            handle.write(b"partial")
+        raise OSError("disk full")
+
+    monkeypatch.setattr(Image.Image, "save", broken_save)
+    with pytest.raises(OSError):
+        store.variant({"_id": video_id}, 160)
+    assert sorted(os.listdir(os.path.join(store.directory, video_id))) == ["original.png"]
@@ -0,0 +1,124 @@
+import base64
+import json
+import os
+import time
+from datetime import datetime, timedelta
+
+import jwt
+import pytest
+
+from auth.tokens import bearer_token, get_codec
+
+SECRET = os.environ["JWT_SECRET_KEY"]
+
+
+def b64(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+@pytest.fixture
+def codec():
+    return get_codec(SECRET, "HS256")
+
+
+def payload(**overrides):
+    return {"user_id": "u1", "exp": datetime.utcnow() + timedelta(hours=1), **overrides}
+
+
+def test_tokens_interoperate_with_pyjwt(codec):
+    token = codec.encode(payload())
+    assert jwt.decode(token, SECRET, algorithms=["HS256"])["user_id"] == "u1"
+    assert codec.decode(jwt.encode(payload(), SECRET, algorithm="HS256"))["user_id"] == "u1"
+    assert codec.decode(token) == jwt.decode(token, SECRET, algorithms=["HS256"])
+
+
+def test_tampered_signature_is_rejected(codec):
+    header, body, signature = codec.encode(payload()).split(".")
+    flipped = signature[:-2] + ("AA" if signature[-2:] != "AA" else "BB")
+    with pytest.raises(jwt.InvalidSignatureError):
+        codec.decode(f"{header}.{body}.{flipped}")
+
+
+def test_tampered_payload_is_rejected(codec):
+    header, _, signature = codec.encode(payload()).split(".")
+    forged = b64(json.dumps({"user_id": "admin", "exp": int(time.time()) + 3600}).encode())
+    with pytest.raises(jwt.InvalidSignatureError):
+        codec.decode(f"{header}.{forged}.{signature}")
+
+
+def test_other_secret_is_rejected(codec):
+    token = jwt.encode(payload(), "another-secret-that-is-32-bytes-long", algorithm="HS256")
+    with pytest.raises(jwt.InvalidSignatureError):
+        codec.decode(token)
+
+
+def test_expired_tokens_raise_expired_signature(codec):
+    with pytest.raises(jwt.ExpiredSignatureError):
+        codec.decode(codec.encode(payload(exp=datetime.utcnow() - timedelta(seconds=1))))
+
+
+@pytest.mark.parametrize("algorithm", ["HS384", "HS512"])
+def test_algorithm_mismatch_is_rejected(codec, algorithm):
+    token = jwt.encode(payload(), SECRET, algorithm=algorithm)
+    with pytest.raises(jwt.InvalidAlgorithmError):
+        codec.decode(token)
+
+
+def test_unsigned_tokens_are_rejected(codec):
+    header = b64(json.dumps({"alg": "none", "typ": "JWT"}).encode())
+    body = b64(json.dumps({"user_id": "u1", "exp": int(time.time()) + 3600}).encode())
+    with pytest.raises(jwt.InvalidTokenError):
+        codec.decode(f"{header}.{body}.")
+
+
+def test_header_with_our_algorithm_but_other_fields_uses_pyjwt(codec):
+    token = jwt.encode(payload(), SECRET, algorithm="HS256", headers={"kid": "k1"})
+    assert codec.decode(token)["user_id"] == "u1"
+
+
+def test_registered_claims_are_still_validated(codec):
+    token = codec.encode(payload(nbf=datetime.utcnow() + timedelta(hours=1)))
+    with pytest.raises(jwt.ImmatureSignatureError):
+        codec.decode(token)
+
+
+@pytest.mark.parametrize("exp", ["tomorrow", True])
+def test_malformed_exp_is_rejected(codec, exp):
+    header, _, _ = codec.encode(payload()).split(".")
+    body = b64(json.dumps({"user_id": "u1", "exp": exp}).encode())
+    signing_input = f"{header}.{body}"
+    signature = codec._sign(signing_input.encode())
+    with pytest.raises(jwt.InvalidTokenError):
+        codec.decode(f"{signing_input}.{signature.decode()}")
+
+
+@pytest.mark.parametrize("token", ["", "a.b", "a.b.c", "ünïcode.b.c", "...."])
+def test_garbage_is_rejected(codec, token):
+    with pytest.raises(jwt.InvalidTokenError):
+        codec.decode(token)
+
+
+def test_bearer_token_parsing():
+    assert bearer_token("Bearer abc ") == "abc"
+    assert bearer_token("Bearer ") == ""
+    assert bearer_token("Token abc") is None
+
+
+@pytest.mark.parametrize("case, error", [
+    ("expired", "token expired"),
+    ("tampered", "invalid token"),
+    ("alg", "invalid token"),
+    ("no_user", "invalid token"),
+])
+def test_protected_routes_reject_bad_tokens(client, make_token, case, error):
+    if case == "expired":
+        token = make_token(expires_in=timedelta(seconds=-1))
+    elif case == "tampered":
+        token = make_token()[:-3] + "abc"
+    elif case == "alg":
+        token = jwt.encode(payload(), SECRET, algorithm="HS512")
+    else:
+        token = get_codec(SECRET).encode({"exp": datetime.utcnow() + timedelta(hours=1)})
+    response = client.get("/auth/me", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 401
+    assert response.get_json()["error"] == error
@@ -0,0 +1,141 @@
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+
+@pytest.fixture
+def video_ids(app, db):
+    result = db["videos"].insert_many([
+        {"title": f"Video {i}", "description": "", "youtube_id": f"yt{i}", "is_active": True}
+        for i in range(20)
+    ])
+    app.extensions["catalog"].refresh(db["videos"])
+    return [str(_id) for _id in result.inserted_ids]
+
+
+@pytest.fixture
+def watch_sets(app):
+    return app.extensions["watch_sets"]
+
+
+def watch(db, user_id, video_id):
+    db["video_watch_history"].insert_one({"user_id": user_id, "video_id": video_id, "watched_at": datetime.utcnow()})
+
+
+def watched(watch_sets, user_id, video_ids):
+    bits = watch_sets.get(user_id)
+    return {video_id for video_id in video_ids if watch_sets._has_bit(bits, watch_sets.catalog.ordinal(video_id))}
+
+
+def test_bitmap_is_loaded_from_history_once(db, watch_sets, video_ids):
+    watch(db, "u1", video_ids[3])
+    watch(db, "u1", video_ids[17])
+    assert watched(watch_sets, "u1", video_ids) == {video_ids[3], video_ids[17]}
+    assert len(watch_sets.get("u1")) == (watch_sets.catalog.size + 7) // 8
+    assert watch_sets.stats()["misses"] == 1
+    assert watch_sets.stats()["hits"] == 1
+
+
+def test_record_updates_cached_bitmaps(db, watch_sets, video_ids):
+    watch_sets.get("u1")
+    watch_sets.record("u1", video_ids[5])
+    watch_sets.record("u2", video_ids[5])
+    assert watched(watch_sets, "u1", video_ids) == {video_ids[5]}
+    # u2 was not cached; its bitmap comes from history, which has no watch.
+    assert watched(watch_sets, "u2", video_ids) == set()
+
+
+def test_watch_recorded_during_a_load_is_kept(db, watch_sets, video_ids, monkeypatch):
+    loading = threading.Event()
+    release = threading.Event()
+    real_load = watch_sets._load
+
+    def slow_load(user_id):
+        bits = real_load(user_id)
+        loading.set()
+        release.wait(2)
+        return bits
+
+    monkeypatch.setattr(watch_sets, "_load", slow_load)
+    loader = threading.Thread(target=watch_sets.get, args=("u1",))
+    loader.start()
+    loading.wait(2)
+    # The history scan has already run, so only record() can report this one.
+    watch(db, "u1", video_ids[8])
+    watch_sets.record("u1", video_ids[8])
+    release.set()
+    loader.join(2)
+
+    monkeypatch.setattr(watch_sets, "_load", real_load)
+    assert watched(watch_sets, "u1", video_ids) == {video_ids[8]}
+    assert not watch_sets._loading
+
+
+def test_watch_recorded_between_load_and_install_is_kept(db, watch_sets, video_ids):
+    # Record a watch every time the cache lock is released while u1 has no
+    # cached bitmap, i.e. in every gap a load leaves open.
+    recorded = []
+    real_lock = watch_sets._lock
+    hooking = threading.local()
+
+    class HookedLock:
+        def __enter__(self):
+            real_lock.acquire()
+
+        def __exit__(self, *exc):
+            real_lock.release()
+            if "u1" in watch_sets._sets or getattr(hooking, "active", False):
+                return
+            hooking.active = True
+            video_id = video_ids[len(recorded)]
+            recorded.append(video_id)
+            watch_sets.record("u1", video_id)
+            hooking.active = False
+
+    watch_sets._lock = HookedLock()
+    watch_sets.get("u1")
+    watch_sets._lock = real_lock
+    assert recorded
+    assert watched(watch_sets, "u1", video_ids) == set(recorded)
+
+
+def test_sample_prefers_unwatched_videos(db, watch_sets, video_ids):
+    for video_id in video_ids[:18]:
+        watch(db, "u1", video_id)
+    sample = watch_sets.sample_unwatched("u1", 2)
+    assert {watch_sets.catalog.by_ordinal(o)["_id"] for o in sample} == set(video_ids[18:])
+
+    # With fewer unwatched videos than asked for, watched ones fill the rest.
+    sample = watch_sets.sample_unwatched("u1", 4)
+    assert len(set(sample)) == 4
+
+
+def test_watch_endpoint_updates_the_dashboard(app, client, db, video_ids, auth_headers):
+    app.config["DASHBOARD_MODE"] = "unwatched"
+    app.config["DASHBOARD_SAMPLE_SIZE"] = 1
+    for video_id in video_ids[:19]:
+        watch(db, "u1", video_id)
+    response = client.get("/dashboard", headers=auth_headers("u1"))
+    assert response.get_json()["mode"] == "unwatched"
+    assert [v["video_id"] for v in response.get_json()["videos"]] == [video_ids[19]]
+
+    assert client.post(f"/video/{video_ids[19]}/watch", headers=auth_headers("u1")).status_code == 200
+    assert watched(app.extensions["watch_sets"], "u1", video_ids) == set(video_ids)
+
+
+@pytest.mark.parametrize("header", ["Bearer not-a-token", "Token abc"])
+def test_unwatched_dashboard_falls_back_to_random_on_bad_tokens(app, client, video_ids, header):
+    app.config["DASHBOARD_MODE"] = "unwatched"
+    response = client.get("/dashboard", headers={"Authorization": header})
+    assert response.status_code == 200
+    assert "mode" not in response.get_json()
+    assert len(response.get_json()["videos"]) == 2
+
+
+def test_unwatched_dashboard_falls_back_on_expired_tokens(app, client, video_ids, make_token):
+    app.config["DASHBOARD_MODE"] = "unwatched"
+    token = make_token("u1", expires_in=timedelta(seconds=-5))
+    response = client.get("/dashboard", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert "mode" not in response.get_json()
@@ -0,0 +1,29 @@
+import logging
+
+from flask import Flask
+
+from . import store
+from .routes import thumbnails_bp
+from .store import HttpOrigin, ThumbnailStore
+
+logger = logging.getLogger(__name__)
+
+
+def init_thumbnails(app: Flask, origin: HttpOrigin | None = None) -> None:
+    if origin is None:
+        origin = HttpOrigin(
+            app.config.get("THUMBNAIL_ORIGIN_URL", ""),
+            timeout=app.config.get("THUMBNAIL_ORIGIN_TIMEOUT_SECONDS", 5.0),
+        )
+    widths = [int(w) for w in app.config.get("THUMBNAIL_WIDTHS", "").split(",") if w.strip()]
+    if widths and store.Image is None:
+        logger.error("thumbnail_resize_unavailable", extra={"error": "Pillow is not installed", "widths": widths})
+    app.extensions["thumbnail_store"] = ThumbnailStore(
+        app.config.get("THUMBNAIL_CACHE_DIR", "thumbnail_cache"),
+        origin,
+        widths,
+    )
+    app.register_blueprint(thumbnails_bp)
+
+
+__all__ = ["HttpOrigin", "ThumbnailStore", "init_thumbnails", "thumbnails_bp"]
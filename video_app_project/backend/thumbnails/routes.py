@@ -0,0 +1,41 @@
+import logging
+
+from flask import Blueprint, current_app, jsonify, request, send_file
+
+from thumbnails.store import OriginError
+from video.catalog import get_catalog
+
+thumbnails_bp = Blueprint("thumbnails", __name__, url_prefix="/thumbnails")
+logger = logging.getLogger(__name__)
+
+
+@thumbnails_bp.get("/<video_id>")
+def get_thumbnail(video_id):
+    video = get_catalog().get(video_id)
+    if video is None or not video.get("is_active"):
+        return jsonify({"success": False, "error": "video not found"}), 404
+
+    store = current_app.extensions["thumbnail_store"]
+    try:
+        requested = int(request.args.get("w", 0))
+    except ValueError:
+        return jsonify({"success": False, "error": "w is invalid"}), 400
+
+    try:
+        cached = store.variant(video, store.snap_width(requested))
+    except OriginError:
+        logger.warning(
+            "thumbnail_error",
+            extra={"error": "origin_fetch_failed", "video_id": video_id, "ip": request.remote_addr or "unknown"},
+        )
+        return jsonify({"success": False, "error": "thumbnail unavailable"}), 502
+
+    # send_file hands the open file to the server's wsgi.file_wrapper, which
+    # uses sendfile() where the server supports it.
+    return send_file(
+        cached.path,
+        mimetype=cached.content_type,
+        etag=cached.etag,
+        conditional=True,
+        max_age=current_app.config.get("THUMBNAIL_MAX_AGE_SECONDS", 86400),
+    )
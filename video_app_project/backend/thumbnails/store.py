@@ -0,0 +1,232 @@
+"""
+Disk cache for video thumbnails.
+
+Originals are fetched once per video from a pluggable origin and stored
+under ``<cache dir>/<video id>/``; width variants are generated from the
+cached original on first request. Files are written to a temp name and
+renamed, so readers never see partial images. Concurrent misses for the same
+file share one fetch or resize (single-flight). An origin response is cached
+only if its content type is one of CONTENT_TYPES and the bytes decode as that
+format; anything else is an OriginError (a 502 from the route).
+
+Resizing needs Pillow (in requirements.txt). If it is missing anyway, every
+width is served from the original and init_thumbnails logs an error.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import logging
+import os
+import threading
+import urllib.request
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPES = {"jpg": "image/jpeg", "png": "image/png", "webp": "image/webp"}
+PIL_FORMATS = {"jpg": "JPEG", "png": "PNG", "webp": "WEBP"}
+
+# What Pillow raises for bytes that are not a readable image.
+DECODE_ERRORS = (OSError, SyntaxError, ValueError) + ((Image.DecompressionBombError,) if Image else ())
+
+
+class OriginError(Exception):
+    pass
+
+
+class HttpOrigin:
+    """
+    Fetch originals over HTTP. ``url_template`` may use ``{video_id}`` and
+    ``{youtube_id}``; without one the catalog's ``thumbnail_url`` is used.
+    """
+
+    def __init__(self, url_template: str = "", timeout: float = 5.0):
+        self.url_template = url_template
+        self.timeout = timeout
+
+    def url_for(self, video: Dict[str, Any]) -> str:
+        if self.url_template:
+            return self.url_template.format(video_id=video["_id"], youtube_id=video.get("youtube_id") or "")
+        return video.get("thumbnail_url") or ""
+
+    def fetch(self, video: Dict[str, Any]) -> Tuple[bytes, str]:
+        url = self.url_for(video)
+        if not url:
+            raise OriginError(f"no thumbnail url for video {video['_id']}")
+        try:
+            with urllib.request.urlopen(url, timeout=self.timeout) as response:
+                return response.read(), response.headers.get_content_type()
+        except OSError as exc:
+            raise OriginError(f"thumbnail fetch failed for {url}: {exc}") from exc
+
+
+@dataclass
+class CachedFile:
+    path: str
+    etag: str
+    content_type: str
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Optional[CachedFile] = None
+        self.error: Optional[BaseException] = None
+
+
+class ThumbnailStore:
+    def __init__(self, directory: str, origin: HttpOrigin, widths: List[int], quality: int = 80):
+        self.directory = directory
+        self.origin = origin
+        self.widths = sorted(widths)
+        self.quality = quality
+        self._lock = threading.Lock()
+        self._flights: Dict[str, _Flight] = {}
+        self._etags: Dict[str, str] = {}
+        self.fetches = 0
+        self.resizes = 0
+
+    def snap_width(self, requested: Optional[int]) -> Optional[int]:
+        """Round a requested width up to the nearest configured variant."""
+        if not requested or not self.widths:
+            return None
+        for width in self.widths:
+            if width >= requested:
+                return width
+        return None
+
+    def _single_flight(self, key: str, produce: Callable[[], CachedFile]) -> CachedFile:
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        try:
+            flight.result = produce()
+            return flight.result
+        except BaseException as exc:
+            flight.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def _etag_for(self, path: str) -> str:
+        etag = self._etags.get(path)
+        if etag is None:
+            digest = hashlib.sha256()
+            with open(path, "rb") as handle:
+                for chunk in iter(lambda: handle.read(65536), b""):
+                    digest.update(chunk)
+            etag = self._etags[path] = digest.hexdigest()[:32]
+        return etag
+
+    def _write(self, path: str, data: bytes) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as handle:
+            handle.write(data)
+        os.replace(tmp, path)
+        self._etags[path] = hashlib.sha256(data).hexdigest()[:32]
+
+    def _folder(self, video_id: str) -> str:
+        # Ids come from the catalog, but never let one name a path outside the cache.
+        if not video_id or video_id in (".", "..") or os.path.basename(video_id) != video_id:
+            raise OriginError(f"invalid video id {video_id!r}")
+        return os.path.join(self.directory, video_id)
+
+    def _find_original(self, video_id: str) -> Optional[CachedFile]:
+        folder = self._folder(video_id)
+        for ext, content_type in CONTENT_TYPES.items():
+            path = os.path.join(folder, f"original.{ext}")
+            if os.path.exists(path):
+                return CachedFile(path, self._etag_for(path), content_type)
+        return None
+
+    @staticmethod
+    def _check_original(video_id: str, data: bytes, content_type: str) -> str:
+        """Extension for an origin response, or OriginError if it is not an image."""
+        ext = next((e for e, t in CONTENT_TYPES.items() if t == content_type), None)
+        if ext is None:
+            raise OriginError(f"origin returned {content_type} for video {video_id}")
+        if Image is not None:
+            try:
+                with Image.open(io.BytesIO(data)) as image:
+                    image.verify()
+                    decoded = image.format
+            except DECODE_ERRORS as exc:
+                raise OriginError(f"origin returned an unreadable image for video {video_id}: {exc}") from exc
+            if decoded != PIL_FORMATS[ext]:
+                raise OriginError(f"origin sent {decoded} as {content_type} for video {video_id}")
+        return ext
+
+    def original(self, video: Dict[str, Any]) -> CachedFile:
+        video_id = video["_id"]
+        cached = self._find_original(video_id)
+        if cached is not None:
+            return cached
+
+        def fetch() -> CachedFile:
+            found = self._find_original(video_id)
+            if found is not None:
+                return found
+            data, content_type = self.origin.fetch(video)
+            ext = self._check_original(video_id, data, content_type)
+            path = os.path.join(self._folder(video_id), f"original.{ext}")
+            self._write(path, data)
+            self.fetches += 1
+            return CachedFile(path, self._etags[path], CONTENT_TYPES[ext])
+
+        return self._single_flight(f"{video_id}:original", fetch)
+
+    def variant(self, video: Dict[str, Any], width: Optional[int]) -> CachedFile:
+        original = self.original(video)
+        if width is None or Image is None:
+            return original
+        path = os.path.join(self._folder(video["_id"]), f"w{width}.jpg")
+        if os.path.exists(path):
+            return CachedFile(path, self._etag_for(path), "image/jpeg")
+
+        def resize() -> CachedFile:
+            if not os.path.exists(path):
+                tmp = f"{path}.{threading.get_ident()}.tmp"
+                try:
+                    try:
+                        with Image.open(original.path) as image:
+                            image = image.convert("RGB")
+                    except DECODE_ERRORS as exc:
+                        # Drop the unreadable original so the next request fetches it again.
+                        os.remove(original.path)
+                        self._etags.pop(original.path, None)
+                        raise OriginError(f"cached original for video {video['_id']} is unreadable: {exc}") from exc
+                    if image.width > width:
+                        height = max(1, round(image.height * width / image.width))
+                        image = image.resize((width, height), Image.LANCZOS)
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    image.save(tmp, "JPEG", quality=self.quality, optimize=True)
+                    os.replace(tmp, path)
+                finally:
+                    if os.path.exists(tmp):
+                        os.remove(tmp)
+                self._etags.pop(path, None)
+                self.resizes += 1
+            return CachedFile(path, self._etag_for(path), "image/jpeg")
+
+        return self._single_flight(f"{video['_id']}:w{width}", resize)
+
+    def stats(self) -> Dict[str, int]:
+        return {"fetches": self.fetches, "resizes": self.resizes, "in_flight": len(self._flights)}
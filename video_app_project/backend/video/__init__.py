@@ -1,4 +1,5 @@
-from .routes import video_bp
-
-__all__ = ["video_bp"]
+from .catalog import get_catalog, init_catalog
+from .routes import catalog_bp, history_bp, video_bp
+from .watch_sets import init_watch_sets
 
+__all__ = ["catalog_bp", "get_catalog", "history_bp", "init_catalog", "init_watch_sets", "video_bp"]
@@ -0,0 +1,191 @@
+"""
+In-process copy of the video catalog.
+
+Each video gets a stable ordinal the first time it is seen, so consumers
+(the search index, per-user watch sets, exports) can keep compact
+array-indexed state instead of dicts keyed by ObjectId strings.
+
+The catalog is loaded with a streaming scan at startup and refreshed in the
+background: new documents are picked up by ``_id`` and edited ones by
+``updated_at``, so writers that change a video should set ``updated_at``.
+Every CATALOG_RECONCILE_EVERY refreshes an ``_id``-only scan drops videos
+that were deleted.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from bson import ObjectId
+from flask import Flask
+
+from db.collections import get_collection
+
+logger = logging.getLogger(__name__)
+
+CATALOG_FIELDS = {
+    "title": 1,
+    "description": 1,
+    "thumbnail_url": 1,
+    "youtube_id": 1,
+    "is_active": 1,
+    "updated_at": 1,
+}
+
+Listener = Callable[[int, Optional[Dict[str, Any]]], None]
+
+
+class VideoCatalog:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._by_id: Dict[str, Dict[str, Any]] = {}
+        self._ordinal_by_id: Dict[str, int] = {}
+        self._ids: List[str] = []
+        self._listeners: List[Listener] = []
+        self._last_id: Optional[ObjectId] = None
+        self._last_sync: Optional[datetime] = None
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def subscribe(self, listener: Listener) -> None:
+        """``listener(ordinal, doc)`` is called on every change; ``doc`` is None on removal."""
+        self._listeners.append(listener)
+        with self._lock:
+            for video_id, doc in self._by_id.items():
+                listener(self._ordinal_by_id[video_id], doc)
+
+    def upsert(self, doc: Dict[str, Any]) -> int:
+        video_id = str(doc["_id"])
+        entry = {
+            "_id": video_id,
+            "title": doc.get("title", "Untitled Video"),
+            "description": doc.get("description", "No description available"),
+            "thumbnail_url": doc.get("thumbnail_url", ""),
+            "youtube_id": doc.get("youtube_id"),
+            "is_active": bool(doc.get("is_active", False)),
+        }
+        with self._lock:
+            ordinal = self._ordinal_by_id.get(video_id)
+            if ordinal is None:
+                ordinal = len(self._ids)
+                self._ids.append(video_id)
+                self._ordinal_by_id[video_id] = ordinal
+            entry["ordinal"] = ordinal
+            self._by_id[video_id] = entry
+            if isinstance(doc["_id"], ObjectId) and (self._last_id is None or doc["_id"] > self._last_id):
+                self._last_id = doc["_id"]
+        for listener in self._listeners:
+            listener(ordinal, entry)
+        return ordinal
+
+    def remove(self, video_id: str) -> None:
+        with self._lock:
+            if self._by_id.pop(video_id, None) is None:
+                return
+            ordinal = self._ordinal_by_id[video_id]
+        for listener in self._listeners:
+            listener(ordinal, None)
+
+    def get(self, video_id: str) -> Optional[Dict[str, Any]]:
+        return self._by_id.get(video_id)
+
+    def by_ordinal(self, ordinal: int) -> Optional[Dict[str, Any]]:
+        if ordinal >= len(self._ids):
+            return None
+        return self._by_id.get(self._ids[ordinal])
+
+    def ordinal(self, video_id: str) -> Optional[int]:
+        return self._ordinal_by_id.get(video_id)
+
+    @property
+    def size(self) -> int:
+        """Number of ordinals handed out, including removed videos."""
+        return len(self._ids)
+
+    def load(self, collection: Any, batch_size: int = 1000) -> int:
+        started = datetime.utcnow()
+        count = 0
+        for doc in collection.find({}, CATALOG_FIELDS).batch_size(batch_size):
+            self.upsert(doc)
+            count += 1
+        self._last_sync = started
+        logger.info("catalog_loaded", extra={"videos": count})
+        return count
+
+    def refresh(self, collection: Any, reconcile: bool = False, batch_size: int = 1000) -> int:
+        started = datetime.utcnow()
+        query: Dict[str, Any] = {}
+        if self._last_id is not None:
+            filters: List[Dict[str, Any]] = [{"_id": {"$gt": self._last_id}}]
+            if self._last_sync is not None:
+                # Allow for clock skew between app servers and writers.
+                filters.append({"updated_at": {"$gt": self._last_sync - timedelta(seconds=5)}})
+            query = {"$or": filters}
+        changed = 0
+        for doc in collection.find(query, CATALOG_FIELDS).batch_size(batch_size):
+            self.upsert(doc)
+            changed += 1
+        self._last_sync = started
+
+        if reconcile:
+            present = {str(doc["_id"]) for doc in collection.find({}, {"_id": 1}).batch_size(batch_size)}
+            for video_id in [v for v in list(self._by_id) if v not in present]:
+                self.remove(video_id)
+                changed += 1
+        return changed
+
+
+_catalog: Optional[VideoCatalog] = None
+
+
+def get_catalog() -> VideoCatalog:
+    if _catalog is None:
+        raise RuntimeError("Video catalog not initialized")
+    return _catalog
+
+
+def _refresh_loop(catalog: VideoCatalog, interval: float, reconcile_every: int, stop: threading.Event) -> None:
+    refreshes = 0
+    while not stop.wait(interval):
+        refreshes += 1
+        reconcile = bool(reconcile_every) and refreshes % reconcile_every == 0
+        try:
+            videos = get_collection("videos", read="primary_scan", background=True)
+            catalog.refresh(videos, reconcile=reconcile)
+        except Exception:
+            logger.exception("catalog_refresh_error")
+
+
+def init_catalog(app: Flask) -> None:
+    global _catalog
+    from video.search_index import SearchIndex
+
+    catalog = VideoCatalog()
+    index = SearchIndex(
+        k1=app.config.get("SEARCH_BM25_K1", 1.2),
+        b=app.config.get("SEARCH_BM25_B", 0.75),
+        max_prefix_terms=app.config.get("SEARCH_MAX_PREFIX_TERMS", 8),
+        min_prefix_length=app.config.get("SEARCH_MIN_PREFIX_LENGTH", 3),
+        max_scan=app.config.get("SEARCH_MAX_POSTINGS_SCAN", 512),
+    )
+    catalog.subscribe(index.on_catalog_change)
+    videos = get_collection("videos", read="primary_scan")
+    catalog.load(videos)
+    _catalog = catalog
+    app.extensions["catalog"] = catalog
+    app.extensions["search_index"] = index
+
+    interval = app.config.get("CATALOG_REFRESH_SECONDS", 30)
+    if interval > 0:
+        stop = threading.Event()
+        app.extensions["catalog_refresh_stop"] = stop
+        threading.Thread(
+            target=_refresh_loop,
+            args=(catalog, interval, app.config.get("CATALOG_RECONCILE_EVERY", 10), stop),
+            name="catalog-refresh",
+            daemon=True,
+        ).start()
@@ -1,54 +1,130 @@
+import csv
+import io
+import json
 import logging
-from flask import Blueprint, jsonify, current_app, request
+from flask import Blueprint, Response, jsonify, current_app, request, stream_with_context, url_for
 from bson import ObjectId
 from datetime import datetime, timedelta
 import jwt
+from pymongo.errors import ConnectionFailure, PyMongoError
 
-from db.mongo import get_db_client
+from auth.routes import get_user_id_from_token
+from auth.tokens import bearer_token, decode_token, encode_token
+from db.fallback import dashboard_fallback
+from db.collections import get_collection
+from video.catalog import get_catalog
 
 logger = logging.getLogger(__name__)
 
 video_bp = Blueprint("video", __name__, url_prefix="/video")
 dashboard_bp = Blueprint("dashboard", __name__)
+catalog_bp = Blueprint("catalog", __name__, url_prefix="/videos")
+history_bp = Blueprint("history", __name__, url_prefix="/me")
 
+EXPORT_FIELDS = ("watched_at", "video_id", "title")
+EXPORT_MIMETYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
 
-@dashboard_bp.get("/dashboard")
-def get_dashboard():
-    client = get_db_client()
-    db = client.get_default_database()
-    videos_collection = db["videos"]
-    
-    # Use MongoDB aggregation pipeline to get random 2 active videos
-    cursor = videos_collection.aggregate([
-        {"$match": {"is_active": True}},
-        {"$sample": {"size": 2}},
-        {"$project": {
-            "title": 1,
-            "description": 1,
-            "thumbnail_url": 1,
-            "_id": 1
-        }}
-    ])
-    
+
+def _video_items(docs):
+    proxy_thumbnails = current_app.config.get("THUMBNAIL_PROXY_ENABLED", False)
     videos = []
-    for doc in cursor:
-        jwt_secret = current_app.config.get("JWT_SECRET_KEY")
-        jwt_algorithm = current_app.config.get("JWT_ALGORITHM", "HS256")
+    for doc in docs:
         payload = {
             "video_id": str(doc.get("_id")),
             "exp": datetime.utcnow() + timedelta(minutes=5),
         }
-        token = jwt.encode(payload, jwt_secret, algorithm=jwt_algorithm)
+        token = encode_token(payload)
+        thumbnail_url = doc.get("thumbnail_url", "")
+        if proxy_thumbnails:
+            thumbnail_url = url_for(
+                "thumbnails.get_thumbnail",
+                video_id=str(doc.get("_id")),
+                w=current_app.config.get("THUMBNAIL_DASHBOARD_WIDTH", 320),
+                _external=True,
+            )
         
         videos.append({
             "video_id": str(doc.get("_id")),
             "title": doc.get("title", "Untitled Video"),
             "description": doc.get("description", "No description available"),
-            "thumbnail_url": doc.get("thumbnail_url", ""),
+            "thumbnail_url": thumbnail_url,
             "playback_token": token,
         })
-    
-    return jsonify({"success": True, "videos": videos}), 200
+    return videos
+
+
+def _personalized_dashboard(user_id):
+    catalog = get_catalog()
+    watch_sets = current_app.extensions["watch_sets"]
+    size = current_app.config.get("DASHBOARD_SAMPLE_SIZE", 2)
+    docs = [catalog.by_ordinal(ordinal) for ordinal in watch_sets.sample_unwatched(user_id, size)]
+    docs = [doc for doc in docs if doc is not None]
+    return jsonify({"success": True, "videos": _video_items(docs), "mode": "unwatched"}), 200
+
+
+@dashboard_bp.get("/dashboard")
+def get_dashboard():
+    mode = request.args.get("mode") or current_app.config.get("DASHBOARD_MODE", "random")
+    if mode == "unwatched" and request.headers.get("Authorization"):
+        user_id, error_response, _ = get_user_id_from_token()
+        if not error_response:
+            return _personalized_dashboard(user_id)
+        # An expired or bad token still gets the random dashboard, as it
+        # did before personalization existed.
+
+    try:
+        videos_collection = get_collection("videos")
+        
+        # Use MongoDB aggregation pipeline to get random 2 active videos
+        docs = list(videos_collection.aggregate([
+            {"$match": {"is_active": True}},
+            {"$sample": {"size": current_app.config.get("DASHBOARD_SAMPLE_SIZE", 2)}},
+            {"$project": {
+                "title": 1,
+                "description": 1,
+                "thumbnail_url": 1,
+                "_id": 1
+            }}
+        ]))
+    except ConnectionFailure:
+        # Serve the last good sample, with fresh playback tokens, while the
+        # database is unreachable.
+        docs = dashboard_fallback.get("sample")
+        if docs is None:
+            raise
+        logger.warning("dashboard_fallback", extra={"ip": request.remote_addr or "unknown"})
+        return jsonify({"success": True, "videos": _video_items(docs), "stale": True}), 200
+
+    if docs:
+        dashboard_fallback.put("sample", docs)
+    return jsonify({"success": True, "videos": _video_items(docs)}), 200
+
+
+@catalog_bp.get("/search")
+def search_videos():
+    query = (request.args.get("q") or "").strip()
+    if not query:
+        return jsonify({"success": False, "error": "q is required"}), 400
+    try:
+        limit = min(max(int(request.args.get("limit", 10)), 1), 50)
+    except ValueError:
+        return jsonify({"success": False, "error": "limit is invalid"}), 400
+
+    index = current_app.extensions["search_index"]
+    catalog = get_catalog()
+    docs = []
+    scores = []
+    for ordinal, score in index.search(query, limit=limit):
+        doc = catalog.by_ordinal(ordinal)
+        if doc is None:
+            continue
+        docs.append(doc)
+        scores.append(score)
+
+    videos = _video_items(docs)
+    for item, score in zip(videos, scores):
+        item["score"] = round(score, 4)
+    return jsonify({"success": True, "query": query, "videos": videos}), 200
 
 
 @video_bp.get("/<video_id>/stream")
@@ -65,11 +141,8 @@ def stream_video(video_id):
         )
         return jsonify({"error": "unauthorized"}), 401
     
-    jwt_secret = current_app.config.get("JWT_SECRET_KEY")
-    jwt_algorithm = current_app.config.get("JWT_ALGORITHM", "HS256")
-    
     try:
-        payload = jwt.decode(playback_token, jwt_secret, algorithms=[jwt_algorithm])
+        payload = decode_token(playback_token)
     except jwt.ExpiredSignatureError:
         logger.warning(
             "video_token_error",
@@ -104,9 +177,7 @@ def stream_video(video_id):
         )
         return jsonify({"error": "unauthorized"}), 401
     
-    client = get_db_client()
-    db = client.get_default_database()
-    videos_collection = db["videos"]
+    videos_collection = get_collection("videos")
     
     try:
         query = {"_id": ObjectId(video_id), "is_active": True}
@@ -151,8 +222,8 @@ def stream_video(video_id):
 
 @video_bp.post("/<video_id>/watch")
 def watch_video(video_id):
-    auth_header = request.headers.get("Authorization", "")
-    if not auth_header.startswith("Bearer "):
+    token = bearer_token(request.headers.get("Authorization", ""))
+    if token is None:
         logger.warning(
             "video_watch_error",
             extra={
@@ -163,7 +234,6 @@ def watch_video(video_id):
         )
         return jsonify({"success": False, "error": "unauthorized"}), 401
     
-    token = auth_header[7:].strip()
     if not token:
         logger.warning(
             "video_watch_error",
@@ -175,11 +245,8 @@ def watch_video(video_id):
         )
         return jsonify({"success": False, "error": "unauthorized"}), 401
     
-    jwt_secret = current_app.config.get("JWT_SECRET_KEY")
-    jwt_algorithm = current_app.config.get("JWT_ALGORITHM", "HS256")
-    
     try:
-        payload = jwt.decode(token, jwt_secret, algorithms=[jwt_algorithm])
+        payload = decode_token(token)
     except jwt.ExpiredSignatureError:
         logger.warning(
             "video_watch_error",
@@ -213,9 +280,7 @@ def watch_video(video_id):
         )
         return jsonify({"success": False, "error": "unauthorized"}), 401
     
-    client = get_db_client()
-    db = client.get_default_database()
-    history = db["video_watch_history"]
+    history = get_collection("video_watch_history")
     
     doc = {
         "user_id": user_id,
@@ -237,4 +302,97 @@ def watch_video(video_id):
         )
         return jsonify({"success": False, "error": "failed to record watch"}), 500
     
-    return jsonify({"success": True, "message": "watch recorded"}), 200
\ No newline at end of file
+    current_app.extensions["watch_sets"].record(user_id, video_id)
+    return jsonify({"success": True, "message": "watch recorded"}), 200
+
+
+def _export_rows(cursor, first, fmt, rows_per_chunk):
+    """Encode history events into chunks of ``rows_per_chunk`` rows as the cursor yields them."""
+    catalog = get_catalog()
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if fmt == "csv" else None
+    if writer is not None:
+        writer.writerow(EXPORT_FIELDS)
+
+    def events():
+        if first is not None:
+            yield first
+            yield from cursor
+
+    rows = 0
+    try:
+        for event in events():
+            video_id = event.get("video_id") or ""
+            video = catalog.get(video_id)
+            watched_at = event.get("watched_at")
+            row = (
+                watched_at.isoformat() + "Z" if watched_at else "",
+                video_id,
+                video["title"] if video else "",
+            )
+            if writer is not None:
+                writer.writerow(row)
+            else:
+                buffer.write(json.dumps(dict(zip(EXPORT_FIELDS, row))))
+                buffer.write("\n")
+            rows += 1
+            if rows % rows_per_chunk == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+    except PyMongoError as exc:
+        # Headers are already sent, so end the stream with a marker the
+        # client can tell from a complete export.
+        logger.warning("history_export_error", extra={"error": type(exc).__name__, "rows": rows})
+        if writer is not None:
+            buffer.write(f"# error: export interrupted after {rows} rows\n")
+        else:
+            buffer.write(json.dumps({"error": "export interrupted", "rows": rows}))
+            buffer.write("\n")
+    finally:
+        cursor.close()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+@history_bp.get("/history/export")
+def export_history():
+    """
+    Stream the caller's whole watch history as NDJSON (default) or CSV.
+
+    Rows come straight off a server-side cursor in ``batch_size`` batches and
+    are sent with chunked transfer encoding, so memory does not grow with the
+    history length. Titles come from the in-memory catalog. If the database
+    fails part way, the stream ends with an error line: ``{"error": ...}`` in
+    NDJSON, a ``# error:`` line in CSV.
+    """
+    user_id, error_response, status_code = get_user_id_from_token()
+    if error_response:
+        return error_response, status_code
+
+    fmt = request.args.get("format", "ndjson")
+    if fmt not in EXPORT_MIMETYPES:
+        return jsonify({"success": False, "error": "format must be ndjson or csv"}), 400
+
+    cursor = (
+        get_collection("video_watch_history", read="reporting")
+        # The reporting tier's max_time_ms covers the whole cursor, getMores
+        # included, so it would cut off long histories part way through.
+        .find({"user_id": user_id}, {"_id": 0, "video_id": 1, "watched_at": 1}, max_time_ms=None)
+        .sort([("user_id", 1), ("watched_at", 1)])
+        .batch_size(current_app.config.get("HISTORY_EXPORT_BATCH_SIZE", 1000))
+    )
+    # Fetch the first batch before committing to a 200, so an unreachable
+    # database still gets the usual 503.
+    first = next(cursor, None)
+
+    return Response(
+        stream_with_context(
+            _export_rows(cursor, first, fmt, current_app.config.get("HISTORY_EXPORT_ROWS_PER_CHUNK", 500))
+        ),
+        mimetype=EXPORT_MIMETYPES[fmt],
+        headers={
+            "Content-Disposition": f'attachment; filename="watch-history.{fmt}"',
+            "Cache-Control": "no-store",
+        },
+    )
@@ -0,0 +1,230 @@
+"""
+In-process inverted index over video titles and descriptions.
+
+Postings are parallel ``array('I')`` (document numbers) / ``array('H')``
+(term frequency) pairs, about 6 bytes per posting. Document numbers are
+internal and append-only: re-indexing a video tombstones its old number and
+appends a new one, so posting lists stay sorted without being rewritten.
+The index is compacted once a quarter of its documents are dead.
+
+Ranking is BM25 over a combined field where title terms count
+TITLE_WEIGHT times. The last query token is also matched as a prefix of at
+least ``min_prefix_length`` characters; it expands to the
+``max_prefix_terms`` most frequent of the first PREFIX_CANDIDATES
+completions, so a short prefix costs no more than a few extra words.
+Terms are scored rarest first against a per-query budget of ``max_scan``
+postings. A list that does not fit the remaining budget only re-scores the
+leading candidates (binary search per candidate), or, when there are no
+candidates yet, contributes its newest postings. Query cost is therefore
+bounded regardless of catalog size, at the price of approximate ranking for
+queries made only of very common words.
+"""
+
+from __future__ import annotations
+
+import bisect
+import heapq
+import math
+import re
+import threading
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+TITLE_WEIGHT = 2
+PREFIX_CANDIDATES = 256
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall(text.lower())
+
+
+class _Postings:
+    __slots__ = ("docs", "freqs")
+
+    def __init__(self):
+        self.docs = array("I")
+        self.freqs = array("H")
+
+
+class SearchIndex:
+    def __init__(
+        self,
+        k1: float = 1.2,
+        b: float = 0.75,
+        max_prefix_terms: int = 8,
+        min_prefix_length: int = 3,
+        max_scan: int = 512,
+    ):
+        self.k1 = k1
+        self.b = b
+        self.max_prefix_terms = max_prefix_terms
+        self.min_prefix_length = min_prefix_length
+        self.max_scan = max_scan
+
+        self._lock = threading.RLock()
+        self._postings: Dict[str, _Postings] = {}
+        self._vocab: List[str] = []
+        self._doc_len = array("I")
+        self._doc_ordinal = array("I")
+        self._live = bytearray()
+        self._docno_by_ordinal: Dict[int, int] = {}
+        self._total_len = 0
+        self._live_count = 0
+
+    def __len__(self) -> int:
+        return self._live_count
+
+    def on_catalog_change(self, ordinal: int, doc: Optional[Dict[str, Any]]) -> None:
+        if doc is None or not doc.get("is_active"):
+            self.remove(ordinal)
+        else:
+            self.add(ordinal, doc.get("title") or "", doc.get("description") or "")
+
+    def _kill(self, ordinal: int) -> None:
+        docno = self._docno_by_ordinal.pop(ordinal, None)
+        if docno is not None and self._live[docno]:
+            self._live[docno] = 0
+            self._total_len -= self._doc_len[docno]
+            self._live_count -= 1
+
+    def add(self, ordinal: int, title: str, description: str) -> None:
+        counts: Dict[str, int] = {}
+        for token in tokenize(title):
+            counts[token] = counts.get(token, 0) + TITLE_WEIGHT
+        for token in tokenize(description):
+            counts[token] = counts.get(token, 0) + 1
+        length = sum(counts.values())
+
+        with self._lock:
+            self._kill(ordinal)
+            docno = len(self._doc_len)
+            self._doc_len.append(length)
+            self._doc_ordinal.append(ordinal)
+            self._live.append(1)
+            self._docno_by_ordinal[ordinal] = docno
+            self._total_len += length
+            self._live_count += 1
+            for term, freq in counts.items():
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[term] = _Postings()
+                    bisect.insort(self._vocab, term)
+                postings.docs.append(docno)
+                postings.freqs.append(min(freq, 0xFFFF))
+            if len(self._doc_len) > 1024 and self._live_count < len(self._doc_len) * 0.75:
+                self._compact()
+
+    def remove(self, ordinal: int) -> None:
+        with self._lock:
+            self._kill(ordinal)
+
+    def _compact(self) -> None:
+        remap = array("i", [-1]) * len(self._doc_len)
+        doc_len = array("I")
+        doc_ordinal = array("I")
+        for docno, alive in enumerate(self._live):
+            if alive:
+                remap[docno] = len(doc_len)
+                doc_len.append(self._doc_len[docno])
+                doc_ordinal.append(self._doc_ordinal[docno])
+        postings_map: Dict[str, _Postings] = {}
+        for term, postings in self._postings.items():
+            compacted = _Postings()
+            for docno, freq in zip(postings.docs, postings.freqs):
+                new = remap[docno]
+                if new >= 0:
+                    compacted.docs.append(new)
+                    compacted.freqs.append(freq)
+            if compacted.docs:
+                postings_map[term] = compacted
+        self._postings = postings_map
+        self._vocab = sorted(postings_map)
+        self._doc_len = doc_len
+        self._doc_ordinal = doc_ordinal
+        self._live = bytearray(b"\x01") * len(doc_len)
+        self._docno_by_ordinal = {ordinal: docno for docno, ordinal in enumerate(doc_ordinal)}
+
+    def _expand(self, prefix: str) -> List[str]:
+        if len(prefix) < self.min_prefix_length:
+            return [prefix]
+        start = bisect.bisect_left(self._vocab, prefix)
+        terms = []
+        for term in self._vocab[start:start + PREFIX_CANDIDATES]:
+            if not term.startswith(prefix):
+                break
+            terms.append(term)
+        if len(terms) > self.max_prefix_terms:
+            # The typed word itself always stays in, however rare it is.
+            postings = self._postings
+            terms = heapq.nlargest(self.max_prefix_terms, terms, key=lambda t: (t == prefix, len(postings[t].docs)))
+        return terms
+
+    def search(self, query: str, limit: int = 10, prefix: bool = True) -> List[Tuple[int, float]]:
+        """Return ``(catalog ordinal, score)`` pairs, best first."""
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        with self._lock:
+            if not self._live_count:
+                return []
+            terms = set(tokens[:-1])
+            if prefix and not query[-1:].isspace():
+                terms.update(self._expand(tokens[-1]))
+            else:
+                terms.add(tokens[-1])
+            lists = sorted(
+                (self._postings[t] for t in terms if t in self._postings),
+                key=lambda p: len(p.docs),
+            )
+
+            n = self._live_count
+            avg_len = self._total_len / n
+            k1 = self.k1
+            norm_a = k1 * (1 - self.b)
+            norm_b = k1 * self.b / avg_len
+            doc_len = self._doc_len
+            live = self._live
+            scores: Dict[int, float] = {}
+            budget = self.max_scan
+            rescore = max(limit * 5, 32)
+            leaders: Optional[List[int]] = None
+
+            for postings in lists:
+                docs, freqs = postings.docs, postings.freqs
+                df = len(docs)
+                idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+                weight = idf * (k1 + 1)
+                if scores and df > budget:
+                    # Too long to walk: only re-score the leading candidates.
+                    if leaders is None:
+                        leaders = heapq.nlargest(rescore, scores, key=scores.__getitem__)
+                    for docno in leaders:
+                        i = bisect.bisect_left(docs, docno)
+                        if i < df and docs[i] == docno:
+                            tf = freqs[i]
+                            scores[docno] += weight * tf / (tf + norm_a + norm_b * doc_len[docno])
+                    continue
+                # Newest documents first when a list has to be truncated.
+                stop = max(-1, df - 1 - max(budget, rescore))
+                budget = max(0, budget - df)
+                leaders = None
+                for i in range(df - 1, stop, -1):
+                    docno = docs[i]
+                    if not live[docno]:
+                        continue
+                    tf = freqs[i]
+                    scores[docno] = scores.get(docno, 0.0) + weight * tf / (tf + norm_a + norm_b * doc_len[docno])
+
+            best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+            return [(self._doc_ordinal[docno], score) for docno, score in best if live[docno]]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            postings = sum(len(p.docs) for p in self._postings.values())
+            return {
+                "documents": self._live_count,
+                "terms": len(self._postings),
+                "postings": postings,
+                "posting_bytes": postings * 6,
+            }
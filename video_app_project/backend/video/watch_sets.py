@@ -0,0 +1,198 @@
+"""
+Per-user watched-video bitmaps for the "unwatched first" dashboard.
+
+Each cached user holds a ``bytearray`` with one bit per catalog ordinal, so
+memory per active user is ``ceil(catalog ordinals / 8)`` bytes plus about
+100 bytes of bookkeeping: ~1.3 KB at 10k videos, ~125 KB at 10^6. The cache
+keeps at most WATCH_SET_CACHE_SIZE users and evicts the least recently used.
+
+A user's bitmap is built with one ``video_watch_history`` scan on a cache
+miss and afterwards kept current by ``record()`` from ``watch_video``;
+watches recorded while that scan runs are buffered and applied on top.
+Sampling draws from the in-memory active pool and needs no database round
+trip.
+"""
+
+from __future__ import annotations
+
+import random
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from flask import Flask
+
+from db.collections import get_collection
+from video.catalog import VideoCatalog, get_catalog
+
+
+class ActivePool:
+    """Ordinals of active videos, with O(1) add, remove and random pick."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ordinals = array("I")
+        self._position: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._ordinals)
+
+    def on_catalog_change(self, ordinal: int, doc: Optional[Dict[str, Any]]) -> None:
+        with self._lock:
+            active = doc is not None and doc.get("is_active")
+            position = self._position.get(ordinal)
+            if active and position is None:
+                self._position[ordinal] = len(self._ordinals)
+                self._ordinals.append(ordinal)
+            elif not active and position is not None:
+                last = self._ordinals.pop()
+                del self._position[ordinal]
+                if last != ordinal:
+                    self._ordinals[position] = last
+                    self._position[last] = position
+
+    def snapshot(self) -> array:
+        with self._lock:
+            return array("I", self._ordinals)
+
+    def choice(self, rng: random.Random) -> Optional[int]:
+        with self._lock:
+            if not self._ordinals:
+                return None
+            return self._ordinals[rng.randrange(len(self._ordinals))]
+
+
+class WatchSetCache:
+    def __init__(self, catalog: VideoCatalog, pool: ActivePool, capacity: int = 10000):
+        self.catalog = catalog
+        self.pool = pool
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._sets: "OrderedDict[str, bytearray]" = OrderedDict()
+        # user_id -> [loads in flight, ordinals recorded meanwhile]
+        self._loading: Dict[str, List[Any]] = {}
+        self._rng = random.Random()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _set_bit(bits: bytearray, ordinal: int) -> None:
+        byte = ordinal >> 3
+        if byte >= len(bits):
+            bits.extend(bytes(byte - len(bits) + 1))
+        bits[byte] |= 1 << (ordinal & 7)
+
+    @staticmethod
+    def _has_bit(bits: bytearray, ordinal: int) -> bool:
+        byte = ordinal >> 3
+        return byte < len(bits) and bool(bits[byte] & (1 << (ordinal & 7)))
+
+    def _load(self, user_id: str) -> bytearray:
+        bits = bytearray((self.catalog.size + 7) // 8)
+        # Read from the primary: a lagging secondary would miss recent watches
+        # that record() will never report again once the bitmap is cached.
+        history = get_collection("video_watch_history", read="primary").find(
+            {"user_id": user_id}, {"video_id": 1, "_id": 0}
+        )
+        for event in history.batch_size(1000):
+            ordinal = self.catalog.ordinal(event.get("video_id") or "")
+            if ordinal is not None:
+                self._set_bit(bits, ordinal)
+        return bits
+
+    def get(self, user_id: str) -> bytearray:
+        with self._lock:
+            bits = self._sets.get(user_id)
+            if bits is not None:
+                self._sets.move_to_end(user_id)
+                self.hits += 1
+                return bits
+            loading = self._loading.setdefault(user_id, [0, []])
+            loading[0] += 1
+        try:
+            bits = self._load(user_id)
+        except BaseException:
+            with self._lock:
+                self._finish_load(user_id, loading)
+            raise
+        # One critical section from here until the bitmap is installed: a
+        # record() that found the user loading must find the bitmap next.
+        with self._lock:
+            self._finish_load(user_id, loading)
+            self.misses += 1
+            # The history scan may have missed watches recorded while it ran.
+            for ordinal in loading[1]:
+                self._set_bit(bits, ordinal)
+            # Another load for this user may have finished first.
+            existing = self._sets.get(user_id)
+            if existing is not None:
+                return existing
+            self._sets[user_id] = bits
+            while len(self._sets) > self.capacity:
+                self._sets.popitem(last=False)
+            return bits
+
+    def _finish_load(self, user_id: str, loading: List[Any]) -> None:
+        # Caller holds self._lock.
+        loading[0] -= 1
+        if not loading[0]:
+            del self._loading[user_id]
+
+    def record(self, user_id: str, video_id: str) -> None:
+        ordinal = self.catalog.ordinal(video_id)
+        if ordinal is None:
+            return
+        with self._lock:
+            bits = self._sets.get(user_id)
+            if bits is not None:
+                self._set_bit(bits, ordinal)
+            elif user_id in self._loading:
+                self._loading[user_id][1].append(ordinal)
+            # Otherwise the watch is picked up from history on the next load.
+
+    def sample_unwatched(self, user_id: str, size: int) -> List[int]:
+        """Up to ``size`` active ordinals, unwatched ones first."""
+        bits = self.get(user_id)
+        chosen: List[int] = []
+        seen = set()
+        attempts = max(32, size * 16)
+        for _ in range(attempts):
+            ordinal = self.pool.choice(self._rng)
+            if ordinal is None:
+                return chosen
+            if ordinal in seen:
+                continue
+            seen.add(ordinal)
+            if not self._has_bit(bits, ordinal):
+                chosen.append(ordinal)
+                if len(chosen) == size:
+                    return chosen
+
+        # Random probes kept hitting watched videos: scan the pool instead.
+        ordinals = self.pool.snapshot()
+        unwatched = [o for o in ordinals if o not in seen and not self._has_bit(bits, o)]
+        chosen.extend(self._rng.sample(unwatched, min(size - len(chosen), len(unwatched))))
+        if len(chosen) < size:
+            watched = [o for o in ordinals if o not in chosen]
+            chosen.extend(self._rng.sample(watched, min(size - len(chosen), len(watched))))
+        return chosen
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "users": len(self._sets),
+                "bytes": sum(len(bits) for bits in self._sets.values()),
+                "bytes_per_user": (self.catalog.size + 7) // 8,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+def init_watch_sets(app: Flask) -> None:
+    catalog = get_catalog()
+    pool = ActivePool()
+    catalog.subscribe(pool.on_catalog_change)
+    app.extensions["watch_sets"] = WatchSetCache(
+        catalog, pool, capacity=app.config.get("WATCH_SET_CACHE_SIZE", 10000)
+    )